@@ -0,0 +1,205 @@
+# backend/async_fetcher.py
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+
+import httpx
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+import metrics
+from data_fetcher import (
+    FORECAST_URL,
+    build_city_params,
+    decode_bulk_responses,
+    decode_hourly,
+    plan_bulk_requests,
+)
+
+logger = logging.getLogger(__name__)
+
+ASYNC_MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS", 20))
+ASYNC_MAX_KEEPALIVE = int(os.getenv("ASYNC_MAX_KEEPALIVE", 10))
+ASYNC_MAX_CONCURRENCY = int(os.getenv("ASYNC_MAX_CONCURRENCY", 10))
+ASYNC_RETRIES = int(os.getenv("ASYNC_RETRIES", 3))
+ASYNC_BACKOFF_FACTOR = float(os.getenv("ASYNC_BACKOFF_FACTOR", 0.3))
+ASYNC_TIMEOUT_S = float(os.getenv("ASYNC_TIMEOUT_S", 10))
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+ASYNC_HTTP2 = os.getenv("ASYNC_HTTP2", "False").lower() == "true"
+# Same lifetime as the sync path's requests_cache session (expire_after=3600)
+ASYNC_CACHE_TTL_S = float(os.getenv("ASYNC_CACHE_TTL_S", 3600))
+ASYNC_CACHE_MAX_ENTRIES = int(os.getenv("ASYNC_CACHE_MAX_ENTRIES", 256))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """Raised when Open-Meteo cannot be reached or returns an error"""
+
+
+def decode_responses(data):
+    """Split a length-prefixed FlatBuffers payload into WeatherApiResponse messages"""
+    messages = []
+    total = len(data)
+    pos = 0
+    while pos < total:
+        length = int.from_bytes(data[pos:pos + 4], byteorder="little")
+        # Streamed error messages start with "Unexpected"
+        if length == 0x78656E55:
+            raise UpstreamError(data[pos:].decode("utf-8", errors="replace"))
+        messages.append(WeatherApiResponse.GetRootAs(data, pos + 4))
+        pos += length + 4
+    return messages
+
+
+class ResponseCache:
+    """In-memory LRU of successful response bodies, keyed by URL and query parameters.
+
+    Stands in for the sync path's requests_cache session: entries live for
+    `ttl` seconds and only 2xx bodies are stored, so errors are always retried.
+    """
+
+    def __init__(self, ttl=ASYNC_CACHE_TTL_S, max_entries=ASYNC_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(url, params):
+        return url, tuple(sorted(params.items()))
+
+    def get(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, content = entry
+        if expires <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return content
+
+    def put(self, key, content, now=None):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        self._entries[key] = (now + self.ttl, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"size": len(self._entries), "max_entries": self.max_entries, "ttl_s": self.ttl}
+
+
+class AsyncOpenMeteoClient:
+    """Pooled keep-alive client with bounded concurrency, retry/backoff and a response cache"""
+
+    def __init__(self, max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive=ASYNC_MAX_KEEPALIVE,
+                 max_concurrency=ASYNC_MAX_CONCURRENCY, retries=ASYNC_RETRIES,
+                 backoff_factor=ASYNC_BACKOFF_FACTOR, timeout=ASYNC_TIMEOUT_S, http2=ASYNC_HTTP2,
+                 cache=None):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.cache = ResponseCache() if cache is None else cache
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+            ),
+        )
+
+    async def weather_api(self, url, params):
+        params = {**params, "format": "flatbuffers"}
+        key = self.cache.key(url, params)
+        content = self.cache.get(key)
+        metrics.record_upstream_lookup(content is not None)
+        if content is not None:
+            return decode_responses(content)
+
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self._client.get(url, params=params)
+                except httpx.TransportError as e:
+                    if attempt == self.retries:
+                        raise UpstreamError(f"failed to request {url!r}: {e}") from e
+                    logger.warning(f"Open-Meteo request failed ({e}), retrying")
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                        break
+                    logger.warning(f"Open-Meteo returned {response.status_code}, retrying")
+                # Exponential backoff with jitter, same schedule as retry_requests
+                delay = self.backoff_factor * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+        if response.status_code >= 400:
+            raise UpstreamError(f"Open-Meteo returned {response.status_code}: {response.text[:200]}")
+        messages = decode_responses(response.content)
+        # Cache only bodies that decoded, so a streamed error is fetched again next time
+        self.cache.put(key, response.content)
+        return messages
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = AsyncOpenMeteoClient()
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_city_data_async(city):
+    """Async counterpart of data_fetcher.fetch_city_data"""
+    params = build_city_params(city)
+    with metrics.stage("fetch"):
+        responses = await get_client().weather_api(FORECAST_URL, params)
+    return decode_hourly(responses[0].Hourly())
+
+
+async def fetch_cities_data_async(cities):
+    """Fetch many cities concurrently; returns {city: DataFrame or Exception}"""
+    results = await asyncio.gather(
+        *(fetch_city_data_async(city) for city in cities),
+        return_exceptions=True
+    )
+    return dict(zip(cities, results))
+
+
+async def fetch_cities_data_bulk_async(cities):
+    """Fetch many cities with one multi-location call per chunk; returns {city: DataFrame or Exception}"""
+    plan = plan_bulk_requests(cities)
+
+    async def fetch_chunk(chunk, params):
+        try:
+            with metrics.stage("fetch"):
+                responses = await get_client().weather_api(FORECAST_URL, params)
+            return decode_bulk_responses(chunk, responses)
+        except Exception as e:
+            return {city: e for city in chunk}
+
+    results = {}
+    for chunk_results in await asyncio.gather(*(fetch_chunk(chunk, params) for chunk, params in plan)):
+        results.update(chunk_results)
+    return results
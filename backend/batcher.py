@@ -0,0 +1,180 @@
+# backend/batcher.py
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BatcherQueueFull(Exception):
+    """Raised when the scheduler queue is at capacity"""
+
+
+class InferenceBatcher:
+    """Collects concurrent single-window requests and scores them as one batch.
+
+    A worker thread waits for the first queued window, then keeps collecting
+    until `max_batch_size` windows are queued or `max_wait_ms` has passed.
+    The stacked (N, seq_length, n_features) array goes through `predict_fn`
+    once and each caller's Future receives its own row of the result.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0, max_queue_size=1024):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue_size = max_queue_size
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._requests = 0
+        self._rejected = 0
+        self._batches = 0
+        self._max_batch_seen = 0
+        self._batch_sizes = deque(maxlen=1000)
+        self._wait_ms = deque(maxlen=1000)
+        self._inference_ms = deque(maxlen=1000)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Inference batcher started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait_ms}, max_queue_size={self.max_queue_size})"
+        )
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Fail anything still waiting so callers are not left hanging
+        while True:
+            try:
+                _, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._settle(future, error=RuntimeError("Inference batcher stopped"))
+
+    def submit(self, window):
+        """Queue one (seq_length, n_features) window and return a Future for its prediction"""
+        future = Future()
+        try:
+            self._queue.put_nowait((np.asarray(window, dtype=np.float32), future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise BatcherQueueFull(f"Inference queue is full ({self.max_queue_size} pending)")
+        with self._lock:
+            self._requests += 1
+        return future
+
+    def predict(self, window, timeout=None):
+        """Blocking helper for threadpool request handlers"""
+        return self.submit(window).result(timeout=timeout)
+
+    @staticmethod
+    def _settle(future, result=None, error=None):
+        """Resolve one caller's Future, skipping it if the caller gave up (cancelled it) meanwhile
+
+        Request handlers wait with a timeout, and a timed-out wait cancels the Future;
+        resolving it then would raise InvalidStateError and kill the worker thread.
+        """
+        try:
+            if future.done() or not future.set_running_or_notify_cancel():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except Exception as e:
+            logger.warning(f"Could not deliver a batched prediction: {e}")
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                # Inside the try: one window of the wrong shape fails its batch, not the worker
+                windows = np.stack([item[0] for item in batch])
+                preds = [float(pred) for pred in self.predict_fn(windows)]
+            except Exception as e:
+                logger.error(f"Batched inference failed for {len(batch)} requests: {e}")
+                for _, future, _ in batch:
+                    self._settle(future, error=e)
+                continue
+            finished = time.perf_counter()
+
+            for (_, future, _), pred in zip(batch, preds):
+                self._settle(future, result=pred)
+
+            with self._lock:
+                self._batches += 1
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+                self._batch_sizes.append(len(batch))
+                self._inference_ms.append((finished - started) * 1000.0)
+                self._wait_ms.extend((started - enqueued) * 1000.0 for _, _, enqueued in batch)
+
+    def stats(self):
+        with self._lock:
+            batch_sizes = np.array(self._batch_sizes) if self._batch_sizes else np.zeros(1)
+            wait_ms = np.array(self._wait_ms) if self._wait_ms else np.zeros(1)
+            inference_ms = np.array(self._inference_ms) if self._inference_ms else np.zeros(1)
+            return {
+                "settings": {
+                    "max_batch_size": self.max_batch_size,
+                    "max_wait_ms": self.max_wait_ms,
+                    "max_queue_size": self.max_queue_size,
+                },
+                "running": self._thread is not None and self._thread.is_alive(),
+                "queue_depth": self._queue.qsize(),
+                "requests_total": self._requests,
+                "rejected_total": self._rejected,
+                "batches_total": self._batches,
+                "batch_size": {
+                    "mean": round(float(batch_sizes.mean()), 2),
+                    "p50": float(np.percentile(batch_sizes, 50)),
+                    "max": self._max_batch_seen,
+                },
+                "queue_wait_ms": {
+                    "mean": round(float(wait_ms.mean()), 3),
+                    "p50": round(float(np.percentile(wait_ms, 50)), 3),
+                    "p99": round(float(np.percentile(wait_ms, 99)), 3),
+                },
+                "inference_ms": {
+                    "mean": round(float(inference_ms.mean()), 3),
+                    "p99": round(float(np.percentile(inference_ms, 99)), 3),
+                },
+            }
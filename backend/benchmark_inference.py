@@ -0,0 +1,324 @@
+# backend/benchmark_inference.py
+"""Microbenchmarks of each stage of the prediction path, with JSON baselines.
+
+Benchmarks (select with -k):
+    create_sequences      windows from a week of hourly rows
+    scaler.*              MinMaxScaler transform / inverse_transform as used by predict_temperatures
+    decode.*              FlatBuffers bytes to a DataFrame (default) or lean window, as in fetch_city_data
+    predict[runtime-bN]   one model call at batch sizes 1, 8, 64 and 512
+    ensemble.*            a registry ensemble against its members, batch sizes 1 and 64
+    handler.predict       the full /predict handler, upstream served by mock_openmeteo.py in-process
+
+Every benchmark is timed timeit-style: the loop count is raised until one round
+takes --min-round-ms, then --rounds rounds are timed; per-call statistics are
+reported in microseconds. `compare` flags benchmarks whose median and minimum
+both slowed down by more than --threshold and exits non-zero, so it can gate a
+change.
+
+This stays a script rather than a pytest-benchmark suite: the timings only mean
+something against a baseline recorded on the same machine, a run takes minutes
+and loads every exported runtime, and pytest-benchmark is not a dependency.
+tests/ checks correctness on every run; `compare` itself is covered by
+tests/test_benchmark_inference.py.
+
+Usage:
+    python benchmark_inference.py run --output benchmarks/baseline.json
+    python benchmark_inference.py run --compare benchmarks/baseline.json
+    python benchmark_inference.py run -k predict scaler --runtimes numpy onnx
+    python benchmark_inference.py compare benchmarks/baseline.json results.json --threshold 0.10
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmark_workers import free_port
+
+BATCH_SIZES = (1, 8, 64, 512)
+DEFAULT_RUNTIMES = ("numpy", "keras")
+ENSEMBLE_BATCH_SIZES = (1, 64)
+
+
+def _stats(per_call_s, loops):
+    per_call_us = sorted(t * 1e6 for t in per_call_s)
+    quartiles = statistics.quantiles(per_call_us, n=4) if len(per_call_us) > 1 else per_call_us * 3
+    return {
+        "median_us": round(statistics.median(per_call_us), 3),
+        "min_us": round(per_call_us[0], 3),
+        "mean_us": round(statistics.fmean(per_call_us), 3),
+        "stddev_us": round(statistics.stdev(per_call_us), 3) if len(per_call_us) > 1 else 0.0,
+        "iqr_us": round(quartiles[2] - quartiles[0], 3),
+        "rounds": len(per_call_us),
+        "loops": loops,
+    }
+
+
+def measure(fn, rounds, min_round_s):
+    """Per-call timings of `fn()` over `rounds` rounds of enough loops to last `min_round_s`"""
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_s:
+            break
+        loops *= 2 if elapsed <= 0 else min(max(int(min_round_s / elapsed * 1.2), 2), 10)
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - start) / loops)
+    return _stats(timings, loops)
+
+
+async def measure_async(fn, rounds, warmup=5):
+    """Per-call timings of `await fn(i)`, one call per round (handler calls are milliseconds long)"""
+    for i in range(warmup):
+        await fn(i)
+    timings = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        await fn(i)
+        timings.append(time.perf_counter() - start)
+    return _stats(timings, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    import numpy as np
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "commit": git_commit(),
+        "inference_engine": os.environ["INFERENCE_ENGINE"],
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def run_benchmarks(args):
+    """Returns {name: stats} for every selected benchmark"""
+    import joblib
+    import numpy as np
+    import requests
+
+    import mock_openmeteo
+    from async_fetcher import decode_responses
+    from data_fetcher import (
+        CITY_COORDS, FEATURES, FORECAST_URL, SEQ_LENGTH, build_city_params, hourly_to_frame, hourly_to_window,
+    )
+    from model_utils import create_sequences
+    from runtimes import RUNTIME_PATHS, load_runtime
+
+    results = {}
+
+    def selected(name):
+        return not args.k or any(pattern in name for pattern in args.k)
+
+    def record(name, stats):
+        results[name] = stats
+        print(f"{name:<34} {stats['median_us']:>12.2f} {stats['iqr_us']:>10.2f} {stats['min_us']:>12.2f} "
+              f"{stats['rounds']:>6} {stats['loops']:>7}", flush=True)
+
+    def bench(name, fn):
+        if selected(name):
+            record(name, measure(fn, args.rounds, args.min_round_ms / 1000.0))
+
+    print(f"{'benchmark':<34} {'median µs':>12} {'IQR µs':>10} {'min µs':>12} {'rounds':>6} {'loops':>7}")
+
+    server = mock_openmeteo.start_server(args.mock_port)
+    try:
+        # The exact bytes fetch_city_data decodes, for a week of hourly data
+        params = {**build_city_params("London"), "format": "flatbuffers"}
+        params.pop("start_hour", None)
+        params.pop("end_hour", None)
+        payload = requests.get(FORECAST_URL, params=params, timeout=10).content
+        hourly = decode_responses(payload)[0].Hourly()
+        week = hourly_to_frame(hourly)[FEATURES].values.astype(np.float32)
+
+        bench(f"create_sequences[{len(week)}h]", lambda: create_sequences(week, SEQ_LENGTH))
+
+        scaler = joblib.load(os.path.join(os.path.dirname(__file__), "models", "scaler_global.pkl"))
+        for batch in (1, 64):
+            rows = np.tile(week[:SEQ_LENGTH], (batch, 1))
+            padded = np.zeros((batch, len(FEATURES)))
+            bench(f"scaler.transform[b{batch}]", lambda rows=rows: scaler.transform(rows))
+            bench(f"scaler.inverse_transform[b{batch}]", lambda padded=padded: scaler.inverse_transform(padded))
+
+        bench("decode.frame", lambda: hourly_to_frame(decode_responses(payload)[0].Hourly()))
+        bench("decode.window", lambda: hourly_to_window(decode_responses(payload)[0].Hourly()))
+
+        rng = np.random.default_rng(0)
+        X = rng.random((max(BATCH_SIZES), SEQ_LENGTH, len(FEATURES)), dtype=np.float32)
+        for runtime in args.runtimes:
+            names = [f"predict[{runtime}-b{batch}]" for batch in BATCH_SIZES]
+            if not any(selected(name) for name in names):
+                continue
+            if not os.path.exists(RUNTIME_PATHS[runtime]):
+                print(f"⚠️ Skipping {runtime}: {RUNTIME_PATHS[runtime]} not exported")
+                continue
+            engine = load_runtime(runtime)
+            for name, batch in zip(names, BATCH_SIZES):
+                bench(name, lambda batch_X=X[:batch], engine=engine: engine.predict(batch_X))
+
+        if any(selected(f"ensemble.{kind}[") for kind in ("members", "parallel", "sequential")):
+            bench_ensemble(args.ensemble, X, bench)
+
+        if selected("handler.predict"):
+            record("handler.predict", asyncio.run(bench_handler(list(CITY_COORDS), args.rounds)))
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_ensemble(name, X, bench):
+    """Each member alone, then the ensemble with members in parallel and one after another"""
+    import numpy as np
+
+    import model_loader
+    from ensemble import EnsembleModel
+    from model_registry import ModelRegistry
+
+    registry = ModelRegistry(
+        os.path.join(os.path.dirname(__file__), "models", "registry.json"), model_loader.load_version
+    )
+    model = registry.get(name).ensemble
+    sequential = EnsembleModel(dict(zip(model.names, model.members)), model.city_weights, model.default_weights,
+                               parallel=False)
+    # Raw windows: the scaled test inputs mapped back through the shared scaler
+    scaler = model.members[0].scaler
+    raw = (X - scaler.min_.astype(np.float32)) / scaler.scale_.astype(np.float32)
+    for batch in ENSEMBLE_BATCH_SIZES:
+        windows = raw[:batch]
+        for member_name, member in zip(model.names, model.members):
+            bench(f"ensemble.members[{member_name}-b{batch}]",
+                  lambda windows=windows, member=member: member.predict_celsius(windows))
+        bench(f"ensemble.parallel[b{batch}]", lambda windows=windows: model.predict(windows))
+        bench(f"ensemble.sequential[b{batch}]", lambda windows=windows: sequential.predict(windows))
+
+
+async def bench_handler(cities, rounds):
+    """The /predict handler inside the app's lifespan, cycling through every city"""
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        main.ensure_model_ready()
+        return await measure_async(
+            lambda i: main.predict_weather(main.ForecastRequest(city=cities[i % len(cities)])), rounds
+        )
+
+
+def compare(baseline, current, threshold, report_missing=True):
+    """Print the median change per benchmark; returns the names that regressed beyond `threshold`"""
+    regressions = []
+    for key in ("machine", "cpu_count", "python", "numpy"):
+        if baseline["environment"].get(key) != current["environment"].get(key):
+            print(f"⚠️ {key} differs: {baseline['environment'].get(key)} (baseline) vs "
+                  f"{current['environment'].get(key)}; timings may not be comparable")
+
+    print(f"\n{'benchmark':<34} {'baseline µs':>12} {'current µs':>12} {'change':>8}")
+    for name, stats in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            print(f"{name:<34} {'-':>12} {stats['median_us']:>12.2f} {'new':>8}")
+            continue
+        change = stats["median_us"] / base["median_us"] - 1.0
+        # The minimum must have moved too, so one noisy run on a busy machine does not fail the gate
+        if change > threshold and stats["min_us"] / base["min_us"] - 1.0 > threshold:
+            flag = "❌ regression"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "✅ faster"
+        else:
+            flag = ""
+        print(f"{name:<34} {base['median_us']:>12.2f} {stats['median_us']:>12.2f} {change:>+8.1%} {flag}")
+    missing = sorted(baseline["benchmarks"].keys() - current["benchmarks"].keys()) if report_missing else []
+    for name in missing:
+        print(f"{name:<34} {baseline['benchmarks'][name]['median_us']:>12.2f} {'-':>12} {'missing':>8}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) slower than baseline by more than {threshold:.0%}")
+    else:
+        print(f"\n✅ No benchmark slower than baseline by more than {threshold:.0%}")
+    return regressions
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmarks")
+    run.add_argument("-k", nargs="+", metavar="PATTERN", help="Only benchmarks whose name contains a pattern")
+    run.add_argument("--runtimes", nargs="+", default=list(DEFAULT_RUNTIMES), help="Runtimes for predict[...]")
+    run.add_argument("--engine", default="numpy", help="INFERENCE_ENGINE for handler.predict")
+    run.add_argument("--ensemble", default="1.0.0-ensemble", help="Registry ensemble for ensemble.*")
+    run.add_argument("--rounds", type=int, default=50)
+    run.add_argument("--min-round-ms", type=float, default=20.0, help="Minimum duration of one timed round")
+    run.add_argument("--mock-port", type=int, help="Port of the in-process Open-Meteo mock (default: any free port)")
+    run.add_argument("--output", help="Write results as JSON, e.g. a new baseline")
+    run.add_argument("--compare", metavar="BASELINE", help="Compare against a baseline JSON afterwards")
+    run.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown of the median (0.10 = 10%%)")
+
+    cmp = commands.add_parser("compare", help="Compare two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown of the median (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        regressions = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    # Everything below imports data_fetcher, which reads the upstream URL at import time
+    args.mock_port = args.mock_port or free_port()
+    os.environ["OPENMETEO_BASE_URL"] = f"http://127.0.0.1:{args.mock_port}/v1"
+    os.environ["INFERENCE_ENGINE"] = args.engine
+    for key, value in {
+        "PREDICTION_CACHE_ENABLED": "False",
+        "REFRESH_ENABLED": "False",
+        "MODEL_LOAD_BACKGROUND": "False",
+        "LOG_LEVEL": "WARNING",
+    }.items():
+        os.environ.setdefault(key, value)
+
+    current = {"environment": environment(), "benchmarks": run_benchmarks(args)}
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    if args.compare:
+        # With -k the unselected benchmarks are expected to be missing
+        regressions = compare(load_results(args.compare), current, args.threshold, report_missing=not args.k)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# backend/benchmark_runtimes.py
+"""Compare serving runtimes on per-city accuracy, latency and memory.
+
+Every runtime is loaded in its own fresh process, so RSS reflects that runtime
+alone. Accuracy is next-hour temperature MAE per city on windows cut from the
+Open-Meteo hourly series, reported like tuning_vs_baseline_results.csv, with
+Keras as the baseline.
+
+Usage:
+    python benchmark_runtimes.py
+    python benchmark_runtimes.py --runtimes keras numpy onnx --output runtime_comparison_results.csv
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from model_registry import rss_mb
+from runtimes import RUNTIME_PATHS, load_runtime
+
+
+def evaluation_windows(cities, features, seq_length):
+    """Raw (N, seq_length, n_features) windows and next-hour temperatures per city"""
+    from data_fetcher import fetch_cities_data
+    from model_utils import create_sequences
+
+    data = {}
+    for city, frame in fetch_cities_data(cities).items():
+        if isinstance(frame, Exception):
+            print(f"⚠️ Skipping {city}: {frame}")
+            continue
+        values = frame[features].values.astype(np.float32)
+        windows = create_sequences(values[:-1], seq_length)
+        data[city] = (windows, values[seq_length:, 0])
+    return data
+
+
+def _percentiles(timings):
+    timings = np.array(timings)
+    return {"p50": float(np.percentile(timings, 50)), "p99": float(np.percentile(timings, 99))}
+
+
+def run_runtime(name, X, runs):
+    """Runs in a child process: load one runtime, time it and score every window"""
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    engine = load_runtime(name)
+    load_ms = (time.perf_counter() - start) * 1000.0
+    engine.predict(X[:1])
+
+    single, batch = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        engine.predict(X[:1])
+        single.append((time.perf_counter() - start) * 1000.0)
+    batch_X = X[:32]
+    for _ in range(runs):
+        start = time.perf_counter()
+        engine.predict(batch_X)
+        batch.append((time.perf_counter() - start) * 1000.0)
+
+    predictions = np.asarray(engine.predict(X))[:, 0]
+    return {
+        "load_ms": load_ms,
+        "rss_mb": rss_mb(),
+        "rss_delta_mb": rss_mb() - rss_before,
+        "batch1_ms": _percentiles(single),
+        "batch32_ms": _percentiles(batch),
+        "predictions": predictions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runtimes", nargs="+", choices=list(RUNTIME_PATHS), default=list(RUNTIME_PATHS))
+    parser.add_argument("--cities", nargs="+", help="Default: every supported city")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--output", default="runtime_comparison_results.csv")
+    parser.add_argument("--save-calibration", help="Also save the scaled windows as .npy for export_runtimes.py")
+    args = parser.parse_args()
+
+    import joblib
+    import pandas as pd
+    from data_fetcher import CITY_COORDS, FEATURES, SEQ_LENGTH
+
+    scaler = joblib.load(os.path.join(os.path.dirname(__file__), "models", "scaler_global.pkl"))
+    data = evaluation_windows(args.cities or list(CITY_COORDS), FEATURES, SEQ_LENGTH)
+    if not data:
+        raise SystemExit("No evaluation data fetched")
+
+    cities = list(data)
+    raw = np.concatenate([data[city][0] for city in cities])
+    targets = np.concatenate([data[city][1] for city in cities])
+    city_index = np.concatenate([[i] * len(data[city][0]) for i, city in enumerate(cities)])
+
+    # Scaled once with the scaler's affine constants, shared by every runtime
+    scale, offset = scaler.scale_.astype(np.float32), scaler.min_.astype(np.float32)
+    X = raw * scale + offset
+    if args.save_calibration:
+        np.save(args.save_calibration, X)
+        print(f"Saved {len(X)} calibration windows to {args.save_calibration}")
+
+    results = {}
+    for name in args.runtimes:
+        if not os.path.exists(RUNTIME_PATHS[name]):
+            print(f"⚠️ Skipping {name}: {RUNTIME_PATHS[name]} not exported")
+            continue
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            try:
+                result = pool.submit(run_runtime, name, X, args.runs).result()
+            except Exception as e:
+                print(f"⚠️ Skipping {name}: {e}")
+                continue
+        result["celsius"] = (result["predictions"] - offset[0]) / scale[0]
+        results[name] = result
+
+    baseline = "keras" if "keras" in results else next(iter(results))
+    rows = []
+    for i, city in enumerate(cities):
+        mask = city_index == i
+        row = {"City": city}
+        base_mae = float(np.abs(results[baseline]["celsius"][mask] - targets[mask]).mean())
+        row[f"MAE ({baseline})"] = base_mae
+        for name, result in results.items():
+            if name == baseline:
+                continue
+            mae = float(np.abs(result["celsius"][mask] - targets[mask]).mean())
+            row[f"MAE ({name})"] = mae
+            row[f"Δ MAE ({name})"] = mae - base_mae
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(args.output, index=False)
+    print(f"✅ Per-city MAE written to {args.output}")
+
+    print(f"\n{'runtime':<12} {'size KB':>8} {'MAE °C':>7} {'max Δ°C':>8} {'b1 p50':>7} {'b1 p99':>7} "
+          f"{'b32 p50':>8} {'load ms':>8} {'RSS MB':>7}")
+    for name, result in results.items():
+        mae = float(np.abs(result["celsius"] - targets).mean())
+        drift = float(np.abs(result["celsius"] - results[baseline]["celsius"]).max())
+        print(
+            f"{name:<12} {os.path.getsize(RUNTIME_PATHS[name]) / 1024:>8.0f} {mae:>7.3f} {drift:>8.3f} "
+            f"{result['batch1_ms']['p50']:>7.3f} {result['batch1_ms']['p99']:>7.3f} "
+            f"{result['batch32_ms']['p50']:>8.3f} {result['load_ms']:>8.0f} {result['rss_mb']:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
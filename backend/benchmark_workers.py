@@ -0,0 +1,162 @@
+# backend/benchmark_workers.py
+"""Measure memory per gunicorn worker with and without a preloaded, shared model.
+
+Each scenario starts `gunicorn -c gunicorn.conf.py main:app` with N workers,
+waits for /health/ready, then reads /proc/<pid>/smaps_rollup for the master
+and every worker (Linux only). RSS counts shared pages once per process and so
+over-states the total; PSS splits each shared page between the processes
+mapping it, so the PSS column sums to the real footprint. USS is what a
+worker alone holds: the memory freed if it exited.
+
+Usage:
+    python benchmark_workers.py
+    python benchmark_workers.py --workers 4 --scenarios numpy numpy-preload numpy-preload-mmap keras
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# Environment overrides per scenario, on top of REFRESH_ENABLED=False so no worker fetches upstream data
+SCENARIOS = {
+    "numpy": {"INFERENCE_ENGINE": "numpy", "MODEL_PRELOAD": "False"},
+    "numpy-mmap": {"INFERENCE_ENGINE": "numpy", "MODEL_PRELOAD": "False", "NUMPY_WEIGHTS_MMAP": "True"},
+    "numpy-preload": {"INFERENCE_ENGINE": "numpy", "MODEL_PRELOAD": "True"},
+    "numpy-preload-mmap": {"INFERENCE_ENGINE": "numpy", "MODEL_PRELOAD": "True", "NUMPY_WEIGHTS_MMAP": "True"},
+    "keras": {"INFERENCE_ENGINE": "keras", "MODEL_PRELOAD": "False"},
+}
+
+
+def smaps_rollup(pid):
+    """RSS, PSS and USS of one process in MB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024.0
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the parent pid is the second field after it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url, workers, timeout_s):
+    """Until `workers` * 4 readiness checks in a row succeed, so each worker has likely answered one"""
+    deadline = time.monotonic() + timeout_s
+    streak = 0
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                streak = streak + 1 if response.status == 200 else 0
+        except (urllib.error.URLError, ConnectionError, OSError):
+            streak = 0
+        if streak >= workers * 4:
+            return True
+        time.sleep(0.1 if streak else 0.5)
+    return False
+
+
+def run_scenario(name, workers, timeout_s, settle_s, requests, path):
+    port = free_port()
+    env = {
+        **os.environ,
+        **SCENARIOS[name],
+        "WEB_CONCURRENCY": str(workers),
+        "API_HOST": "127.0.0.1",
+        "PORT": str(port),
+        "REFRESH_ENABLED": "False",
+        "LOG_LEVEL": "WARNING",
+    }
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    log = tempfile.TemporaryFile(mode="w+")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=backend_dir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    try:
+        if not wait_ready(f"http://127.0.0.1:{port}/health/ready", workers, timeout_s):
+            log.seek(0)
+            tail = "".join(log.readlines()[-5:])
+            raise RuntimeError(f"not ready after {timeout_s:.0f}s\n{tail}")
+        # Touch the serving path so the measured pages include what requests use
+        for _ in range(requests):
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=30).read()
+            except urllib.error.URLError:
+                pass
+        time.sleep(settle_s)
+        master = smaps_rollup(process.pid)
+        worker_stats = [smaps_rollup(pid) for pid in child_pids(process.pid)]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+    return master, worker_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for readiness")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait before measuring")
+    parser.add_argument("--requests", type=int, default=0, help="Requests to send to --path before measuring")
+    parser.add_argument("--path", default="/health")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("smaps_rollup is not available (Linux 4.14+ only)")
+
+    print(f"{'scenario':<20} {'workers':>7} {'master PSS':>10} {'worker USS':>10} {'worker PSS':>10} "
+          f"{'total PSS':>9} {'total RSS':>9}")
+    for name in args.scenarios:
+        try:
+            master, workers = run_scenario(name, args.workers, args.timeout, args.settle, args.requests, args.path)
+        except Exception as e:
+            print(f"⚠️ Skipping {name}: {e}")
+            continue
+        processes = [master, *workers]
+        print(
+            f"{name:<20} {len(workers):>7} {master['pss']:>10.1f} "
+            f"{sum(w['uss'] for w in workers) / len(workers):>10.1f} "
+            f"{sum(w['pss'] for w in workers) / len(workers):>10.1f} "
+            f"{sum(p['pss'] for p in processes):>9.1f} {sum(p['rss'] for p in processes):>9.1f}"
+        )
+    print("All values in MB; worker columns are per-worker means.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# backend/broadcaster.py
+"""Server-Sent Events fan-out of refreshed predictions.
+
+The hourly refresher hands every new prediction to `publish`, which encodes it
+into an SSE frame once. Each subscriber only gets a reference to those bytes, so
+serving thousands of connections costs no inference and no per-client
+serialization. A subscriber keeps at most one pending frame per city: a client
+that reads slowly skips to the newest prediction instead of building a backlog.
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TooManySubscribers(Exception):
+    """Raised by `subscribe` when the broadcaster is at `max_subscribers`"""
+
+
+def encode_event(event_id, event, data):
+    """One SSE frame; `data` is a JSON string and must not contain newlines"""
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+class Subscription:
+    """Pending frames of one connection, keyed by city so newer frames replace older ones"""
+
+    def __init__(self, cities=None):
+        # None follows every city
+        self.cities = cities
+        self._pending = {}
+        self._ready = asyncio.Event()
+
+    def push(self, city, frame):
+        self._pending[city] = frame
+        self._ready.set()
+
+    async def next_frames(self, timeout=None):
+        """Wait up to `timeout` seconds for frames; returns them in publish order ([] on timeout)"""
+        if not self._pending:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        frames = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        return frames
+
+
+class PredictionBroadcaster:
+    """Latest prediction per city plus the subscriptions to push new ones to.
+
+    `publish` and `subscribe` must run on the event loop thread (the refresher
+    calls `on_result` there), so no locking is needed.
+    """
+
+    def __init__(self, max_subscribers=10000, heartbeat_s=15.0):
+        self.max_subscribers = max_subscribers
+        self.heartbeat_s = heartbeat_s
+        self._subscriptions = set()
+        self._latest = {}
+        self._last_id = 0
+        self._published = 0
+        self._queued = 0
+        self._rejected = 0
+
+    def _next_id(self):
+        # Millisecond wall clock, so a client reconnecting to another worker can still resume
+        self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+        return self._last_id
+
+    def publish(self, city, result):
+        """Encode `result` (a pydantic model) once and queue it for every subscriber of `city`"""
+        event_id = self._next_id()
+        frame = encode_event(event_id, "prediction", result.model_dump_json())
+        self._latest[city] = (event_id, frame)
+        self._published += 1
+        for subscription in self._subscriptions:
+            if subscription.cities is None or city in subscription.cities:
+                subscription.push(city, frame)
+                self._queued += 1
+
+    def check_capacity(self):
+        """Raise TooManySubscribers when a new connection would exceed `max_subscribers`"""
+        if len(self._subscriptions) >= self.max_subscribers:
+            self._rejected += 1
+            raise TooManySubscribers(f"Prediction stream is at its limit of {self.max_subscribers} subscribers")
+
+    def subscribe(self, cities=None, last_event_id=None):
+        """New Subscription preloaded with the latest frame of each city newer than `last_event_id`"""
+        subscription = Subscription(cities)
+        replay = sorted(
+            (event_id, city, frame) for city, (event_id, frame) in self._latest.items()
+            if (cities is None or city in cities) and (last_event_id is None or event_id > last_event_id)
+        )
+        for _, city, frame in replay:
+            subscription.push(city, frame)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.discard(subscription)
+
+    async def stream(self, cities=None, last_event_id=None):
+        """Async iterator of SSE bytes for one connection, with comment heartbeats when idle
+
+        The subscription is made on the first iteration, so a response that is
+        never started cannot leave one behind.
+        """
+        subscription = self.subscribe(cities, last_event_id)
+        try:
+            # Sets the client's reconnect delay and flushes headers before the first prediction
+            yield f"retry: {int(self.heartbeat_s * 1000)}\n\n".encode()
+            while True:
+                frames = await subscription.next_frames(self.heartbeat_s)
+                # Heartbeats keep proxies from closing idle connections and reveal dead clients
+                yield b"".join(frames) if frames else b": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscriptions),
+            "max_subscribers": self.max_subscribers,
+            "cities": len(self._latest),
+            "published": self._published,
+            "queued": self._queued,
+            "rejected": self._rejected,
+            "last_event_id": self._last_id or None,
+        }
+
+
+def parse_event_id(value):
+    """Last-Event-ID header as an int, None when absent or not one of ours"""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        logger.debug(f"Ignoring Last-Event-ID {value!r}")
+        return None
+
+
+def city_filter(values, known):
+    """Cities from repeated/comma-separated query values; None (all) when empty. Raises ValueError on unknown"""
+    cities = {name.strip() for value in values or () for name in value.split(",") if name.strip()}
+    unknown = sorted(cities - set(known))
+    if unknown:
+        raise ValueError(f"Unknown cities: {', '.join(unknown)}")
+    return cities or None
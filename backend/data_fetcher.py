@@ -2,9 +2,31 @@ import openmeteo_requests
 import requests_cache
 from retry_requests import retry
 import pandas as pd
+import numpy as np
+import os
+import zoneinfo
+from datetime import datetime, timedelta
+
+import metrics
+
+FORECAST_URL = os.getenv("OPENMETEO_BASE_URL", "https://api.open-meteo.com/v1").rstrip("/") + "/forecast"
+
+# Multi-location requests: "location" sends one timezone per city in a single call,
+# "timezone" issues one call per timezone, "utc" normalizes every city to GMT
+BULK_FETCH_GROUPING = os.getenv("BULK_FETCH_GROUPING", "location").lower()
+BULK_FETCH_CHUNK_SIZE = int(os.getenv("BULK_FETCH_CHUNK_SIZE", 50))
+
+# Lean mode requests only the hours the model consumes (the last SEQ_LENGTH hours of
+# the default 7-day forecast) and decodes them straight into a float32 (SEQ_LENGTH, n_features) window
+SEQ_LENGTH = 6
+# Open-Meteo's default hourly response: 7 days starting at local midnight
+FORECAST_DAYS = 7
+LEAN_FETCH = os.getenv("LEAN_FETCH", "False").lower() == "true"
+LEAN_FETCH_MARGIN_HOURS = int(os.getenv("LEAN_FETCH_MARGIN_HOURS", 2))
 
 # Setup session
 cache_session = requests_cache.CachedSession('.cache', expire_after=3600)
+cache_session.hooks["response"].append(metrics.record_upstream_cache)
 retry_session = retry(cache_session, retries=3, backoff_factor=0.3)
 client = openmeteo_requests.Client(session=retry_session)
 
@@ -43,21 +65,41 @@ CITY_COORDS = {
 }
 
 
-def fetch_city_data(city):
+def build_city_params(city):
     if city not in CITY_COORDS:
         raise ValueError(f"{city} not found.")
-    
+
     lat, lon, timezone = CITY_COORDS[city]
-    params = {
+    return {
         "latitude": lat,
         "longitude": lon,
         "hourly": ",".join(FEATURES),
-        "timezone": timezone
+        "timezone": timezone,
+        **lean_params(timezone)
     }
-    responses = client.weather_api("https://api.open-meteo.com/v1/forecast", params=params)
-    response = responses[0]
-    hourly = response.Hourly()
 
+
+def lean_params(timezone):
+    """Hour limits for lean mode, in the location's local time.
+
+    The window is the one the default path ends up using: the last SEQ_LENGTH
+    hours of the default forecast (local midnight today + FORECAST_DAYS), plus
+    a few spare earlier hours in case some rows are NaN.
+    """
+    if not LEAN_FETCH:
+        return {}
+    tz = zoneinfo.ZoneInfo("UTC" if timezone == "GMT" else timezone)
+    midnight = datetime.combine(datetime.now(tz).date(), datetime.min.time())
+    end = midnight + timedelta(days=FORECAST_DAYS, hours=-1)
+    start = end - timedelta(hours=SEQ_LENGTH - 1 + LEAN_FETCH_MARGIN_HOURS)
+    return {
+        "start_hour": start.strftime("%Y-%m-%dT%H:%M"),
+        "end_hour": end.strftime("%Y-%m-%dT%H:%M")
+    }
+
+
+def hourly_to_frame(hourly):
+    """Decode the hourly block of a WeatherApiResponse into a DataFrame of FEATURES"""
     df = {
         "date": pd.date_range(
             start=pd.to_datetime(hourly.Time(), unit="s", utc=True),
@@ -70,3 +112,101 @@ def fetch_city_data(city):
         df[var] = hourly.Variables(i).ValuesAsNumpy()
     df = pd.DataFrame(df)
     return df.dropna().reset_index(drop=True)
+
+
+def hourly_to_window(hourly, seq_length=SEQ_LENGTH):
+    """Decode the hourly block straight into the last `seq_length` complete rows, no pandas"""
+    n_hours = hourly.Variables(0).ValuesLength()
+    values = np.empty((n_hours, len(FEATURES)), dtype=np.float32)
+    for i in range(len(FEATURES)):
+        values[:, i] = hourly.Variables(i).ValuesAsNumpy()
+
+    # Same rule as dropna(): a row with any missing feature is skipped
+    complete = values[~np.isnan(values).any(axis=1)]
+    if len(complete) < seq_length:
+        raise ValueError(f"Need {seq_length} complete hourly rows, got {len(complete)}")
+    return complete[-seq_length:]
+
+
+@metrics.timed("decode")
+def decode_hourly(hourly):
+    """Window array in lean mode, DataFrame otherwise; build_input_windows accepts both"""
+    if LEAN_FETCH:
+        return hourly_to_window(hourly)
+    return hourly_to_frame(hourly)
+
+
+def fetch_city_data(city):
+    params = build_city_params(city)
+    with metrics.stage("fetch"):
+        responses = client.weather_api(FORECAST_URL, params=params)
+    return decode_hourly(responses[0].Hourly())
+
+
+def plan_bulk_requests(cities, grouping=BULK_FETCH_GROUPING, chunk_size=BULK_FETCH_CHUNK_SIZE):
+    """Split cities into multi-location requests; returns [(cities, params), ...]"""
+    for city in cities:
+        if city not in CITY_COORDS:
+            raise ValueError(f"{city} not found.")
+
+    if grouping == "timezone":
+        groups = {}
+        for city in cities:
+            groups.setdefault(CITY_COORDS[city][2], []).append(city)
+        groups = list(groups.values())
+    elif grouping in ("location", "utc"):
+        groups = [list(cities)]
+    else:
+        raise ValueError(f"Unknown bulk fetch grouping: {grouping}")
+
+    def request_timezone(city):
+        return "GMT" if grouping == "utc" else CITY_COORDS[city][2]
+
+    if LEAN_FETCH:
+        # Lean hour limits are local times shared by every location of a request,
+        # so only cities on the same local date can go together
+        split = []
+        for group in groups:
+            windows = {}
+            for city in group:
+                windows.setdefault(tuple(lean_params(request_timezone(city)).values()), []).append(city)
+            split.extend(windows.values())
+        groups = split
+
+    requests = []
+    for group in groups:
+        for start in range(0, len(group), chunk_size):
+            chunk = group[start:start + chunk_size]
+            coords = [CITY_COORDS[city] for city in chunk]
+            if grouping == "utc":
+                timezones = "GMT"
+            else:
+                timezones = ",".join(tz for _, _, tz in coords)
+            requests.append((chunk, {
+                "latitude": ",".join(str(lat) for lat, _, _ in coords),
+                "longitude": ",".join(str(lon) for _, lon, _ in coords),
+                "hourly": ",".join(FEATURES),
+                "timezone": timezones,
+                **lean_params(request_timezone(chunk[0]))
+            }))
+    return requests
+
+
+def decode_bulk_responses(chunk, responses):
+    """Map one multi-location response list back onto its cities"""
+    if len(responses) != len(chunk):
+        raise ValueError(f"Expected {len(chunk)} locations in response, got {len(responses)}")
+    return {city: decode_hourly(response.Hourly()) for city, response in zip(chunk, responses)}
+
+
+def fetch_cities_data(cities):
+    """Fetch many cities with one Open-Meteo call per chunk; returns {city: DataFrame or Exception}"""
+    results = {}
+    for chunk, params in plan_bulk_requests(cities):
+        try:
+            with metrics.stage("fetch"):
+                responses = client.weather_api(FORECAST_URL, params=params)
+            results.update(decode_bulk_responses(chunk, responses))
+        except Exception as e:
+            results.update({city: e for city in chunk})
+    return results
@@ -0,0 +1,185 @@
+# backend/ensemble.py
+"""Weighted ensembles of registry model versions.
+
+An ensemble is a registry entry with `"engine": "ensemble"`, a list of member
+versions and a weights file. Every member scores the same batched windows, in
+parallel on a small thread pool (NumPy, TensorFlow, TFLite and ONNX Runtime
+release the GIL), and the outputs are averaged with per-city weights learned
+from backtest errors. Cities without weights use the weights of the mean error.
+
+Build the weights file from a backtest CSV (one `MAE (<label>)` column per member):
+    python ensemble.py ../tuning_vs_baseline_results.csv --member 1.0.0=Baseline \
+        --member 1.1.0-tuned=Tuned --output models/ensemble_weights.json
+"""
+import argparse
+import contextvars
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+
+ENSEMBLE_PARALLEL = os.getenv("ENSEMBLE_PARALLEL", "True").lower() == "true"
+
+
+def inverse_error_weights(errors, power=1.0):
+    """Weights proportional to error ** -power along the last axis, summing to 1"""
+    inverse = np.asarray(errors, dtype=np.float64) ** -power
+    return inverse / inverse.sum(axis=-1, keepdims=True)
+
+
+def load_weights(path, members):
+    """Per-city (M,) weight arrays in `members` order, plus the default for other cities"""
+    with open(path) as f:
+        data = json.load(f)
+
+    def row(entry):
+        missing = [name for name in members if name not in entry]
+        if missing:
+            raise ValueError(f"{path} has no weight for {', '.join(missing)}")
+        weights = np.array([entry[name] for name in members], dtype=np.float64)
+        return weights / weights.sum()
+
+    return {city: row(entry) for city, entry in data["cities"].items()}, row(data["default"])
+
+
+def sample_counts(weights, samples):
+    """Split `samples` draws across members by (N, M) weights; every row sums to exactly `samples`
+
+    Largest-remainder rounding, so each city's draws follow its own weights as
+    closely as whole draws allow.
+    """
+    exact = np.atleast_2d(weights) * samples
+    counts = np.floor(exact).astype(int)
+    remainders = exact - counts
+    for row, short in enumerate(samples - counts.sum(axis=1)):
+        counts[row, np.argsort(-remainders[row], kind="stable")[:short]] += 1
+    return counts
+
+
+class EnsembleModel:
+    """Members are registry ModelVersions sharing one input format (raw windows in, °C out)"""
+
+    def __init__(self, members, city_weights, default_weights, parallel=ENSEMBLE_PARALLEL):
+        self.names = list(members)
+        self.members = [members[name] for name in self.names]
+        self.city_weights = city_weights
+        self.default_weights = default_weights
+        self._pool = ThreadPoolExecutor(len(self.members), thread_name_prefix="ensemble") if parallel else None
+
+    def weights(self, cities=None):
+        """(N, M) weights for `cities`, or the default (M,) weights when no cities are given"""
+        if cities is None:
+            return self.default_weights
+        return np.stack([self.city_weights.get(city, self.default_weights) for city in cities])
+
+    def _run(self, calls):
+        """Run one zero-argument call per member, in parallel unless ENSEMBLE_PARALLEL is off"""
+        pool = self._pool
+        if pool is None:
+            return [call() for call in calls]
+        try:
+            # One context copy per task: metrics stages and profiling spans follow each call
+            futures = [pool.submit(contextvars.copy_context().run, call) for call in calls]
+        except RuntimeError:
+            # Closed by the registry while this request still held the version
+            return [call() for call in calls]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Stop the member thread pool; calls still in flight finish, later ones run serially"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def predict(self, windows, cities=None):
+        """Combined °C per window plus the (M, N) member predictions and their weighted spread"""
+        members = np.stack(self._run([partial(member.predict_celsius, windows) for member in self.members]))
+        weights = self.weights(cities)
+        weights = np.broadcast_to(weights, (members.shape[1], len(self.members))).T
+        combined = (weights * members).sum(axis=0)
+        spread = np.sqrt((weights * (members - combined) ** 2).sum(axis=0))
+        return {
+            "prediction": combined, "names": self.names, "members": members, "weights": weights, "spread": spread,
+        }
+
+    def predict_celsius(self, windows):
+        """ModelVersion interface: combined °C with the default weights"""
+        return self.predict(windows)["prediction"]
+
+    def predict_scaled(self, X):
+        """ModelVersion interface for rollouts: members' scaled outputs, combined with the default weights"""
+        scalers = [member.scaler for member in self.members]
+        if any(not np.array_equal(s.scale_, scalers[0].scale_) or not np.array_equal(s.min_, scalers[0].min_)
+               for s in scalers[1:]):
+            raise ValueError(f"Ensemble members {', '.join(self.names)} use different scalers")
+        members = np.stack(self._run([partial(member.predict, X) for member in self.members]))
+        return np.tensordot(self.default_weights, members, axes=1)
+
+    @property
+    def can_sample(self):
+        return all(member.sample_celsius is not None for member in self.members)
+
+    def sample_celsius(self, windows, samples, cities=None):
+        """(samples, N) MC-dropout draws from the mixture of members, weighted per city like `predict`.
+
+        Pooling the members' draws keeps both each member's own spread and the
+        disagreement between members in the result.
+        """
+        weights = np.broadcast_to(self.weights(cities), (len(windows), len(self.members)))
+        counts = sample_counts(weights, samples)
+        # Each member draws as often as its largest share needs; every city takes its own share
+        most = counts.max(axis=0)
+        drawing = [m for m in range(len(self.members)) if most[m] > 0]
+        draws = dict(zip(drawing, self._run([
+            partial(self.members[m].sample_celsius, windows, int(most[m])) for m in drawing
+        ])))
+        out = np.empty((samples, len(windows)))
+        for n in range(len(windows)):
+            out[:, n] = np.concatenate([draws[m][:counts[n, m], n] for m in drawing])
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build per-city ensemble weights from backtest errors")
+    parser.add_argument("results", help="Backtest CSV with a City column and one '<metric> (<label>)' column per member")
+    parser.add_argument("--member", action="append", required=True, metavar="VERSION=LABEL",
+                        help="Registry version and its column label, e.g. 1.1.0-tuned=Tuned; repeatable")
+    parser.add_argument("--metric", default="MAE")
+    parser.add_argument("--power", type=float, default=1.0, help="Weights are proportional to error ** -power")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "models", "ensemble_weights.json"))
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    members = dict(item.split("=", 1) for item in args.member)
+    results = pd.read_csv(args.results)
+    columns = [f"{args.metric} ({label})" for label in members.values()]
+    missing = [column for column in columns if column not in results.columns]
+    if missing:
+        raise SystemExit(f"❌ {args.results} has no column {', '.join(missing)}")
+
+    errors = results[columns].to_numpy()
+    city_weights = inverse_error_weights(errors, args.power)
+    default_weights = inverse_error_weights(errors.mean(axis=0), args.power)
+    weights = {
+        "source": os.path.basename(args.results),
+        "metric": args.metric,
+        "power": args.power,
+        "members": list(members),
+        "default": dict(zip(members, default_weights.round(6).tolist())),
+        "cities": {
+            city: dict(zip(members, row.round(6).tolist()))
+            for city, row in zip(results["City"], city_weights)
+        },
+    }
+    with open(args.output, "w") as f:
+        json.dump(weights, f, indent=2, ensure_ascii=False)
+    print(f"✅ Weights for {len(results)} cities and {len(members)} members written to {args.output}")
+    for name, weight in weights["default"].items():
+        print(f"   default {name}: {weight:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# backend/export.py
+"""Columnar bulk export of predictions and input history as Arrow IPC or Parquet.
+
+Columns are built from the NumPy arrays the backend already holds: float32
+predictions, the (N, seq_length, n_features) model windows and the decoded
+hourly frames. pyarrow wraps those buffers as columns without copying them.
+The writers emit into a sink that is drained after every record batch, so the
+response is streamed (chunked transfer encoding) instead of being assembled in
+memory. Draining joins the batch's buffers into one `bytes` chunk, which is a
+copy per batch: ASGI response bodies must be `bytes`.
+pyarrow is only imported when an export is requested.
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+# Rows per Arrow IPC message (larger batches are split) and minimum rows per Parquet row group
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", 4096))
+# Parquet codec ("none" turns compression off); Arrow IPC is always written uncompressed
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "snappy")
+
+# format -> (media type, file extension)
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _float32(values):
+    """float32 Arrow array; NaN and None become nulls, a NaN-free float32 array is wrapped as is"""
+    import pyarrow as pa
+
+    if isinstance(values, list):
+        values = [np.nan if value is None else value for value in values]
+    values = np.asarray(values, dtype=np.float32)
+    mask = np.isnan(values)
+    return pa.array(values, mask=mask if mask.any() else None)
+
+
+def predictions_schema(features=None, seq_length=None):
+    """Schema of the predictions export; with `features`, a `window` column holds each model input"""
+    import pyarrow as pa
+
+    fields = [
+        pa.field("city", pa.string(), nullable=False),
+        pa.field("model_version", pa.string(), nullable=False),
+        pa.field("timestamp", pa.timestamp("us")),
+        pa.field("predicted_temperature", pa.float32(), nullable=False),
+        pa.field("confidence", pa.float32()),
+        pa.field("uncertainty_std", pa.float32()),
+        pa.field("uncertainty_lower", pa.float32()),
+        pa.field("uncertainty_upper", pa.float32()),
+    ]
+    if features is not None:
+        fields.append(pa.field("window", pa.list_(pa.list_(pa.float32(), len(features)), seq_length)))
+    return pa.schema(fields)
+
+
+def predictions_batch(responses, schema, windows=None):
+    """One RecordBatch from WeatherResponse objects and, optionally, their (N, T, F) float32 windows"""
+    import pyarrow as pa
+
+    uncertainties = [response.uncertainty for response in responses]
+    arrays = [
+        pa.array([response.city for response in responses], pa.string()),
+        pa.array([response.model_version for response in responses], pa.string()),
+        pa.array(np.array([response.timestamp for response in responses], dtype="datetime64[us]")),
+        _float32([response.predicted_temperature for response in responses]),
+        _float32([response.confidence for response in responses]),
+        _float32([u.std if u is not None else None for u in uncertainties]),
+        _float32([u.lower if u is not None else None for u in uncertainties]),
+        _float32([u.upper if u is not None else None for u in uncertainties]),
+    ]
+    if windows is not None:
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        n, seq_length, n_features = windows.shape
+        # Nested fixed-size lists over the flat buffer: no copy of the window values
+        rows = pa.FixedSizeListArray.from_arrays(pa.array(windows.reshape(-1)), n_features)
+        arrays.append(pa.FixedSizeListArray.from_arrays(rows, seq_length))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def history_schema(features):
+    import pyarrow as pa
+
+    return pa.schema(
+        [pa.field("city", pa.string(), nullable=False), pa.field("date", pa.timestamp("ns", tz="UTC"))]
+        + [pa.field(feature, pa.float32()) for feature in features]
+    )
+
+
+def history_batch(city, frame, schema, hours=None):
+    """RecordBatch of one city's hourly frame; float32 feature columns are wrapped, not copied"""
+    import pyarrow as pa
+
+    if hours is not None:
+        frame = frame.tail(hours)
+    arrays = [
+        pa.repeat(pa.scalar(city, pa.string()), len(frame)),
+        # .values is the UTC datetime64 buffer; the cast only attaches the unit and time zone
+        pa.array(frame["date"].values).cast(schema.field("date").type),
+    ]
+    # Frames come out of dropna(), so the feature columns need no null mask
+    arrays += [pa.array(np.asarray(frame[name].values, dtype=np.float32)) for name in schema.names[2:]]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def with_metadata(schema, **metadata):
+    """Attach JSON-encoded key/values (errors, feature order, ...) to the schema"""
+    return schema.with_metadata({
+        key: json.dumps(value, default=str) for key, value in
+        {"generated_at": datetime.now().isoformat(), **metadata}.items()
+    })
+
+
+class _ChunkSink:
+    """File-like object collecting writer output until it is drained into one `bytes` chunk"""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        # Record batch bodies arrive as pyarrow Buffers over the NumPy memory
+        self._parts.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        # The one copy on the export path: StreamingResponse only sends bytes
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _grouped(batches, rows):
+    """Collect consecutive batches until they hold at least `rows` rows"""
+    group, count = [], 0
+    for batch in batches:
+        group.append(batch)
+        count += batch.num_rows
+        if count >= rows:
+            yield group
+            group, count = [], 0
+    if group:
+        yield group
+
+
+def stream(batches, schema, fmt, batch_rows=EXPORT_BATCH_ROWS, compression=EXPORT_PARQUET_COMPRESSION):
+    """Serialize an iterable of RecordBatches as `fmt`, yielding the bytes written for each
+
+    Arrow IPC emits every batch as soon as it is built. Parquet collects batches
+    into row groups of at least `batch_rows` rows, so small per-city batches do not
+    turn into tiny row groups. A plain generator: Starlette iterates it in a worker thread.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression=None if compression == "none" else compression)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        groups = _grouped(batches, batch_rows) if fmt == "parquet" else ([batch] for batch in batches)
+        for group in groups:
+            table = pa.Table.from_batches(group, schema=schema)
+            if fmt == "parquet":
+                writer.write_table(table, row_group_size=max(table.num_rows, 1))
+            else:
+                # Each slice becomes its own IPC message, so large batches are still chunked
+                writer.write_table(table, max_chunksize=batch_rows)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,132 @@
+# backend/export_runtimes.py
+"""Convert the serving LSTM into TFLite (dynamic-range and int8) and ONNX artifacts.
+
+Usage:
+    python export_runtimes.py --verify
+    python export_runtimes.py --formats tflite tflite-int8 --calibration calibration_windows.npy
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from runtimes import RUNTIME_PATHS, load_runtime
+
+FORMATS = ("tflite", "tflite-int8", "onnx")
+
+
+def unrolled_copy(model):
+    """Same weights with every LSTM unrolled over its fixed 6-step window.
+
+    The TFLite converter cannot lower the TensorList loop Keras emits for a
+    dynamic batch dimension; the unrolled graph is plain matmuls and converts
+    with a resizable batch.
+    """
+    import tensorflow as tf
+
+    config = model.get_config()
+    for layer in config["layers"]:
+        if layer["class_name"] == "LSTM":
+            layer["config"]["unroll"] = True
+    unrolled = tf.keras.Sequential.from_config(config)
+    unrolled.set_weights(model.get_weights())
+    return unrolled
+
+
+def calibration_windows(model, path=None, n_samples=200, seed=0):
+    """Scaled windows for int8 calibration: from an .npy file, else uniform over the [0, 1] scaler range"""
+    if path:
+        return np.load(path).astype(np.float32)
+    rng = np.random.default_rng(seed)
+    _, seq_length, n_features = model.input_shape
+    return rng.uniform(0.0, 1.0, size=(n_samples, seq_length, n_features)).astype(np.float32)
+
+
+def export_tflite(model, output_path, quantization="dynamic", calibration=None):
+    """Convert through a SavedModel so weights are frozen as constants; returns the size in bytes"""
+    import tensorflow as tf
+
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        unrolled_copy(model).export(saved_model_dir, verbose=False)
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == "int8":
+            # Weights and activations in int8; inputs/outputs stay float32 so callers are unchanged
+            converter.representative_dataset = lambda: ([window[None]] for window in calibration)
+        flatbuffer = converter.convert()
+
+    with open(output_path, "wb") as f:
+        f.write(flatbuffer)
+    return len(flatbuffer)
+
+
+def export_onnx(model, output_path, opset=17):
+    try:
+        import tf2onnx
+    except ImportError:
+        raise ImportError("ONNX export needs tf2onnx (pip install tf2onnx onnxruntime)")
+    import tensorflow as tf
+
+    _, seq_length, n_features = model.input_shape
+
+    @tf.function(input_signature=[tf.TensorSpec([None, seq_length, n_features], tf.float32)])
+    def serve(x):
+        return model(x, training=False)
+
+    tf2onnx.convert.from_function(serve, input_signature=serve.input_signature, opset=opset, output_path=output_path)
+    return os.path.getsize(output_path)
+
+
+def measure_drift(model, engine, n_samples=256, seed=0):
+    """Max and mean abs difference from Keras on random scaled windows (scaled units)"""
+    rng = np.random.default_rng(seed)
+    _, seq_length, n_features = model.input_shape
+    X = rng.uniform(0.0, 1.0, size=(n_samples, seq_length, n_features)).astype(np.float32)
+    diff = np.abs(model.predict(X, verbose=0) - engine.predict(X))
+    return float(diff.max()), float(diff.mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=RUNTIME_PATHS["keras"])
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--calibration", help=".npy of scaled (N, 6, 7) windows for int8 calibration")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--verify", action="store_true", help="Report drift from Keras after export")
+    parser.add_argument("--max-drift", type=float, default=0.05,
+                        help="Fail --verify if any output differs from Keras by more than this (scaled units)")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    failed = False
+
+    for fmt in args.formats:
+        output_path = RUNTIME_PATHS[fmt]
+        try:
+            if fmt == "onnx":
+                size = export_onnx(model, output_path, opset=args.opset)
+            elif fmt == "tflite-int8":
+                size = export_tflite(model, output_path, "int8", calibration_windows(model, args.calibration))
+            else:
+                size = export_tflite(model, output_path, "dynamic")
+        except ImportError as e:
+            print(f"⚠️ Skipping {fmt}: {e}")
+            continue
+        print(f"✅ Exported {fmt} to {output_path} ({size} bytes)")
+
+        if args.verify:
+            max_err, mean_err = measure_drift(model, load_runtime(fmt, output_path))
+            status = "✅" if max_err <= args.max_drift else "❌"
+            failed |= max_err > args.max_drift
+            print(f"{status} {fmt} drift from Keras: max {max_err:.3e}, mean {mean_err:.3e} (scaled units)")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
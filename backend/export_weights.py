@@ -0,0 +1,148 @@
+# backend/export_weights.py
+"""Export the LSTM/Dense weights of a .keras model into a compact .npz for the NumPy engine.
+
+Usage:
+    python export_weights.py
+    python export_weights.py --model models/global_weather_saved_model.keras \
+        --output models/global_weather_weights.npz --verify
+    python export_weights.py --scaler models/scaler_global.pkl --verify
+    python export_weights.py --scaler models/scaler_global.pkl --npy-dirs
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+
+
+def export_weights(model, output_path):
+    """Walk the Sequential layers and save their weights under layer{i}_* keys"""
+    arrays = {}
+    kinds = []
+
+    for i, layer in enumerate(model.layers):
+        name = layer.__class__.__name__
+        config = layer.get_config()
+        prefix = f"layer{i}_"
+
+        if name == "LSTM":
+            if config.get("activation") != "tanh" or config.get("recurrent_activation") != "sigmoid":
+                raise ValueError(f"{layer.name}: only tanh/sigmoid LSTMs are supported")
+            if config.get("go_backwards") or config.get("stateful"):
+                raise ValueError(f"{layer.name}: go_backwards/stateful LSTMs are not supported")
+            kernel, recurrent_kernel, bias = layer.get_weights()
+            arrays[prefix + "kernel"] = kernel
+            arrays[prefix + "recurrent_kernel"] = recurrent_kernel
+            arrays[prefix + "bias"] = bias
+            arrays[prefix + "return_sequences"] = np.array(config.get("return_sequences", False))
+            kinds.append("lstm")
+        elif name == "Dense":
+            if config.get("activation") != "linear":
+                raise ValueError(f"{layer.name}: only linear Dense layers are supported")
+            kernel, bias = layer.get_weights()
+            arrays[prefix + "kernel"] = kernel
+            arrays[prefix + "bias"] = bias
+            kinds.append("dense")
+        elif name == "Dropout":
+            arrays[prefix + "rate"] = np.array(config.get("rate", 0.0), dtype=np.float32)
+            kinds.append("dropout")
+        else:
+            raise ValueError(f"Unsupported layer type for NumPy export: {name}")
+
+    arrays["layers"] = np.array(kinds)
+    arrays["input_shape"] = np.array([-1 if d is None else d for d in model.input_shape])
+    np.savez_compressed(output_path, **arrays)
+    return kinds
+
+
+def verify_parity(model, engine, n_samples=256, atol=1e-4, seed=0):
+    """Compare Keras and NumPy outputs on random scaled windows; returns the max abs error"""
+    rng = np.random.default_rng(seed)
+    _, seq_length, n_features = model.input_shape
+    X = rng.uniform(0.0, 1.0, size=(n_samples, seq_length, n_features)).astype(np.float32)
+    expected = model.predict(X, verbose=0)
+    actual = engine.predict(X)
+    max_err = float(np.abs(expected - actual).max())
+    if not np.allclose(expected, actual, atol=atol):
+        raise AssertionError(f"NumPy engine diverges from Keras: max abs error {max_err:.3e} > {atol}")
+    return max_err
+
+
+def verify_fused_parity(model, scaler, engine, n_samples=256, atol=1e-3, seed=0):
+    """Compare scale -> Keras -> inverse-scale against the fused engine on raw windows (°C)"""
+    rng = np.random.default_rng(seed)
+    _, seq_length, n_features = model.input_shape
+    scaled = rng.uniform(0.0, 1.0, size=(n_samples * seq_length, n_features))
+    raw = scaler.inverse_transform(scaled).reshape(n_samples, seq_length, n_features).astype(np.float32)
+
+    X = scaler.transform(raw.reshape(-1, n_features)).reshape(raw.shape).astype(np.float32)
+    pred_full = np.zeros((n_samples, n_features))
+    pred_full[:, 0] = model.predict(X, verbose=0)[:, 0]
+    expected = scaler.inverse_transform(pred_full)[:, 0]
+    actual = engine.predict(raw)[:, 0]
+    max_err = float(np.abs(expected - actual).max())
+    if not np.allclose(expected, actual, atol=atol):
+        raise AssertionError(f"Fused engine diverges from Keras + scaler: max abs error {max_err:.3e} °C > {atol}")
+    return max_err
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.path.join(MODELS_DIR, "global_weather_saved_model.keras"))
+    parser.add_argument("--output", default=os.path.join(MODELS_DIR, "global_weather_weights.npz"))
+    parser.add_argument("--verify", action="store_true", help="Check numerical parity with Keras after export")
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--scaler", help="Also write a copy with this MinMax scaler folded into the weights")
+    parser.add_argument("--fused-output", default=os.path.join(MODELS_DIR, "global_weather_fused.npz"))
+    parser.add_argument("--npy-dirs", action="store_true",
+                        help="Also write each .npz as a directory of .npy files for NUMPY_WEIGHTS_MMAP")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    from numpy_engine import NumpyLSTMEngine
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    kinds = export_weights(model, args.output)
+    print(f"✅ Exported {len(kinds)} layers ({', '.join(kinds)}) to {args.output}")
+    print(f"Weights file size: {os.path.getsize(args.output)} bytes")
+
+    if args.verify:
+        engine = NumpyLSTMEngine.from_npz(args.output)
+        try:
+            max_err = verify_parity(model, engine, atol=args.atol)
+        except AssertionError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Parity check passed (max abs error {max_err:.3e})")
+
+    if args.npy_dirs:
+        npy_dir = os.path.splitext(args.output)[0]
+        NumpyLSTMEngine.from_npz(args.output).save_dir(npy_dir)
+        print(f"✅ Wrote memory-mappable weights to {npy_dir}/")
+
+    if args.scaler:
+        import joblib
+
+        scaler = joblib.load(args.scaler)
+        fused = NumpyLSTMEngine.from_npz(args.output).fold_scaler(scaler.scale_, scaler.min_)
+        fused.save_npz(args.fused_output)
+        print(f"✅ Folded {args.scaler} into {args.fused_output} (raw features in, °C out)")
+
+        if args.verify:
+            try:
+                max_err = verify_fused_parity(model, scaler, fused)
+            except AssertionError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            print(f"✅ Fused parity check passed (max abs error {max_err:.3e} °C)")
+
+        if args.npy_dirs:
+            fused_dir = os.path.splitext(args.fused_output)[0]
+            fused.save_dir(fused_dir)
+            print(f"✅ Wrote memory-mappable fused weights to {fused_dir}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# backend/gunicorn.conf.py
+"""gunicorn settings for multi-worker serving.
+
+Usage:
+    INFERENCE_ENGINE=numpy NUMPY_WEIGHTS_MMAP=true gunicorn -c gunicorn.conf.py main:app
+
+The master imports main once (preload_app) and, with MODEL_PRELOAD on, loads the
+NumPy model before forking WEB_CONCURRENCY uvicorn workers that share it
+copy-on-write. Each worker still runs the FastAPI lifespan: its own batcher,
+refresher and event loop.
+"""
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+preload_app = os.getenv("MODEL_PRELOAD", "True").lower() == "true"
+# main.py reads this when the master imports it
+os.environ["MODEL_PRELOAD"] = str(preload_app)
+
+# With MODEL_LOAD_BACKGROUND=false a worker loading its own TensorFlow model blocks for seconds
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+loglevel = os.getenv("LOG_LEVEL", "INFO").lower()
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked (preloaded model: {preload_app})")
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (in-flight requests) from the aggregated /metrics
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
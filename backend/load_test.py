@@ -0,0 +1,225 @@
+# backend/load_test.py
+"""End-to-end load test of /predict against the local Open-Meteo stand-in.
+
+Starts mock_openmeteo.py and the API (uvicorn, or gunicorn with --workers > 1)
+as subprocesses in a scratch directory, waits for /health/ready, then drives
+POST /predict with random cities from CITY_COORDS at each concurrency level: a
+closed loop of N clients, each sending its next request when the previous one
+returns. Reports throughput, p50/p95/p99 latency and error rate per level.
+Runs fully offline.
+
+The prediction cache is off unless --prediction-cache is given, so every
+request goes through fetch, decode and inference. Client, mock and API share
+the machine's CPUs: compare runs from the same machine, not absolute numbers.
+
+Usage:
+    python load_test.py
+    python load_test.py --concurrency 1 4 16 64 --duration 20 --latency-ms 40 --jitter-ms 20
+    python load_test.py --workers 4 --error-rate 0.02 --output results.json
+    python load_test.py --app-env BATCHING_ENABLED=true --app-env INFERENCE_ENGINE=numpy
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import httpx
+import numpy as np
+
+from benchmark_workers import free_port, wait_ready
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_cities():
+    # Without importing data_fetcher, which opens its requests_cache database in the working directory
+    import ast
+
+    with open(os.path.join(BACKEND_DIR, "data_fetcher.py")) as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "CITY_COORDS":
+            return list(ast.literal_eval(node.value))
+    raise RuntimeError("CITY_COORDS not found in data_fetcher.py")
+
+
+def start(command, env, workdir, name):
+    log = open(os.path.join(workdir, f"{name}.log"), "w+")
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, log
+
+
+def stop(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def log_tail(log, lines=10):
+    log.seek(0)
+    return "".join(log.readlines()[-lines:])
+
+
+def mock_stats(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as response:
+        return json.load(response)
+
+
+async def run_level(url, cities, concurrency, duration_s, timeout_s):
+    """Closed loop: `concurrency` clients each sending back-to-back requests for `duration_s`"""
+    latencies = []
+    statuses = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout_s) as client:
+        deadline = time.perf_counter() + duration_s
+
+        async def worker(seed):
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json={"city": rng.choice(cities)})
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = len(latencies)
+    errors = total - statuses.get("200", 0)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000.0 if total else (0.0, 0.0, 0.0)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests before the first level")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request client timeout in seconds")
+    parser.add_argument("--ready-timeout", type=float, default=300.0, help="Seconds to wait for /health/ready")
+    parser.add_argument("--workers", type=int, default=1, help="API workers; more than 1 runs gunicorn")
+    parser.add_argument("--engine", default="numpy", help="INFERENCE_ENGINE of the API")
+    parser.add_argument("--prediction-cache", action="store_true", help="Keep the API's prediction cache on")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the API, repeatable")
+    parser.add_argument("--fixtures", help="Recorded responses for the mock (default: synthetic data)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mock upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Mock upstream latency spread")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    cities = load_cities()
+    workdir = tempfile.mkdtemp(prefix="weather-load-test-")
+    mock_port, api_port = free_port(), free_port()
+
+    mock_command = [
+        sys.executable, os.path.join(BACKEND_DIR, "mock_openmeteo.py"), "--port", str(mock_port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate), "--error-status", str(args.error_status), "--seed", str(args.seed),
+    ]
+    if args.fixtures:
+        mock_command += ["--fixtures", os.path.abspath(args.fixtures)]
+
+    app_env = {
+        **os.environ,
+        "OPENMETEO_BASE_URL": f"http://127.0.0.1:{mock_port}/v1",
+        "INFERENCE_ENGINE": args.engine,
+        "PREDICTION_CACHE_ENABLED": str(args.prediction_cache),
+        "REFRESH_ENABLED": "False",
+        "LOG_LEVEL": "WARNING",
+        "API_HOST": "127.0.0.1",
+        "PORT": str(api_port),
+        "WEB_CONCURRENCY": str(args.workers),
+    }
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        app_env[key] = value
+    if args.workers > 1:
+        app_command = [
+            sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+            "--pythonpath", BACKEND_DIR, "main:app",
+        ]
+    else:
+        app_command = [
+            sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+            "--host", "127.0.0.1", "--port", str(api_port), "--log-level", "warning",
+        ]
+
+    mock, mock_log = start(mock_command, os.environ.copy(), workdir, "mock")
+    api, api_log = None, None
+    results = []
+    try:
+        if not wait_ready(f"http://127.0.0.1:{mock_port}/stats", 1, 60):
+            raise SystemExit(f"❌ Mock Open-Meteo did not start\n{log_tail(mock_log)}")
+        api, api_log = start(app_command, app_env, workdir, "api")
+        if not wait_ready(f"http://127.0.0.1:{api_port}/health/ready", args.workers, args.ready_timeout):
+            raise SystemExit(f"❌ API not ready after {args.ready_timeout:.0f}s\n{log_tail(api_log)}")
+        print(f"✅ API ready ({args.workers} worker(s), engine {args.engine}); "
+              f"mock latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, error rate {args.error_rate:.1%}")
+
+        url = f"http://127.0.0.1:{api_port}/predict"
+        for i in range(args.warmup):
+            city = cities[i % len(cities)]
+            try:
+                urllib.request.urlopen(urllib.request.Request(
+                    url, data=json.dumps({"city": city}).encode(),
+                    headers={"Content-Type": "application/json"},
+                ), timeout=args.timeout).read()
+            except urllib.error.URLError:
+                pass
+
+        print(f"{'concurrency':>11} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'errors':>7} {'upstream':>8}")
+        for concurrency in args.concurrency:
+            before = mock_stats(mock_port)["requests"]
+            result = asyncio.run(run_level(url, cities, concurrency, args.duration, args.timeout))
+            result["upstream_requests"] = mock_stats(mock_port)["requests"] - before
+            results.append(result)
+            print(f"{concurrency:>11} {result['requests']:>8} {result['throughput_rps']:>8.1f} "
+                  f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                  f"{result['error_rate']:>7.1%} {result['upstream_requests']:>8}")
+    finally:
+        if api is not None:
+            stop(api)
+            api_log.close()
+        stop(mock)
+        mock_log.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,41 @@
 #backend/main.py
-from fastapi import FastAPI, HTTPException
+import asyncio
+import gc
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import os
 import numpy as np
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import your existing modules
-try:
-    from model_loader import model, scaler
-    from data_fetcher import fetch_city_data, FEATURES
-    from model_utils import create_sequences
-    MODEL_LOADED = True
-except ImportError as e:
-    logging.error(f"Failed to import model modules: {e}")
-    MODEL_LOADED = False
-    model, scaler = None, None
-    
+# Importing these is cheap: the model itself is loaded in the lifespan (see load_models)
+import model_loader
+from model_loader import predict, predict_celsius, load_version, INFERENCE_ENGINE
+from data_fetcher import fetch_city_data, fetch_cities_data, FEATURES, CITY_COORDS
+from async_fetcher import fetch_city_data_async, fetch_cities_data_bulk_async, close_client, get_client, UpstreamError
+from openmeteo_requests import OpenMeteoRequestsError
+from model_utils import build_input_windows, rollout_forecast, windows_ending_at
+from batcher import InferenceBatcher, BatcherQueueFull
+from prediction_cache import PredictionCache, current_hour
+from window_memo import WindowMemo
+from single_flight import SingleFlight, AsyncSingleFlight
+from refresher import HourlyRefresher
+from broadcaster import PredictionBroadcaster, TooManySubscribers, city_filter, parse_event_id
+from model_registry import ModelRegistry, ModelVersion
+from startup import StartupState
+import metrics
+import profiling
+import uncertainty
+import export
+
 # Remove premature uvicorn.run call; move it to __main__ block below
 
 # Load environment variables
@@ -33,12 +48,328 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Named model versions with hot-swap and A/B routing; the start-up model is served as MODEL_VERSION
+BOOT_VERSION = os.getenv("MODEL_VERSION", "1.0.0")
+MODEL_REGISTRY_PATH = os.getenv(
+    "MODEL_REGISTRY_PATH", os.path.join(os.path.dirname(__file__), "models", "registry.json")
+)
+registry = ModelRegistry(
+    MODEL_REGISTRY_PATH, load_version, poll_s=float(os.getenv("MODEL_REGISTRY_POLL_S", 5))
+)
+
+# Model loading runs in the lifespan; with MODEL_LOAD_BACKGROUND the server accepts
+# connections immediately and /health/ready reports 503 until inference is warm
+MODEL_LOAD_BACKGROUND = os.getenv("MODEL_LOAD_BACKGROUND", "True").lower() == "true"
+startup = StartupState()
+
+# Under gunicorn --preload (see gunicorn.conf.py) load the model once in the master at import,
+# so forked workers share its memory copy-on-write instead of each loading their own copy.
+# TensorFlow, TFLite and onnxruntime start thread pools that do not survive fork(), so only
+# the NumPy engine is preloaded; other engines still load in each worker's lifespan.
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "False").lower() == "true"
+FORK_SAFE_ENGINES = ("numpy",)
+
+# Micro-batching scheduler for concurrent /predict traffic
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "False").lower() == "true"
+BATCH_TIMEOUT_S = float(os.getenv("BATCH_TIMEOUT_S", 30))
+batcher = None
+if BATCHING_ENABLED:
+    batcher = InferenceBatcher(
+        # Resolved per batch so a hot-swap takes effect without rebuilding the batcher
+        lambda windows: registry.predict_celsius(registry.active, windows),
+        max_batch_size=int(os.getenv("BATCH_MAX_SIZE", 32)),
+        max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", 5)),
+        max_queue_size=int(os.getenv("BATCH_MAX_QUEUE", 1024)),
+    )
+
+# Hourly prediction cache; upstream data only changes on the hour
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "True").lower() == "true"
+prediction_cache = None
+# /forecast rollouts, per city and keyed by (model version, hours) in place of the version
+forecast_cache = None
+if PREDICTION_CACHE_ENABLED:
+    prediction_cache = PredictionCache(max_size=int(os.getenv("PREDICTION_CACHE_SIZE", 256)))
+    forecast_cache = PredictionCache(max_size=int(os.getenv("FORECAST_CACHE_SIZE", 256)))
+
+# Reuse the last scored window per city and version while a refetch returns the same window
+WINDOW_MEMO_ENABLED = os.getenv("WINDOW_MEMO_ENABLED", "False").lower() == "true"
+window_memo = None
+if WINDOW_MEMO_ENABLED:
+    window_memo = WindowMemo(max_size=int(os.getenv("WINDOW_MEMO_SIZE", 256)))
+
+# Await upstream data on the event loop instead of holding a worker thread per request
+ASYNC_FETCH = os.getenv("ASYNC_FETCH", "True").lower() == "true"
+# Fetch multi-city requests with multi-location Open-Meteo calls
+BULK_FETCH = os.getenv("BULK_FETCH", "True").lower() == "true"
+
+# Hourly pre-warming of every known city
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "True").lower() == "true"
+refresher = None
+_background_tasks = set()
+
+# Server-Sent Events push of every refreshed prediction (GET /stream/predictions)
+STREAMING_ENABLED = os.getenv("STREAMING_ENABLED", "True").lower() == "true"
+broadcaster = None
+if REFRESH_ENABLED and STREAMING_ENABLED:
+    broadcaster = PredictionBroadcaster(
+        max_subscribers=int(os.getenv("STREAM_MAX_SUBSCRIBERS", 10000)),
+        heartbeat_s=float(os.getenv("STREAM_HEARTBEAT_S", 15)),
+    )
+
+def load_models(preload=False):
+    """Load, warm up and register the serving model; runs in a worker thread
+
+    With `preload` (gunicorn master, before fork) the other registry versions are
+    left for the workers, since their engines may not be fork-safe.
+    """
+    model_loader.load(startup)
+
+    with startup.stage("registry"):
+        if BOOT_VERSION in registry.versions():
+            registry.adopt(
+                BOOT_VERSION,
+                ModelVersion(
+                    BOOT_VERSION, predict, predict_celsius, model_loader.scaler, INFERENCE_ENGINE,
+                    sample_celsius=model_loader.sample_celsius if model_loader.sample_fn is not None else None,
+                )
+            )
+        else:
+            logger.warning(f"MODEL_VERSION {BOOT_VERSION} is not in {MODEL_REGISTRY_PATH}; it will not be served")
+        if not preload:
+            load_registry_versions()
+
+def load_registry_versions():
+    """Load the configured active and candidate versions before traffic arrives"""
+    for name in filter(None, (registry.active, registry.candidate)):
+        try:
+            registry.get(name)
+        except Exception as e:
+            logger.error(f"Failed to load model version {name}: {e}")
+
+def preload_models():
+    """Load the boot model in the gunicorn master so workers inherit it on fork"""
+    if INFERENCE_ENGINE not in FORK_SAFE_ENGINES:
+        logger.warning(
+            f"MODEL_PRELOAD ignored: the {INFERENCE_ENGINE} engine is not fork-safe; each worker loads its own copy"
+        )
+        return
+    load_models(preload=True)
+    startup.preloaded = True
+    # Move everything allocated so far out of the collector's reach: a collection in a worker
+    # would otherwise write to these objects' headers and un-share their pages
+    gc.freeze()
+    logger.info(f"Model preloaded in pid {os.getpid()}; workers will share it copy-on-write")
+
+async def start_serving():
+    """Load the model off the event loop, then flip readiness and start the refresher"""
+    try:
+        if startup.preloaded:
+            await run_in_threadpool(load_registry_versions)
+        else:
+            await run_in_threadpool(load_models)
+    except Exception as e:
+        logger.exception(f"Model loading failed: {e}")
+        startup.mark_failed(e)
+        metrics.record_startup(startup.snapshot()["stages"])
+        return
+    startup.mark_ready()
+    metrics.record_startup(startup.snapshot()["stages"])
+    logger.info(f"Backend ready: {startup.snapshot()['ready_after_ms']} ms after start-up")
+    if refresher is not None:
+        refresher.start()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if batcher is not None:
+        batcher.start()
+    load_task = None
+    if MODEL_LOAD_BACKGROUND:
+        load_task = asyncio.create_task(start_serving())
+    else:
+        await start_serving()
+    yield
+    if load_task is not None and not load_task.done():
+        # The loading thread cannot be interrupted; stop waiting for it
+        load_task.cancel()
+    if refresher is not None:
+        await refresher.stop()
+    if batcher is not None:
+        batcher.stop()
+    registry.close()
+    await close_client()
+
+if MODEL_PRELOAD:
+    preload_models()
+
+def ensure_model_ready():
+    """Raise 503 until the model has loaded and warmed up, or with the error if loading failed"""
+    if startup.ready:
+        return
+    if startup.status == "failed":
+        raise HTTPException(status_code=503, detail=f"Model failed to load: {startup.error}")
+    raise HTTPException(status_code=503, detail="Model is still loading. Please retry shortly.")
+
+# Open-Meteo failures of the async client and the cached sync session; reported as 502
+UPSTREAM_ERRORS = (UpstreamError, OpenMeteoRequestsError)
+
+# Concurrent requests for the same key share one in-flight fetch / prediction
+fetch_flight = AsyncSingleFlight()
+sync_fetch_flight = SingleFlight()
+prediction_flight = AsyncSingleFlight()
+forecast_flight = AsyncSingleFlight()
+
+# The hour is read before the upstream call: data fetched at 10:59 and stored at 11:00
+# is the 10:00 observation, and must not be cached as 11:00's
+async def fetch_city_with_hour_async(city):
+    hour = current_hour()
+    return await fetch_city_data_async(city), hour
+
+def fetch_city_with_hour(city):
+    hour = current_hour()
+    return fetch_city_data(city), hour
+
+async def load_city_data(city):
+    """Fetch one city through the async client or the cached sync session; returns (frame, hour fetched in)"""
+    if ASYNC_FETCH:
+        return await fetch_flight.do(city, fetch_city_with_hour_async, city)
+    return await run_in_threadpool(sync_fetch_flight.do, city, fetch_city_with_hour, city)
+
+async def load_cities_data(cities):
+    """Fetch many cities at once; returns {city: (frame, hour fetched in) or Exception}"""
+    if not BULK_FETCH:
+        results = await asyncio.gather(
+            *(load_city_data(city) for city in cities),
+            return_exceptions=True
+        )
+        return dict(zip(cities, results))
+
+    # Unknown cities would fail the whole multi-location request, so report them up front
+    results = {city: ValueError(f"{city} not found.") for city in cities if city not in CITY_COORDS}
+    known = [city for city in cities if city in CITY_COORDS]
+    if known:
+        hour = current_hour()
+        if ASYNC_FETCH:
+            frames = await fetch_cities_data_bulk_async(known)
+        else:
+            frames = await run_in_threadpool(fetch_cities_data, known)
+        results.update({
+            city: frame if isinstance(frame, Exception) else (frame, hour)
+            for city, frame in frames.items()
+        })
+    return results
+
+async def run_inference(windows, model_version):
+    """Score raw windows off the event loop; single windows for the active version go through the batcher"""
+    if batcher is not None and len(windows) == 1 and model_version == registry.active:
+        # The batch runs on the batcher thread, outside this request's profiling trace
+        with profiling.span("batch_wait"):
+            future = asyncio.wrap_future(batcher.submit(windows[0]))
+            return np.array([await asyncio.wait_for(future, BATCH_TIMEOUT_S)])
+    return await run_in_threadpool(registry.predict_celsius, model_version, windows)
+
+async def score_windows(windows, cities, model_version):
+    """Predictions for raw windows plus, for ensemble versions, the per-member breakdown"""
+    if registry.is_ensemble(model_version):
+        result = await run_in_threadpool(registry.predict_ensemble, model_version, windows, cities)
+        return result["prediction"], result
+    return await run_inference(windows, model_version), None
+
+def ensemble_fields(result, i):
+    """`ensemble` of WeatherResponse for row `i` of an ensemble result"""
+    if result is None:
+        return {}
+    return {"ensemble": EnsembleBreakdown(
+        members={name: round(float(p), 2) for name, p in zip(result["names"], result["members"][:, i])},
+        weights={name: round(float(w), 3) for name, w in zip(result["names"], result["weights"][:, i])},
+        spread=round(float(result["spread"][i]), 3),
+    )}
+
+async def estimate_uncertainty(windows, cities, model_version):
+    """MC-dropout summary of raw windows (see uncertainty.summarize); None when sampling is off or unsupported"""
+    if uncertainty.MC_DROPOUT_SAMPLES <= 0:
+        return None
+    samples = await run_in_threadpool(
+        registry.sample_celsius, model_version, windows, uncertainty.MC_DROPOUT_SAMPLES, cities
+    )
+    return None if samples is None else uncertainty.summarize(samples)
+
+def uncertainty_fields(summary, i):
+    """`confidence` and `uncertainty` of WeatherResponse for row `i` of a summary"""
+    if summary is None:
+        return {"confidence": None, "uncertainty": None}
+    return {
+        "confidence": round(float(summary["confidence"][i]), 1),
+        "uncertainty": PredictionUncertainty(
+            mean=round(float(summary["mean"][i]), 2),
+            std=round(float(summary["std"][i]), 3),
+            lower=round(float(summary["lower"][i]), 2),
+            upper=round(float(summary["upper"][i]), 2),
+            interval=uncertainty.PREDICTION_INTERVAL,
+            samples=uncertainty.MC_DROPOUT_SAMPLES,
+        ),
+    }
+
+async def predict_cities(cities, fetched, versions=None):
+    """Score many cities' (frame, hour) fetches with one stacked inference call per model version and cache the results"""
+    versions = versions or [registry.route(city) for city in cities]
+
+    # One (N, 6, n_features) tensor, one inference call per routed version
+    windows = build_input_windows([frame for frame, _ in fetched], FEATURES)
+    preds = np.empty(len(cities))
+    # Per row: (summary of its version's MC-dropout pass, row index within that summary), same for ensembles
+    summaries = [(None, 0)] * len(cities)
+    breakdowns = [{}] * len(cities)
+    for model_version in set(versions):
+        rows = [i for i, version in enumerate(versions) if version == model_version]
+        (preds[rows], result), summary = await asyncio.gather(
+            score_windows(windows[rows], [cities[i] for i in rows], model_version),
+            estimate_uncertainty(windows[rows], [cities[i] for i in rows], model_version),
+        )
+        for j, row in enumerate(rows):
+            summaries[row] = (summary, j)
+            breakdowns[row] = ensemble_fields(result, j)
+
+    timestamp = datetime.now().isoformat()
+    responses = [
+        WeatherResponse(
+            city=city,
+            predicted_temperature=round(float(pred), 2),
+            unit="°C",
+            model_version=model_version,
+            timestamp=timestamp,
+            status="success",
+            **uncertainty_fields(*summary),
+            **breakdown,
+        )
+        for city, pred, model_version, summary, breakdown in zip(cities, preds, versions, summaries, breakdowns)
+    ]
+    if prediction_cache is not None:
+        # Keyed by the hour the fetch started in, so a fetch just before the boundary is not served for the next hour
+        for response, (_, hour) in zip(responses, fetched):
+            prediction_cache.put(response.city, response.model_version, response, hour)
+    return responses
+
+if REFRESH_ENABLED:
+    refresher = HourlyRefresher(
+        CITY_COORDS.keys(),
+        fetch_fn=load_city_data,
+        bulk_fetch_fn=load_cities_data if BULK_FETCH else None,
+        predict_fn=predict_cities,
+        on_result=broadcaster.publish if broadcaster is not None else None,
+        offset_s=float(os.getenv("REFRESH_OFFSET_S", 60)),
+        jitter_s=float(os.getenv("REFRESH_JITTER_S", 30)),
+        concurrency=int(os.getenv("REFRESH_CONCURRENCY", 5)),
+        retry_s=float(os.getenv("REFRESH_RETRY_S", 300)),
+        run_on_start=os.getenv("REFRESH_ON_START", "True").lower() == "true",
+    )
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Weather Forecast API",
     description="Weather forecasting API using LSTM model with real-time data",
     version=os.getenv("MODEL_VERSION", "1.0.0"),
-    debug=os.getenv("DEBUG", "False").lower() == "true"
+    debug=os.getenv("DEBUG", "False").lower() == "true",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -49,20 +380,78 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so in-flight and latency cover CORS handling too
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Pydantic models
 class ForecastRequest(BaseModel):
     city: str
 
+class PredictionUncertainty(BaseModel):
+    mean: float
+    std: float
+    lower: float
+    upper: float
+    interval: float
+    samples: int
+
+class EnsembleBreakdown(BaseModel):
+    members: Dict[str, float]
+    weights: Dict[str, float]
+    spread: float
+
 class WeatherResponse(BaseModel):
     city: str
     predicted_temperature: float
     unit: str
-    confidence: float
+    # Percent chance the temperature is within CONFIDENCE_TOLERANCE_C of the prediction
+    confidence: Optional[float]
+    uncertainty: Optional[PredictionUncertainty] = None
+    ensemble: Optional[EnsembleBreakdown] = None
+    model_version: str
+    timestamp: str
+    status: str
+
+class BatchForecastRequest(BaseModel):
+    cities: List[str]
+
+class BatchWeatherResponse(BaseModel):
+    predictions: List[WeatherResponse]
+    errors: Dict[str, str]
+    total: int
+    model_version: str
+    timestamp: str
+
+class HourlyForecast(BaseModel):
+    hours_ahead: int
+    time: str
+    temperature: float
+
+class CityForecast(BaseModel):
+    city: str
+    hourly: List[HourlyForecast]
+
+class ForecastResponse(BaseModel):
+    forecasts: List[CityForecast]
+    errors: Dict[str, str]
+    hours: int
+    unit: str
     model_version: str
     timestamp: str
     status: str
 
+class ActivateModelRequest(BaseModel):
+    version: str
+
+class CandidateModelRequest(BaseModel):
+    version: Optional[str] = None
+    percent: float = 0.0
+
+class ProfileRequest(BaseModel):
+    requests: int = 10
+    interval_ms: float = 2.0
+    timeout_s: float = 60.0
+
 class HealthResponse(BaseModel):
     status: str
     timestamp: str
@@ -70,6 +459,7 @@ class HealthResponse(BaseModel):
     service: str
     model_loaded: bool
     checks: dict
+    startup: dict
 
 @app.get("/")
 def read_root():
@@ -77,10 +467,20 @@ def read_root():
     return {
         "message": "🌦️ AI Weather Forecasting API is running!",
         "version": os.getenv("MODEL_VERSION", "1.0.0"),
-        "model_loaded": MODEL_LOADED,
+        "model_loaded": startup.ready,
         "endpoints": {
             "predict": "/predict",
+            "predict_batch": "/predict/batch",
+            "forecast": "/forecast",
+            "batching_stats": "/batching/stats",
+            "cache_stats": "/cache/stats",
+            "refresh_status": "/refresh/status",
+            "stream": "/stream/predictions",
+            "export": "/export/predictions",
+            "models": "/models",
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
             "cities": "/cities",
             "docs": "/docs"
         },
@@ -97,10 +497,10 @@ def health_check():
 
         # Run checks
         checks = {
-            "model_loaded": MODEL_LOADED and model is not None,
+            "model_loaded": startup.ready and model_loader.model is not None,
             "model_file_exists": os.path.exists(model_path),
             "scaler_file_exists": os.path.exists(scaler_path),
-            "scaler_available": scaler is not None,
+            "scaler_available": model_loader.scaler is not None,
             "data_fetcher_available": callable(globals().get("fetch_city_data")),
         }
 
@@ -112,68 +512,443 @@ def health_check():
             timestamp=datetime.now().isoformat(),
             version=os.getenv("MODEL_VERSION", "1.0.0"),
             service="weather-forecast-backend",
-            model_loaded=MODEL_LOADED,
-            checks=checks
+            model_loaded=startup.ready,
+            checks=checks,
+            startup=startup.snapshot()
         )
 
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail=f"Health check failed: {str(e)}")
 
+@app.get("/health/live")
+def liveness_check():
+    """Liveness probe: the process is up and serving HTTP, whether or not the model has loaded"""
+    return {"status": "alive"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus exposition: stage latency histograms, HTTP counts, upstream cache hits, load times"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up; 503 before that, if loading failed or if the refresher died"""
+    snapshot = startup.snapshot()
+    ready = snapshot["ready"]
+    if refresher is not None:
+        # A dead refresher leaves every city serving stale predictions, so stop taking traffic
+        snapshot["refresher"] = {"healthy": refresher.healthy(), "task_error": refresher.status()["task_error"]}
+        ready = ready and refresher.healthy()
+    return JSONResponse(status_code=200 if ready else 503, content=snapshot)
+
+
+def _finish_background_task(task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background revalidation failed: {task.exception()}")
+
+async def compute_city_prediction(city, model_version):
+    """Fetch, score and cache one city; shared by concurrent /predict calls for the same city"""
+    # Fetch real-time data for the city
+    df, hour = await load_city_data(city)
+    
+    # Prepare data for prediction
+    window = build_input_windows([df], FEATURES)
+
+    # An unchanged window keeps its prediction, ensemble breakdown and uncertainty
+    scored = window_memo.get(city, model_version, window[0]) if window_memo is not None else None
+    if scored is None:
+        # Make prediction; with batching on, concurrent requests share one forward pass.
+        # The MC-dropout pass scores every sample of the window in one call, alongside it
+        scored = await asyncio.gather(
+            score_windows(window, [city], model_version),
+            estimate_uncertainty(window, [city], model_version),
+        )
+        if window_memo is not None:
+            window_memo.put(city, model_version, window[0], scored)
+    (preds, result), summary = scored
+    pred_actual = float(preds[0])
+    
+    logger.info(f"Prediction successful for {city}: {pred_actual:.2f}°C")
+    
+    response = WeatherResponse(
+        city=city,
+        predicted_temperature=round(pred_actual, 2),
+        unit="°C",
+        model_version=model_version,
+        timestamp=datetime.now().isoformat(),
+        status="success",
+        **uncertainty_fields(summary, 0),
+        **ensemble_fields(result, 0),
+    )
+    if prediction_cache is not None:
+        prediction_cache.put(city, model_version, response, hour)
+    return response
 
 @app.post("/predict", response_model=WeatherResponse)
-def predict_weather(request: ForecastRequest):
+@profiling.traced("predict")
+async def predict_weather(request: ForecastRequest):
     """Predict weather for a given city using LSTM model"""
     
     # Check if model is loaded
-    if not MODEL_LOADED or model is None or scaler is None:
-        raise HTTPException(
-            status_code=503,
-            detail="Model not loaded. Please check server configuration and model files."
-        )
+    ensure_model_ready()
     
     try:
         logger.info(f"Weather prediction requested for {request.city}")
-        
-        # Fetch real-time data for the city
-        df = fetch_city_data(request.city)
-        
-        # Prepare data for prediction
-        last_6 = df[FEATURES].tail(6).values
-        scaled = scaler.transform(last_6)
-        X = create_sequences(scaled)
-        X = X.reshape(1, 6, len(FEATURES))  # Single sample for prediction
-        
-        # Make prediction
-        pred_scaled = model.predict(X)[0][0]
-        
-        # Inverse transform to get actual temperature
-        pred_full = np.hstack([pred_scaled] + [0]*(len(FEATURES)-1))
-        pred_actual = scaler.inverse_transform([pred_full])[0][0]
-        
-        # Calculate confidence based on model uncertainty (you can improve this)
-        confidence = np.random.uniform(85, 95)  # Placeholder - implement proper confidence calculation
-        
-        logger.info(f"Prediction successful for {request.city}: {pred_actual:.2f}°C")
-        
-        return WeatherResponse(
-            city=request.city,
-            predicted_temperature=round(pred_actual, 2),
-            unit="°C",
-            confidence=round(confidence, 1),
-            model_version=os.getenv("MODEL_VERSION", "1.0.0"),
-            timestamp=datetime.now().isoformat(),
-            status="success"
-        )
+        model_version = registry.route(request.city)
+
+        if prediction_cache is not None:
+            with profiling.span("prediction_cache"):
+                cached = prediction_cache.get(request.city, model_version)
+            if cached is not None:
+                logger.info(f"Prediction cache hit for {request.city}")
+                return cached
+
+        # Stale-while-revalidate: serve the last refreshed value and recompute in the background
+        stale = refresher.latest(request.city) if refresher is not None else None
+        if stale is not None:
+            task = asyncio.create_task(prediction_flight.do(
+                (request.city, model_version), compute_city_prediction, request.city, model_version
+            ))
+            _background_tasks.add(task)
+            task.add_done_callback(_finish_background_task)
+            logger.info(f"Serving stale prediction for {request.city} while revalidating")
+            return stale
+
+        with profiling.span("compute"):
+            return await prediction_flight.do(
+                (request.city, model_version), compute_city_prediction, request.city, model_version
+            )
         
     except ValueError as e:
         logger.error(f"City data fetch failed for {request.city}: {e}")
         raise HTTPException(status_code=404, detail=f"City not found or data unavailable: {str(e)}")
+
+    except BatcherQueueFull as e:
+        logger.warning(f"Prediction rejected for {request.city}: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+
+    except UPSTREAM_ERRORS as e:
+        logger.error(f"Open-Meteo request failed for {request.city}: {e}")
+        raise HTTPException(status_code=502, detail=f"Weather data provider unavailable: {str(e)}")
     
     except Exception as e:
         logger.error(f"Prediction failed for {request.city}: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+@app.post("/predict/batch", response_model=BatchWeatherResponse)
+@profiling.traced("predict_batch")
+async def predict_weather_batch(request: BatchForecastRequest):
+    """Predict weather for many cities with a single stacked model call"""
+
+    ensure_model_ready()
+
+    max_cities = int(os.getenv("MAX_BATCH_CITIES", 50))
+    if not request.cities:
+        raise HTTPException(status_code=400, detail="No cities provided")
+    if len(request.cities) > max_cities:
+        raise HTTPException(status_code=400, detail=f"At most {max_cities} cities per batch")
+
+    logger.info(f"Batch weather prediction requested for {len(request.cities)} cities")
+
+    # Serve cached cities from memory and only fetch the misses
+    routed = {city: registry.route(city) for city in dict.fromkeys(request.cities)}
+    cached, missing = [], []
+    for city, model_version in routed.items():
+        hit = prediction_cache.get(city, model_version) if prediction_cache is not None else None
+        if hit is not None:
+            cached.append(hit)
+        else:
+            missing.append(city)
+
+    # Fetch all cities concurrently; a bad city is reported without failing the whole batch
+    cities, fetched, errors = [], [], {}
+    results = await load_cities_data(missing) if missing else {}
+    for city, result in results.items():
+        if isinstance(result, Exception):
+            logger.error(f"City data fetch failed for {city}: {result}")
+            errors[city] = str(result)
+        else:
+            fetched.append(result)
+            cities.append(city)
+
+    if not cities and not cached:
+        raise HTTPException(status_code=404, detail=f"No city data available: {errors}")
+
+    fresh = []
+    if cities:
+        try:
+            fresh = await predict_cities(cities, fetched, [routed[city] for city in cities])
+        except Exception as e:
+            logger.error(f"Batch prediction failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+    by_city = {prediction.city: prediction for prediction in cached + fresh}
+    predictions = [by_city[city] for city in dict.fromkeys(request.cities) if city in by_city]
+
+    logger.info(f"Batch prediction successful for {len(predictions)} cities ({len(errors)} failed)")
+
+    return BatchWeatherResponse(
+        predictions=predictions,
+        errors=errors,
+        total=len(predictions),
+        model_version=registry.active,
+        timestamp=datetime.now().isoformat()
+    )
+
+async def compute_forecasts(cities, model_version, hours):
+    """Fetch and roll out many cities from the hour they were fetched in; returns ({city: CityForecast}, errors)"""
+    ok_cities, frames, fetch_hours, errors = [], [], [], {}
+    for name, result in (await load_cities_data(cities)).items():
+        if isinstance(result, Exception):
+            logger.error(f"City data fetch failed for {name}: {result}")
+            errors[name] = str(result)
+        else:
+            ok_cities.append(name)
+            frames.append(result[0])
+            fetch_hours.append(result[1])
+    if not ok_cities:
+        return {}, errors
+
+    # Each window ends at the hour its fetch started in, so the rollout covers the hours after now
+    windows, ends = windows_ending_at(frames, FEATURES, fetch_hours)
+    active = await run_in_threadpool(registry.get, model_version)
+    temps = await run_in_threadpool(rollout_forecast, active.predict, active.scaler, windows, hours)
+
+    forecasts = {}
+    for name, end, row, hour in zip(ok_cities, ends, temps, fetch_hours):
+        forecasts[name] = CityForecast(
+            city=name,
+            hourly=[
+                HourlyForecast(
+                    hours_ahead=step + 1,
+                    time=(end + timedelta(hours=step + 1)).isoformat(),
+                    temperature=round(float(temp), 2),
+                )
+                for step, temp in enumerate(row)
+            ]
+        )
+        if forecast_cache is not None:
+            forecast_cache.put(name, (model_version, hours), forecasts[name], hour)
+    return forecasts, errors
+
+@app.get("/forecast", response_model=ForecastResponse)
+async def forecast_weather(
+    city: List[str] = Query(..., description="City name; repeat or comma-separate for several cities"),
+    hours: int = Query(24, ge=1)
+):
+    """Multi-hour forecast by rolling the LSTM forward autoregressively, all cities batched per step"""
+
+    ensure_model_ready()
+
+    max_hours = int(os.getenv("FORECAST_MAX_HOURS", 48))
+    if hours > max_hours:
+        raise HTTPException(status_code=400, detail=f"At most {max_hours} hours per forecast")
+
+    cities = list(dict.fromkeys(name.strip() for value in city for name in value.split(",") if name.strip()))
+    max_cities = int(os.getenv("MAX_BATCH_CITIES", 50))
+    if len(cities) > max_cities:
+        raise HTTPException(status_code=400, detail=f"At most {max_cities} cities per forecast")
+
+    logger.info(f"{hours}h forecast requested for {len(cities)} cities")
+
+    model_version = registry.active
+    by_city, missing = {}, []
+    for name in cities:
+        hit = forecast_cache.get(name, (model_version, hours)) if forecast_cache is not None else None
+        if hit is not None:
+            by_city[name] = hit
+        else:
+            missing.append(name)
+
+    errors = {}
+    if missing:
+        try:
+            fresh, errors = await forecast_flight.do(
+                (tuple(missing), model_version, hours), compute_forecasts, missing, model_version, hours
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Forecast unavailable: {str(e)}")
+        except Exception as e:
+            logger.error(f"Forecast rollout failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Forecast failed: {str(e)}")
+        by_city.update(fresh)
+
+    if not by_city:
+        raise HTTPException(status_code=404, detail=f"No city data available: {errors}")
+
+    return ForecastResponse(
+        forecasts=[by_city[name] for name in cities if name in by_city],
+        errors=errors,
+        hours=hours,
+        unit="°C",
+        model_version=model_version,
+        timestamp=datetime.now().isoformat(),
+        status="success"
+    )
+
+def export_cities(values):
+    """Cities named in repeated/comma-separated query values, every supported city when none are"""
+    cities = list(dict.fromkeys(name.strip() for value in values or () for name in value.split(",") if name.strip()))
+    unknown = [name for name in cities if name not in CITY_COORDS]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown cities: {', '.join(unknown)}")
+    return cities or list(CITY_COORDS)
+
+async def fetch_frames(cities):
+    """One bulk fetch; returns ({city: (frame, hour fetched in)}, {city: error}) in `cities` order"""
+    results = await load_cities_data(cities)
+    fetched, errors = {}, {}
+    for name in cities:
+        if isinstance(results[name], Exception):
+            logger.error(f"City data fetch failed for {name}: {results[name]}")
+            errors[name] = str(results[name])
+        else:
+            fetched[name] = results[name]
+    return fetched, errors
+
+async def current_predictions(cities, with_windows=False):
+    """Latest prediction per city, plus the windows they were scored from when asked
+
+    Without windows, cities the refresher has already scored cost nothing. With
+    windows, every city is fetched and scored in one batched call, so each window
+    is exactly the input of the prediction next to it.
+    """
+    latest = {}
+    if refresher is not None and not with_windows:
+        latest = {name: refresher.latest(name) for name in cities}
+    missing = [name for name in cities if latest.get(name) is None]
+    fetched, errors = await fetch_frames(missing) if missing else ({}, {})
+    if fetched:
+        for response in await predict_cities(list(fetched), list(fetched.values())):
+            latest[response.city] = response
+    responses = [latest[name] for name in cities if latest.get(name) is not None]
+    windows = build_input_windows([fetched[r.city][0] for r in responses], FEATURES) if with_windows else None
+    return responses, windows, errors
+
+def export_response(chunks, fmt, name):
+    media_type, extension = export.FORMATS[fmt]
+    return StreamingResponse(
+        chunks, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )
+
+@app.get("/export/predictions")
+async def export_predictions(
+    city: List[str] = Query(None, description="Cities to export; repeat or comma-separate, omit for all"),
+    fmt: str = Query("arrow", alias="format", pattern="^(arrow|parquet)$"),
+    include_windows: bool = Query(False, description="Add each prediction's (6, n_features) input window"),
+):
+    """Current predictions of many cities as one Arrow IPC stream or Parquet file"""
+    ensure_model_ready()
+    cities = export_cities(city)
+    try:
+        responses, windows, errors = await current_predictions(cities, include_windows)
+    except BatcherQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not responses:
+        raise HTTPException(status_code=404, detail=f"No city data available: {errors}")
+    try:
+        seq_length = windows.shape[1] if include_windows else None
+        schema = export.predictions_schema(FEATURES if include_windows else None, seq_length)
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=f"Bulk export needs pyarrow: {e}")
+    schema = export.with_metadata(schema, errors=errors, features=FEATURES)
+    batch = export.predictions_batch(responses, schema, windows)
+    logger.info(f"Exporting {len(responses)} predictions as {fmt}")
+    return export_response(export.stream([batch], schema, fmt), fmt, "predictions")
+
+@app.get("/export/history")
+async def export_history(
+    city: List[str] = Query(None, description="Cities to export; repeat or comma-separate, omit for all"),
+    fmt: str = Query("arrow", alias="format", pattern="^(arrow|parquet)$"),
+    hours: Optional[int] = Query(None, ge=1, description="Only the last `hours` rows per city"),
+):
+    """Hourly feature rows the model reads, every city in one Arrow IPC stream or Parquet file"""
+    cities = export_cities(city)
+    try:
+        schema = export.history_schema(FEATURES)
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=f"Bulk export needs pyarrow: {e}")
+    fetched, errors = await fetch_frames(cities)
+    frames = {name: frame for name, (frame, _) in fetched.items()}
+    if any(isinstance(frame, np.ndarray) for frame in frames.values()):
+        raise HTTPException(status_code=400, detail="History export needs LEAN_FETCH off: lean fetches keep only the model window")
+    if not frames:
+        raise HTTPException(status_code=404, detail=f"No city data available: {errors}")
+    schema = export.with_metadata(schema, errors=errors)
+    # Batches are built lazily, one per city, while the response streams
+    batches = (export.history_batch(name, frame, schema, hours) for name, frame in frames.items())
+    logger.info(f"Exporting history of {len(frames)} cities as {fmt}")
+    return export_response(export.stream(batches, schema, fmt), fmt, "history")
+
+@app.get("/batching/stats")
+def get_batching_stats():
+    """Micro-batching scheduler settings, queue depth, batch size and wait-time metrics"""
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Prediction cache size and hit/miss counters, single-flight counts and window memo reuse"""
+    extra = {
+        # The sync path's requests_cache lives in .cache.sqlite and reports through /metrics
+        "upstream": get_client().cache.stats() if ASYNC_FETCH else {"backend": "requests_cache"},
+        "single_flight": {
+            "fetch": (fetch_flight if ASYNC_FETCH else sync_fetch_flight).stats(),
+            "prediction": prediction_flight.stats(),
+            "forecast": forecast_flight.stats(),
+        },
+        "forecast": forecast_cache.stats() if forecast_cache is not None else {"enabled": False},
+        "window_memo": window_memo.stats() if window_memo is not None else {"enabled": False},
+    }
+    if prediction_cache is None:
+        return {"enabled": False, **extra}
+    return {"enabled": True, **prediction_cache.stats(), **extra}
+
+@app.get("/refresh/status")
+def get_refresh_status():
+    """Hourly refresher schedule plus last refresh time, duration and status per city"""
+    if refresher is None:
+        return {"enabled": False}
+    return {"enabled": True, **refresher.status()}
+
+@app.get("/stream/predictions")
+async def stream_predictions(
+    city: List[str] = Query(None, description="Cities to follow; repeat or comma-separate, omit for all"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events stream of predictions as the hourly refresh produces them
+
+    Sends the latest prediction of each followed city on connect (only those newer
+    than Last-Event-ID on a reconnect), then one `prediction` event per refreshed city.
+    """
+    if broadcaster is None:
+        raise HTTPException(status_code=503, detail="Prediction streaming needs REFRESH_ENABLED and STREAMING_ENABLED")
+    try:
+        cities = city_filter(city, CITY_COORDS)
+        broadcaster.check_capacity()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TooManySubscribers as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        broadcaster.stream(cities, parse_event_id(last_event_id)),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding events back in its buffer
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/stream/stats")
+def get_stream_stats():
+    """Prediction stream subscribers and published/queued event counts"""
+    if broadcaster is None:
+        return {"enabled": False}
+    return {"enabled": True, **broadcaster.stats()}
+
 @app.get("/cities")
 def get_supported_cities():
 
@@ -192,24 +967,92 @@ def get_supported_cities():
 @app.get("/model/info")
 def get_model_info():
     """Get model information and statistics"""
-    if not MODEL_LOADED:
-        raise HTTPException(status_code=503, detail="Model not loaded")
-    
+    ensure_model_ready()
+
     try:
+        model = model_loader.model
         model_info = {
-            "model_loaded": MODEL_LOADED,
+            "model_loaded": startup.ready,
             "model_version": os.getenv("MODEL_VERSION", "1.0.0"),
-            "features": FEATURES if 'FEATURES' in globals() else [],
+            "active_version": registry.active,
+            "features": FEATURES,
             "model_summary": {
                 "type": "LSTM",
                 "input_shape": model.input_shape if model else None,
                 "output_shape": model.output_shape if model else None,
-            }
+            },
+            "serving_latency": model_loader.SERVING_LATENCY,
+            "startup": startup.snapshot()
         }
         return model_info
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get model info: {str(e)}")
 
+@app.get("/models")
+def get_models():
+    """Registered model versions, routing split and per-version load time, memory and latency"""
+    ensure_model_ready()
+    return registry.stats()
+
+@app.post("/models/activate")
+async def activate_model(request: ActivateModelRequest):
+    """Load a version if needed, then atomically make it the active one for all workers"""
+    ensure_model_ready()
+    try:
+        previous = await run_in_threadpool(registry.activate, request.version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Activating model version {request.version} failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Activation failed: {str(e)}")
+    return {"active": request.version, "previous": previous}
+
+@app.post("/models/candidate")
+async def set_candidate_model(request: CandidateModelRequest):
+    """Route a percentage of traffic (sticky per city) to a candidate version; omit version to stop"""
+    ensure_model_ready()
+    try:
+        await run_in_threadpool(registry.set_candidate, request.version, request.percent)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Setting candidate model version {request.version} failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Setting candidate failed: {str(e)}")
+    return {"candidate": registry.candidate, "candidate_percent": registry.candidate_percent}
+
+@app.delete("/models/{version}")
+def unload_model(version: str):
+    """Free a loaded version that receives no traffic"""
+    ensure_model_ready()
+    try:
+        unloaded = registry.unload(version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"version": version, "unloaded": unloaded}
+
+# Debug-only profiling surface; not registered unless PROFILING_ENABLED is set
+if profiling.PROFILING_ENABLED:
+    @app.post("/debug/profile")
+    def start_profile(request: ProfileRequest):
+        """Sample every thread and trace spans for the next N /predict and /predict/batch calls"""
+        if request.requests < 1 or request.interval_ms <= 0 or request.timeout_s <= 0:
+            raise HTTPException(status_code=400, detail="requests, interval_ms and timeout_s must be positive")
+        try:
+            profiling.capture.arm(request.requests, request.interval_ms, request.timeout_s)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return profiling.capture.snapshot()
+
+    @app.get("/debug/profile")
+    def get_profile():
+        """Capture status and the recorded per-request spans"""
+        return profiling.capture.snapshot()
+
+    @app.get("/debug/profile/collapsed", response_class=PlainTextResponse)
+    def get_profile_collapsed(source: str = Query("samples", pattern="^(samples|spans)$")):
+        """Collapsed stacks for flamegraph.pl or speedscope: stack samples, or span self-time in µs"""
+        return profiling.capture.collapsed(source)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -217,5 +1060,7 @@ if __name__ == "__main__":
         app,
         host=os.getenv("API_HOST", "0.0.0.0"),
         port=port,
-        reload=os.getenv("DEBUG", "False").lower() == "true"
-    )
\ No newline at end of file
+        reload=os.getenv("DEBUG", "False").lower() == "true",
+        # Open /stream/predictions connections never finish on their own; cut them off on shutdown
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_S", 10)),
+    )
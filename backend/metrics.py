@@ -0,0 +1,205 @@
+# backend/metrics.py
+"""Prometheus metrics for the serving path.
+
+Stage timers observe pre-bound histogram children, so an observation is a
+perf_counter pair and a bucket increment (2-3 µs). With
+METRICS_ENABLED=false nothing is observed; timers still open profiling spans
+(see profiling.py), which cost nothing unless a capture is armed.
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory so /metrics
+aggregates every worker instead of reporting whichever one served the scrape.
+"""
+import contextlib
+import contextvars
+import functools
+import os
+import time
+
+import profiling
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# fetch: upstream HTTP call; decode: FlatBuffers to DataFrame (or lean window); sequence: stacking
+# model windows; inference: the model call, which includes scaling and inverse_transform unless
+# FUSED_SCALING folded them into the weights; uncertainty: the MC-dropout sampling pass
+STAGES = ("fetch", "decode", "sequence", "scaling", "inference", "inverse_transform", "uncertainty")
+
+# From tens of microseconds (NumPy stages) up to slow upstream calls
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "weather_stage_seconds", "Time spent in each stage of the prediction pipeline",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "weather_http_requests_total", "HTTP requests by route and response status",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "weather_http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "weather_http_requests_in_flight", "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_CACHE = Counter(
+    "weather_upstream_cache_total",
+    "Open-Meteo responses by HTTP cache result (requests_cache, or the async client's response cache)",
+    ["result"],
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "weather_model_load_seconds", "Duration of each start-up loading stage",
+    ["stage"], multiprocess_mode="max",
+)
+MODEL_VERSION_LOAD_SECONDS = Gauge(
+    "weather_model_version_load_seconds", "Time to load each registry model version",
+    ["version"], multiprocess_mode="max",
+)
+
+_stage_observers = {name: STAGE_SECONDS.labels(name).observe for name in STAGES}
+
+# Set inside `suppressed()`; per thread and per asyncio task, so serving traffic is still observed
+_suppressed = contextvars.ContextVar("metrics_suppressed", default=False)
+
+
+@contextlib.contextmanager
+def suppressed():
+    """Keep synthetic calls (start-up warm-up) out of the stage histograms"""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+class _StageTimer:
+    # Lighter than prometheus_client's Timer, which also handles decorating and labels.
+    # Also records a profiling span when the request is being captured.
+    __slots__ = ("_name", "_observe", "_start", "_span")
+
+    def __init__(self, name, observe):
+        self._name = name
+        self._observe = observe
+
+    def __enter__(self):
+        self._span = profiling.open_span(self._name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._start
+        if not _suppressed.get():
+            self._observe(elapsed)
+        if self._span is not None:
+            profiling.close_span(self._span, elapsed)
+
+
+def stage(name):
+    """Context manager timing one pipeline stage into weather_stage_seconds"""
+    if not METRICS_ENABLED:
+        return profiling.span(name)
+    return _StageTimer(name, _stage_observers[name])
+
+
+def timed(name):
+    """Decorator form of `stage`"""
+    def decorator(fn):
+        observe = _stage_observers[name]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _StageTimer(name, observe) if METRICS_ENABLED else profiling.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_upstream_cache(response, *args, **kwargs):
+    """requests `response` hook counting requests_cache hits and misses"""
+    # The hook also runs on the raw response of a miss before requests_cache wraps it
+    from_cache = getattr(response, "from_cache", None)
+    if METRICS_ENABLED and from_cache is not None:
+        UPSTREAM_CACHE.labels("hit" if from_cache else "miss").inc()
+    return response
+
+
+def record_upstream_lookup(hit):
+    """Count one lookup of the async client's response cache, under the same labels as the hook"""
+    if METRICS_ENABLED:
+        UPSTREAM_CACHE.labels("hit" if hit else "miss").inc()
+
+
+def record_startup(stages):
+    """Export the StartupState stage durations once loading finishes"""
+    if not METRICS_ENABLED:
+        return
+    for name, info in stages.items():
+        if info.get("duration_ms") is not None:
+            MODEL_LOAD_SECONDS.labels(name).set(info["duration_ms"] / 1000.0)
+
+
+def record_version_load(name, load_ms):
+    if METRICS_ENABLED:
+        MODEL_VERSION_LOAD_SECONDS.labels(name).set(load_ms / 1000.0)
+
+
+def render():
+    """Exposition body and content type for /metrics"""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware recording in-flight requests, status counts and latency per route.
+
+    Routes are labelled by their path template (`/models/{version}`), so path
+    parameters and unknown URLs do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = self._route(scope)
+            HTTP_REQUESTS.labels(scope["method"], route, str(status)).inc()
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - start)
@@ -0,0 +1,301 @@
+# backend/mock_openmeteo.py
+"""Local stand-in for the Open-Meteo forecast API, for offline load tests.
+
+Answers `/v1/forecast` in the FlatBuffers format the backend requests, for
+every city in CITY_COORDS, including multi-location, past_hours /
+forecast_hours and start_hour / end_hour (lean) requests. Hourly series are either recorded from the
+real API once (`--record`) or synthesized: a smooth daily cycle per city inside
+the range the scaler was fitted on, so model inputs look like real weather.
+
+Usage:
+    python mock_openmeteo.py --port 8765 --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+    python mock_openmeteo.py --record fixtures/           # needs network, once
+    python mock_openmeteo.py --fixtures fixtures/         # serve the recordings
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zoneinfo
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import flatbuffers
+import numpy as np
+
+from data_fetcher import CITY_COORDS, FEATURES, FORECAST_URL, build_city_params
+
+# (openmeteo_sdk Variable, altitude, Unit) per hourly variable
+VARIABLES = {
+    "temperature_2m": (47, 2, 1),
+    "relative_humidity_2m": (29, 2, 35),
+    "dew_point_2m": (8, 2, 1),
+    "apparent_temperature": (1, 0, 1),
+    "precipitation": (24, 0, 32),
+    "windspeed_10m": (59, 10, 24),
+    "surface_pressure": (45, 0, 16),
+}
+# Open-Meteo's default hourly response: 7 days from local midnight
+DEFAULT_FORECAST_HOURS = 168
+
+
+def encode_location(lat, lon, utc_offset, location_id, start, interval, variables):
+    """One length-prefixed WeatherApiResponse with an hourly block of (variable name, float32 values)"""
+    builder = flatbuffers.Builder(1024 + 4 * sum(len(values) for _, values in variables))
+    variable_offsets = []
+    for name, values in variables:
+        variable, altitude, unit = VARIABLES[name]
+        vector = builder.CreateNumpyVector(np.asarray(values, dtype=np.float32))
+        # Slots follow the field order of openmeteo_sdk.VariableWithValues
+        builder.StartObject(14)
+        builder.PrependUint8Slot(0, variable, 0)
+        builder.PrependUint8Slot(1, unit, 0)
+        builder.PrependUOffsetTRelativeSlot(3, vector, 0)
+        builder.PrependInt16Slot(5, altitude, 0)
+        variable_offsets.append(builder.EndObject())
+    builder.StartVector(4, len(variable_offsets), 4)
+    for offset in reversed(variable_offsets):
+        builder.PrependUOffsetTRelative(offset)
+    variables_vector = builder.EndVector()
+
+    n_hours = len(variables[0][1]) if variables else 0
+    builder.StartObject(4)
+    builder.PrependInt64Slot(0, start, 0)
+    builder.PrependInt64Slot(1, start + n_hours * interval, 0)
+    builder.PrependInt32Slot(2, interval, 0)
+    builder.PrependUOffsetTRelativeSlot(3, variables_vector, 0)
+    hourly = builder.EndObject()
+
+    builder.StartObject(15)
+    builder.PrependFloat32Slot(0, lat, 0.0)
+    builder.PrependFloat32Slot(1, lon, 0.0)
+    builder.PrependInt32Slot(4, location_id, 0)
+    builder.PrependInt32Slot(6, utc_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(11, hourly, 0)
+    builder.Finish(builder.EndObject())
+    body = bytes(builder.Output())
+    return len(body).to_bytes(4, "little") + body
+
+
+def utc_offset_seconds(tz_name):
+    if tz_name in ("GMT", "UTC", "auto"):
+        return 0
+    return int(datetime.now(zoneinfo.ZoneInfo(tz_name)).utcoffset().total_seconds())
+
+
+def local_hour_to_epoch(value, utc_offset):
+    """Unix time of an ISO8601 local hour ("2024-05-01T13:00") at a fixed UTC offset"""
+    local = datetime.strptime(value, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc)
+    return int(local.timestamp()) - utc_offset
+
+
+class SyntheticSeries:
+    """Deterministic hourly values per city: a daily cycle plus noise, inside the scaler's fitted range"""
+
+    def __init__(self, scaler_path=os.path.join(os.path.dirname(__file__), "models", "scaler_global.pkl")):
+        import joblib
+
+        scaler = joblib.load(scaler_path)
+        low, high = scaler.data_min_.astype(np.float32), scaler.data_max_.astype(np.float32)
+        # Stay inside the middle of the range so every window is in-distribution
+        self.mid = (low + high) / 2
+        self.amplitude = (high - low) / 4
+
+    def values(self, city, start, n_hours):
+        """(n_hours, len(FEATURES)) values for hours starting at unix time `start`"""
+        seed = sum(ord(ch) for ch in city)
+        hours = start // 3600 + np.arange(n_hours)
+        phase = 2 * np.pi * (hours % 24) / 24.0
+        noise = np.sin(hours[:, None] * 0.7 + np.arange(len(FEATURES)) + seed) * 0.1
+        offsets = (seed % 7 - 3) / 10.0
+        values = self.mid + self.amplitude * (np.sin(phase + seed)[:, None] * 0.8 + noise + offsets)
+        # Precipitation is mostly zero
+        values[:, FEATURES.index("precipitation")] = np.clip(values[:, FEATURES.index("precipitation")] - self.mid[FEATURES.index("precipitation")], 0, None)
+        return values.astype(np.float32)
+
+
+class RecordedSeries:
+    """Hourly values recorded from Open-Meteo by `record`, replayed for any requested hours"""
+
+    def __init__(self, fixtures_dir):
+        from async_fetcher import decode_responses
+
+        self.series = {}
+        for city in CITY_COORDS:
+            with open(os.path.join(fixtures_dir, fixture_name(city)), "rb") as f:
+                hourly = decode_responses(f.read())[0].Hourly()
+            self.series[city] = np.stack(
+                [hourly.Variables(i).ValuesAsNumpy() for i in range(hourly.VariablesLength())], axis=1
+            )
+
+    def values(self, city, start, n_hours):
+        # The recording covers a fixed week; wrap it around the requested hours
+        series = self.series[city]
+        rows = (start // 3600 + np.arange(n_hours)) % len(series)
+        return series[rows]
+
+
+def fixture_name(city):
+    return city.lower().replace(" ", "_") + ".fb"
+
+
+def record(fixtures_dir, url=FORECAST_URL):
+    """Save one real FlatBuffers response per city, requested exactly like data_fetcher does"""
+    import requests
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for city in CITY_COORDS:
+        # Always the full default week, whatever LEAN_FETCH is set to here
+        params = {**build_city_params(city), "format": "flatbuffers"}
+        for name in ("past_hours", "forecast_hours", "start_hour", "end_hour"):
+            params.pop(name, None)
+        response = requests.get(url, params=params, timeout=30)
+        response.raise_for_status()
+        with open(os.path.join(fixtures_dir, fixture_name(city)), "wb") as f:
+            f.write(response.content)
+        print(f"✅ Recorded {city} ({len(response.content)} bytes)")
+
+
+class MockOpenMeteo(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, series, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=500, seed=0):
+        super().__init__(address, MockHandler)
+        self.series = series
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.by_coords = {(round(lat, 4), round(lon, 4)): city for city, (lat, lon, _) in CITY_COORDS.items()}
+        self.stats = {"requests": 0, "locations": 0, "injected_errors": 0}
+        self.lock = threading.Lock()
+
+    def forecast(self, query):
+        """Body for a /forecast query, or raise ValueError with Open-Meteo's error reason"""
+        lats = [float(v) for v in query["latitude"][0].split(",")]
+        lons = [float(v) for v in query["longitude"][0].split(",")]
+        names = query.get("hourly", [""])[0].split(",")
+        timezones = query.get("timezone", ["GMT"])[0].split(",")
+        if len(lats) != len(lons):
+            raise ValueError("Parameter 'latitude' and 'longitude' must have the same number of elements")
+        unknown = [name for name in names if name not in VARIABLES]
+        if unknown:
+            raise ValueError(f"Cannot initialize WeatherVariable from invalid String value {unknown[0]}")
+        columns = [FEATURES.index(name) for name in names]
+
+        now = int(time.time()) // 3600 * 3600
+        messages = []
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            city = self.by_coords.get((round(lat, 4), round(lon, 4)))
+            if city is None:
+                raise ValueError(f"No recorded data for {lat},{lon}")
+            tz_name = timezones[i] if len(timezones) > 1 else timezones[0]
+            utc_offset = utc_offset_seconds(tz_name)
+            if "start_hour" in query and "end_hour" in query:
+                # Local times; both ends inclusive
+                start = local_hour_to_epoch(query["start_hour"][0], utc_offset)
+                n_hours = (local_hour_to_epoch(query["end_hour"][0], utc_offset) - start) // 3600 + 1
+                if n_hours < 1:
+                    raise ValueError("Parameter 'end_hour' must be after 'start_hour'")
+            elif "past_hours" in query or "forecast_hours" in query:
+                past = int(query.get("past_hours", [0])[0])
+                start, n_hours = now - past * 3600, past + int(query.get("forecast_hours", [DEFAULT_FORECAST_HOURS])[0])
+            else:
+                # Local midnight today, like the real default response
+                start, n_hours = (now + utc_offset) // 86400 * 86400 - utc_offset, DEFAULT_FORECAST_HOURS
+            values = self.series.values(city, start, n_hours)
+            messages.append(encode_location(
+                lat, lon, utc_offset, i, start, 3600,
+                [(name, values[:, column]) for name, column in zip(names, columns)],
+            ))
+        return b"".join(messages), len(lats)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle on, keep-alive clients wait out a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            with server.lock:
+                return self._send(200, json.dumps(server.stats).encode(), "application/json")
+        if not url.path.endswith("/forecast"):
+            return self._send(404, b'{"error": true, "reason": "Not Found"}', "application/json")
+
+        with server.lock:
+            server.stats["requests"] += 1
+            delay = max(server.latency_ms + server.random.uniform(-server.jitter_ms, server.jitter_ms), 0.0)
+            fail = server.random.random() < server.error_rate
+            if fail:
+                server.stats["injected_errors"] += 1
+        if delay:
+            time.sleep(delay / 1000.0)
+        if fail:
+            return self._send(server.error_status, b'{"error": true, "reason": "Injected error"}', "application/json")
+
+        try:
+            body, n_locations = server.forecast(parse_qs(url.query))
+        except (KeyError, ValueError) as e:
+            return self._send(400, json.dumps({"error": True, "reason": str(e)}).encode(), "application/json")
+        with server.lock:
+            server.stats["locations"] += n_locations
+        self._send(200, body, "application/octet-stream")
+
+
+def start_server(port=8765, host="127.0.0.1", fixtures=None, **options):
+    """Serve in a background thread; returns the server (call `shutdown()` to stop)"""
+    series = RecordedSeries(fixtures) if fixtures else SyntheticSeries()
+    server = MockOpenMeteo((host, port), series, **options)
+    threading.Thread(target=server.serve_forever, name="mock-openmeteo", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="Directory of recorded responses (default: synthetic data)")
+    parser.add_argument("--record", metavar="DIR", help="Record one response per city from Open-Meteo into DIR and exit")
+    parser.add_argument("--upstream", default=FORECAST_URL, help="Forecast URL to record from")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- spread around --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.upstream)
+        return
+
+    server = start_server(
+        args.port, args.host, args.fixtures, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed,
+    )
+    print(f"Mock Open-Meteo listening on http://{args.host}:{args.port}/v1 "
+          f"({'fixtures ' + args.fixtures if args.fixtures else 'synthetic data'})", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,308 @@
 # backend/model_loader.py
-import tensorflow as tf
+import numpy as np
 import joblib
 import os
+import time
+from contextlib import nullcontext
 
-# Load model and scaler from models folder
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "models" , "global_weather_saved_model.keras")
+from data_fetcher import FEATURES, SEQ_LENGTH
+import metrics
+from model_utils import predict_temperatures, affine_celsius_fn
+import uncertainty
+from runtimes import RUNTIME_PATHS, build_serving_fn, load_runtime
+
+# Model and scaler files in the models folder
+MODEL_PATH = RUNTIME_PATHS["keras"]
 SCALER_PATH = os.path.join(os.path.dirname(__file__), "models" , "scaler_global.pkl")
+WEIGHTS_PATH = RUNTIME_PATHS["numpy"]
+FUSED_WEIGHTS_PATH = os.path.join(os.path.dirname(__file__), "models" , "global_weather_fused.npz")
+# Directories of .npy files written by export_weights.py --npy-dirs
+WEIGHTS_DIR = os.path.splitext(WEIGHTS_PATH)[0]
+FUSED_WEIGHTS_DIR = os.path.splitext(FUSED_WEIGHTS_PATH)[0]
+
+# "keras" runs TensorFlow; "numpy", "tflite", "tflite-int8" and "onnx" run exported artifacts
+# (see runtimes.py) without the Keras model
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "keras").lower()
+RUNTIME_MODEL_PATH = os.getenv("RUNTIME_MODEL_PATH") or None
+RUNTIME_THREADS = int(os.getenv("RUNTIME_THREADS", 0)) or None
+# Largest TFLite interpreter batch; smaller batches are padded to a power of two
+TFLITE_MAX_BATCH = int(os.getenv("TFLITE_MAX_BATCH", 64))
+SERVING_FAST_PATH = os.getenv("SERVING_FAST_PATH", "True").lower() == "true"
+SERVING_XLA = os.getenv("SERVING_XLA", "False").lower() == "true"
+SERVING_WARMUP_RUNS = int(os.getenv("SERVING_WARMUP_RUNS", 20))
+# Fold MinMax scaling into the serving model: raw windows in, °C out, no sklearn per request
+FUSED_SCALING = os.getenv("FUSED_SCALING", "True").lower() == "true"
+# Memory-map the NumPy engine's weights so every worker process shares one page-cache copy
+NUMPY_WEIGHTS_MMAP = os.getenv("NUMPY_WEIGHTS_MMAP", "False").lower() == "true"
+
+
+def numpy_weights_path(npz_path, npy_dir):
+    """The .npy directory when NUMPY_WEIGHTS_MMAP is on and it has been exported, else the .npz"""
+    if NUMPY_WEIGHTS_MMAP:
+        if os.path.isdir(npy_dir):
+            return npy_dir
+        print(f"⚠️ NUMPY_WEIGHTS_MMAP is set but {npy_dir} is missing; reading {npz_path} instead")
+    return npz_path
+
+
+def artifact_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def build_celsius_fn(model, scale, offset, seq_length=SEQ_LENGTH, jit_compile=False, target_index=0):
+    """Trace scale -> model -> inverse-scale of the target column as one graph over raw windows"""
+    import tensorflow as tf
+
+    scale = tf.constant(scale, dtype=tf.float32)
+    offset = tf.constant(offset, dtype=tf.float32)
+
+    @tf.function(
+        input_signature=[tf.TensorSpec([None, seq_length, len(FEATURES)], tf.float32)],
+        jit_compile=jit_compile,
+    )
+    def serve(x):
+        y = model(x * scale + offset, training=False)
+        return (y - offset[target_index]) / scale[target_index]
+
+    return serve
+
+
+# Populated by load(); importing this module does not touch TensorFlow or the model files
+model = None
+scaler = None
+serving_fn = None
+celsius_fn = None
+sample_fn = None
+SERVING_LATENCY = None
+
+
+def load(startup=None):
+    """Load the engine, scaler and serving functions, then warm up with real inference calls
+
+    `startup` (a startup.StartupState) records how long each stage took.
+    """
+    global model, scaler, serving_fn, celsius_fn, sample_fn, SERVING_LATENCY
+    stage = startup.stage if startup is not None else (lambda name: nullcontext())
+
+    if INFERENCE_ENGINE == "keras":
+        with stage("import_tensorflow"):
+            import tensorflow as tf
+        with stage("load_model"):
+            model = tf.keras.models.load_model(MODEL_PATH, compile=False)
+            serving_fn = build_serving_fn(model, len(FEATURES), SEQ_LENGTH, jit_compile=SERVING_XLA)
+        print(f"Model file size: {os.path.getsize(MODEL_PATH)} bytes")
+    else:
+        model_path = RUNTIME_MODEL_PATH or RUNTIME_PATHS[INFERENCE_ENGINE]
+        if INFERENCE_ENGINE == "numpy" and RUNTIME_MODEL_PATH is None:
+            model_path = numpy_weights_path(WEIGHTS_PATH, WEIGHTS_DIR)
+        with stage("load_model"):
+            model = load_runtime(INFERENCE_ENGINE, model_path, num_threads=RUNTIME_THREADS, max_batch=TFLITE_MAX_BATCH)
+            serving_fn = None
+        print(f"Runtime artifact size: {artifact_size(model_path)} bytes ({model_path})")
+
+    with stage("load_scaler"):
+        scaler = joblib.load(SCALER_PATH)
+    print(f"Scaler file size: {os.path.getsize(SCALER_PATH)} bytes")
+
+    with stage("fuse_scaling"):
+        celsius_fn = None
+        if FUSED_SCALING and INFERENCE_ENGINE == "numpy":
+            # Prefer the exported fused weights; fold at start-up if they have not been exported
+            fused_path = numpy_weights_path(FUSED_WEIGHTS_PATH, FUSED_WEIGHTS_DIR)
+            if os.path.exists(fused_path):
+                from numpy_engine import NumpyLSTMEngine
+                celsius_fn = NumpyLSTMEngine.load(fused_path).predict
+            else:
+                celsius_fn = model.fold_scaler(scaler.scale_, scaler.min_).predict
+        elif FUSED_SCALING and INFERENCE_ENGINE != "keras":
+            # TFLite/ONNX graphs stay scaled-in, scaled-out; apply the constants around them in NumPy
+            celsius_fn = affine_celsius_fn(model.predict, scaler.scale_, scaler.min_)
+        elif FUSED_SCALING and SERVING_FAST_PATH:
+            celsius_graph = build_celsius_fn(model, scaler.scale_, scaler.min_, jit_compile=SERVING_XLA)
+            celsius_fn = lambda x: celsius_graph(x).numpy()
+    with stage("uncertainty"):
+        sample_fn = build_sample_fn(model, scaler) if uncertainty.MC_DROPOUT_SAMPLES > 0 else None
+    print(f"✅ Model and scaler loaded successfully! (engine: {INFERENCE_ENGINE})")
+
+    # Warm-up calls go through the timed serving stages; keep them out of the latency histograms
+    with stage("warm_up"), metrics.suppressed():
+        SERVING_LATENCY = warm_up()
+    if serving_fn is None:
+        print(f"Serving warm-up: {INFERENCE_ENGINE} engine {SERVING_LATENCY['engine_ms']['p50']} ms (p50, batch=1)")
+    else:
+        print(
+            f"Serving warm-up: model.predict {SERVING_LATENCY['model_predict_ms']['p50']} ms, "
+            f"traced {SERVING_LATENCY['serving_fn_ms']['p50']} ms (p50, batch=1)"
+        )
+    if celsius_fn is not None:
+        print(
+            f"Scaling: sklearn around the model {SERVING_LATENCY['scaling']['sklearn_scaled_ms']['p50']} ms, "
+            f"fused {SERVING_LATENCY['scaling']['fused_ms']['p50']} ms (p50, batch=1)"
+        )
+    if sample_fn is not None:
+        print(
+            f"MC dropout: {uncertainty.MC_DROPOUT_SAMPLES} samples in "
+            f"{SERVING_LATENCY['mc_dropout']['ms']['p50']} ms (p50, batch=1)"
+        )
+
+
+def build_sample_fn(engine_model, engine_scaler, engine=INFERENCE_ENGINE):
+    """MC-dropout sampler for the serving model: raw windows -> (samples, N) °C"""
+    if engine == "keras":
+        return uncertainty.keras_sampler(
+            engine_model, engine_scaler.scale_, engine_scaler.min_, SEQ_LENGTH, len(FEATURES)
+        )
+    if engine != "numpy":
+        # TFLite and ONNX exports drop the Dropout layer; sample from the NumPy export of the same weights
+        engine_model = get_numpy_engine()
+    return uncertainty.numpy_sampler(engine_model, engine_scaler.scale_, engine_scaler.min_)
+
+
+def load_version(spec, base_dir):
+    """Load one registry entry; returns (predict, predict_celsius, scaler, sample_celsius) like the module-level names
+
+    `spec` holds `model` (the artifact for its runtime), `scaler` and optionally
+    `engine` (a runtimes.RUNTIME_PATHS key); paths are relative to `base_dir`.
+    """
+    engine = spec.get("engine", "keras")
+    version_scaler = joblib.load(os.path.join(base_dir, spec["scaler"]))
+    model_path = os.path.join(base_dir, spec["model"])
+
+    if engine == "numpy":
+        from numpy_engine import NumpyLSTMEngine
+        version_model = NumpyLSTMEngine.load(model_path)
+        version_predict = version_model.predict
+        fused = version_model.fold_scaler(version_scaler.scale_, version_scaler.min_)
+        return (
+            version_predict,
+            lambda windows: fused.predict(np.asarray(windows, dtype=np.float32))[:, 0],
+            version_scaler,
+            uncertainty.numpy_sampler(fused),
+        )
+    if engine != "keras":
+        runtime = load_runtime(engine, model_path, num_threads=RUNTIME_THREADS, max_batch=TFLITE_MAX_BATCH)
+        version_celsius_fn = affine_celsius_fn(runtime.predict, version_scaler.scale_, version_scaler.min_)
+        # The exported graph has no Dropout layer and the version has no NumPy export to sample from
+        return (
+            runtime.predict,
+            lambda windows: version_celsius_fn(np.asarray(windows, dtype=np.float32))[:, 0],
+            version_scaler,
+            None,
+        )
+
+    import tensorflow as tf
+    version_model = tf.keras.models.load_model(model_path, compile=False)
+    if version_model.input_shape[1:] != (SEQ_LENGTH, len(FEATURES)):
+        raise ValueError(f"{spec['model']} expects input {version_model.input_shape}, not (None, {SEQ_LENGTH}, {len(FEATURES)})")
+    version_serving_fn = build_serving_fn(version_model, len(FEATURES), SEQ_LENGTH, jit_compile=SERVING_XLA)
+    version_celsius_fn = build_celsius_fn(
+        version_model, version_scaler.scale_, version_scaler.min_, jit_compile=SERVING_XLA
+    )
+
+    # Trace both graphs now so the first routed request does not pay for it
+    X = np.zeros((1, SEQ_LENGTH, len(FEATURES)), dtype=np.float32)
+    version_serving_fn(X)
+    version_celsius_fn(X)
+    return (
+        lambda x: version_serving_fn(np.asarray(x, dtype=np.float32)).numpy(),
+        lambda windows: version_celsius_fn(np.asarray(windows, dtype=np.float32)).numpy()[:, 0],
+        version_scaler,
+        build_sample_fn(version_model, version_scaler, engine="keras"),
+    )
+
+
+def get_numpy_engine():
+    """The NumPy engine for features the other runtimes lack (e.g. MC-dropout sampling)"""
+    if INFERENCE_ENGINE == "numpy":
+        return model
+    from numpy_engine import NumpyLSTMEngine
+    return NumpyLSTMEngine.load(numpy_weights_path(WEIGHTS_PATH, WEIGHTS_DIR))
+
+
+def predict(X):
+    """Predict scaled temperature for an (N, 6, n_features) float32 array, returns (N, 1)"""
+    if serving_fn is None:
+        return model.predict(X)
+    if not SERVING_FAST_PATH:
+        return model.predict(X, verbose=0)
+    return serving_fn(np.asarray(X, dtype=np.float32)).numpy()
+
+
+def predict_celsius(windows):
+    """Predict °C for raw (N, 6, n_features) windows, returns (N,)
+
+    With FUSED_SCALING the MinMax constants live inside the serving model, so this
+    is a single vectorized call; otherwise it scales and inverse-scales with sklearn.
+    """
+    if celsius_fn is None:
+        return predict_temperatures(predict, scaler, windows)
+    return celsius_fn(np.asarray(windows, dtype=np.float32))[:, 0]
+
+
+def sample_celsius(windows, samples):
+    """MC-dropout predictions in °C for raw (N, 6, n_features) windows, returns (samples, N)"""
+    return sample_fn(np.asarray(windows, dtype=np.float32), samples)
+
+
+def _time_calls(fn, X, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(X)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    timings = np.array(timings)
+    return {
+        "mean": round(float(timings.mean()), 3),
+        "p50": round(float(np.percentile(timings, 50)), 3),
+        "p99": round(float(np.percentile(timings, 99)), 3),
+    }
+
+
+def warm_up(runs=SERVING_WARMUP_RUNS):
+    """Trace the serving function and record single-sample latency for each path"""
+    X = np.zeros((1, SEQ_LENGTH, len(FEATURES)), dtype=np.float32)
+
+    # Raw-window paths: sklearn scaling around the model versus scaling fused into it
+    raw = np.zeros((1, SEQ_LENGTH, len(FEATURES)), dtype=np.float32)
+    scaling = {"fused": celsius_fn is not None}
+    if celsius_fn is not None:
+        predict_celsius(raw)
+        scaling["sklearn_scaled_ms"] = _time_calls(lambda x: predict_temperatures(predict, scaler, x), raw, runs)
+        scaling["fused_ms"] = _time_calls(predict_celsius, raw, runs)
+
+    # One tiled pass of every MC-dropout sample; also traces the Keras sampling graph
+    mc_dropout = {"samples": uncertainty.MC_DROPOUT_SAMPLES if sample_fn is not None else 0}
+    if sample_fn is not None:
+        sample_celsius(raw, uncertainty.MC_DROPOUT_SAMPLES)
+        mc_dropout["ms"] = _time_calls(lambda x: sample_celsius(x, uncertainty.MC_DROPOUT_SAMPLES), raw, runs)
 
-model = tf.keras.models.load_model(MODEL_PATH, compile=False)
-scaler = joblib.load(SCALER_PATH)
+    if serving_fn is None:
+        return {
+            "engine": INFERENCE_ENGINE,
+            "batch_size": 1,
+            "runs": runs,
+            "engine_ms": _time_calls(model.predict, X, runs),
+            "scaling": scaling,
+            "mc_dropout": mc_dropout,
+        }
 
-print(f"Model file size: {os.path.getsize(MODEL_PATH)} bytes")
-print(f"Scaler file size: {os.path.getsize(SCALER_PATH)} bytes")
-print("✅ Model and scaler loaded successfully!")
+    start = time.perf_counter()
+    serving_fn(X)
+    trace_ms = (time.perf_counter() - start) * 1000.0
 
+    # Before/after numbers: Keras predict versus the traced callable, batch of one
+    model.predict(X, verbose=0)
+    return {
+        "engine": INFERENCE_ENGINE,
+        "batch_size": 1,
+        "runs": runs,
+        "xla": SERVING_XLA,
+        "fast_path": SERVING_FAST_PATH,
+        "trace_ms": round(trace_ms, 3),
+        "model_predict_ms": _time_calls(lambda x: model.predict(x, verbose=0), X, runs),
+        "serving_fn_ms": _time_calls(lambda x: serving_fn(x).numpy(), X, runs),
+        "scaling": scaling,
+        "mc_dropout": mc_dropout,
+    }
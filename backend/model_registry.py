@@ -0,0 +1,393 @@
+# backend/model_registry.py
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+import ensemble
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of the backoff between retries of a failed activation picked up from the registry file
+ACTIVATION_RETRY_MAX_S = float(os.getenv("MODEL_ACTIVATION_RETRY_MAX_S", 300))
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux /proc, falls back to peak RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class ModelVersion:
+    """One loaded model version plus its serving metrics.
+
+    `predict` maps scaled windows to scaled temperatures and `predict_celsius`
+    maps raw windows to °C, mirroring the functions in model_loader; `scaler`
+    is the MinMaxScaler the version was trained with. `sample_celsius` returns
+    (samples, N) MC-dropout predictions, or is None when the version cannot sample.
+    `ensemble` is the EnsembleModel behind an ensemble version.
+    """
+
+    def __init__(self, name, predict, predict_celsius, scaler, engine, load_ms=None, rss_delta_mb=None,
+                 latency_window=1024, sample_celsius=None, ensemble=None):
+        self.name = name
+        self.predict = predict
+        self.predict_celsius = predict_celsius
+        self.scaler = scaler
+        self.sample_celsius = sample_celsius
+        self.ensemble = ensemble
+        self.engine = engine
+        self.load_ms = load_ms
+        self.rss_delta_mb = rss_delta_mb
+        self.loaded_at = time.time()
+        self._latencies = deque(maxlen=latency_window)
+        self._calls = 0
+        self._windows = 0
+        self._lock = threading.Lock()
+
+    def record(self, n_windows, latency_ms):
+        with self._lock:
+            self._latencies.append(latency_ms)
+            self._calls += 1
+            self._windows += n_windows
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies)
+            calls, windows = self._calls, self._windows
+        latency = None
+        if len(latencies):
+            latency = {
+                "mean": round(float(latencies.mean()), 3),
+                "p50": round(float(np.percentile(latencies, 50)), 3),
+                "p99": round(float(np.percentile(latencies, 99)), 3),
+            }
+        return {
+            "engine": self.engine,
+            "load_ms": None if self.load_ms is None else round(self.load_ms, 1),
+            "rss_delta_mb": None if self.rss_delta_mb is None else round(self.rss_delta_mb, 1),
+            "calls": calls,
+            "windows": windows,
+            "latency_ms": latency,
+        }
+
+    def close(self):
+        """Release resources held beyond the model itself (the ensemble thread pool)"""
+        if self.ensemble is not None:
+            self.ensemble.close()
+
+
+class ModelRegistry:
+    """Named model versions loaded on first use, with atomic hot-swap and A/B routing.
+
+    The routing config (active version, optional candidate and the percentage of
+    traffic it receives) lives in a JSON file next to the models. Changes made
+    through `activate`/`set_candidate` are written back to that file, and every
+    worker re-reads it when its mtime changes, so a rollout reaches all workers
+    without a restart. A new active version is fully loaded before the swap, so
+    requests never see a half-initialised model. If that load fails, the file
+    counts as unread and the activation is retried with exponential backoff.
+    """
+
+    def __init__(self, path, loader, poll_s=5.0):
+        self.path = path
+        self.base_dir = os.path.dirname(os.path.abspath(path))
+        self.loader = loader
+        self.poll_s = poll_s
+
+        self._versions = {}
+        self._specs = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+        self._routed = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        # Background activation of a version picked up by `poll`, and its last failure
+        self._activating = None
+        self._activation_error = None
+        self._retry_at = 0.0
+
+        self.active = None
+        self.candidate = None
+        self.candidate_percent = 0.0
+        self._mtime = self._read_config()
+
+    def _read_config(self):
+        """Apply the file's routing config; returns the mtime it was read at"""
+        mtime = os.path.getmtime(self.path)
+        with open(self.path) as f:
+            config = json.load(f)
+        specs = config["versions"]
+        active = config["active"]
+        candidate = config.get("candidate")
+        for name in filter(None, (active, candidate)):
+            if name not in specs:
+                raise ValueError(f"Unknown model version in {self.path}: {name}")
+        with self._lock:
+            self._specs = specs
+            self.active = active
+            self.candidate = candidate
+            self.candidate_percent = float(config.get("candidate_percent", 0.0)) if candidate else 0.0
+        return mtime
+
+    def _write_config(self):
+        with self._lock:
+            config = {
+                "active": self.active,
+                "candidate": self.candidate,
+                "candidate_percent": self.candidate_percent,
+                "versions": self._specs,
+            }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(config, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def poll(self):
+        """Pick up routing changes written by another worker; cheap enough to call per request"""
+        now = time.monotonic()
+        if now - self._checked_at < self.poll_s:
+            return
+        self._checked_at = now
+        with self._lock:
+            if self._activating is not None or now < self._retry_at:
+                return
+        try:
+            if os.path.getmtime(self.path) == self._mtime:
+                return
+            previous_active = self.active
+            mtime = self._read_config()
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not reload model registry {self.path}: {e}")
+            return
+        if self.active == previous_active:
+            with self._lock:
+                self._mtime = mtime
+                self._activation_error = None
+            return
+        # Keep serving the old version until the new one is loaded
+        with self._lock:
+            new_active, self.active = self.active, previous_active
+            self._activating = new_active
+        threading.Thread(target=self._activate_polled, args=(new_active, mtime), daemon=True).start()
+
+    def _activate_polled(self, name, mtime):
+        """Activate a version found by `poll`; the file only counts as read once that succeeded"""
+        try:
+            self.activate(name, persist=False)
+        except Exception as e:
+            with self._lock:
+                previous = self._activation_error
+                attempts = previous["attempts"] + 1 if previous and previous["version"] == name else 1
+                delay = min(self.poll_s * 2 ** (attempts - 1), ACTIVATION_RETRY_MAX_S)
+                self._retry_at = time.monotonic() + delay
+                self._activation_error = {
+                    "version": name,
+                    "error": str(e),
+                    "attempts": attempts,
+                    "failed_at": datetime.now(timezone.utc).isoformat(),
+                    "retry_in_s": round(delay, 1),
+                }
+            logger.error(f"Could not activate model version {name} (attempt {attempts}, retrying in {delay:.0f}s): {e}")
+        else:
+            with self._lock:
+                self._mtime = mtime
+                self._activation_error = None
+        finally:
+            with self._lock:
+                self._activating = None
+
+    def versions(self):
+        with self._lock:
+            return list(self._specs)
+
+    def adopt(self, name, version):
+        """Register an already loaded version, e.g. the model model_loader loaded at start-up"""
+        with self._lock:
+            if name not in self._specs:
+                raise ValueError(f"Unknown model version: {name}")
+            previous, self._versions[name] = self._versions.get(name), version
+        if previous is not None and previous is not version:
+            previous.close()
+
+    def get(self, name):
+        """Return a loaded version, loading it (once, even under concurrency) on first use"""
+        version = self._versions.get(name)
+        if version is not None:
+            return version
+
+        with self._lock:
+            if name not in self._specs:
+                raise ValueError(f"Unknown model version: {name}")
+            spec = self._specs[name]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            version = self._versions.get(name)
+            if version is not None:
+                return version
+            rss_before = rss_mb()
+            start = time.perf_counter()
+            if spec.get("engine") == "ensemble":
+                model = self._load_ensemble(name, spec)
+                predict, predict_celsius, scaler = model.predict_scaled, model.predict_celsius, model.members[0].scaler
+                sample_celsius = model.sample_celsius if model.can_sample else None
+            else:
+                model = None
+                predict, predict_celsius, scaler, sample_celsius = self.loader(spec, self.base_dir)
+            load_ms = (time.perf_counter() - start) * 1000.0
+            version = ModelVersion(
+                name, predict, predict_celsius, scaler, spec.get("engine", "keras"),
+                load_ms=load_ms, rss_delta_mb=rss_mb() - rss_before, sample_celsius=sample_celsius,
+                ensemble=model,
+            )
+            with self._lock:
+                self._versions[name] = version
+            metrics.record_version_load(name, load_ms)
+            logger.info(f"Loaded model version {name} in {load_ms:.0f} ms")
+            return version
+
+    def _load_ensemble(self, name, spec):
+        """EnsembleModel over the spec's member versions, loading each member like any other version"""
+        with self._lock:
+            nested = [m for m in spec["members"] if self._specs.get(m, {}).get("engine") == "ensemble"]
+        if name in spec["members"] or nested:
+            raise ValueError(f"Ensemble {name} cannot contain ensembles: {', '.join(nested) or name}")
+        members = {member: self.get(member) for member in spec["members"]}
+        city_weights, default_weights = ensemble.load_weights(os.path.join(self.base_dir, spec["weights"]), list(members))
+        return ensemble.EnsembleModel(members, city_weights, default_weights)
+
+    def is_ensemble(self, name):
+        with self._lock:
+            return self._specs.get(name, {}).get("engine") == "ensemble"
+
+    def route(self, key=None):
+        """Version name for one request; `key` (e.g. the city) makes the choice sticky"""
+        self.poll()
+        with self._lock:
+            active, candidate, percent = self.active, self.candidate, self.candidate_percent
+        name = active
+        if candidate and percent > 0:
+            if key is None:
+                bucket = random.uniform(0, 100)
+            else:
+                bucket = zlib.crc32(str(key).encode()) % 10000 / 100.0
+            if bucket < percent:
+                name = candidate
+        with self._lock:
+            self._routed[name] = self._routed.get(name, 0) + 1
+        return name
+
+    def predict_celsius(self, name, windows):
+        version = self.get(name)
+        start = time.perf_counter()
+        with metrics.stage("inference"):
+            result = version.predict_celsius(windows)
+        version.record(len(windows), (time.perf_counter() - start) * 1000.0)
+        return result
+
+    def predict_ensemble(self, name, windows, cities=None):
+        """Per-city weighted ensemble prediction with member outputs (see EnsembleModel.predict)"""
+        version = self.get(name)
+        start = time.perf_counter()
+        with metrics.stage("inference"):
+            result = version.ensemble.predict(windows, cities)
+        version.record(len(windows), (time.perf_counter() - start) * 1000.0)
+        return result
+
+    def sample_celsius(self, name, windows, samples, cities=None):
+        """MC-dropout predictions of version `name`, (samples, N) °C; None if it cannot sample
+
+        Ensembles mix their members' draws with the per-city weights of `cities`.
+        """
+        version = self.get(name)
+        if version.sample_celsius is None:
+            return None
+        with metrics.stage("uncertainty"):
+            if version.ensemble is not None:
+                return version.ensemble.sample_celsius(windows, samples, cities)
+            return version.sample_celsius(windows, samples)
+
+    def activate(self, name, persist=True):
+        """Load `name` if needed, then make it the active version in one assignment"""
+        self.get(name)
+        with self._lock:
+            previous = self.active
+            self.active = name
+            if self.candidate == name:
+                self.candidate, self.candidate_percent = None, 0.0
+        if persist:
+            self._write_config()
+        logger.info(f"Active model version switched from {previous} to {name}")
+        return previous
+
+    def set_candidate(self, name, percent, persist=True):
+        """Route `percent` of traffic to `name`; a falsy name or 0% turns the A/B split off"""
+        if not 0.0 <= percent <= 100.0:
+            raise ValueError("percent must be between 0 and 100")
+        if name:
+            self.get(name)
+        with self._lock:
+            self.candidate = name or None
+            self.candidate_percent = float(percent) if name else 0.0
+        if persist:
+            self._write_config()
+        logger.info(f"Candidate model version set to {name} at {percent}%")
+
+    def unload(self, name):
+        """Drop a loaded version that is neither active nor candidate"""
+        with self._lock:
+            if name in (self.active, self.candidate):
+                raise ValueError(f"Cannot unload {name}: it is receiving traffic")
+            version = self._versions.pop(name, None)
+        if version is None:
+            return False
+        version.close()
+        return True
+
+    def close(self):
+        """Close every loaded version; called on shutdown"""
+        with self._lock:
+            versions, self._versions = list(self._versions.values()), {}
+        for version in versions:
+            version.close()
+
+    def stats(self):
+        with self._lock:
+            versions = dict(self._versions)
+            specs = dict(self._specs)
+            routed = dict(self._routed)
+            routing = {
+                "active": self.active,
+                "candidate": self.candidate,
+                "candidate_percent": self.candidate_percent,
+                "activating": self._activating,
+                "activation_error": self._activation_error,
+            }
+        return {
+            **routing,
+            "rss_mb": round(rss_mb(), 1),
+            "versions": {
+                name: {
+                    "loaded": name in versions,
+                    "routed": routed.get(name, 0),
+                    "spec": spec,
+                    **(versions[name].stats() if name in versions else {}),
+                }
+                for name, spec in specs.items()
+            },
+        }
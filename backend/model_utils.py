@@ -1,8 +1,120 @@
 # backend/utils.py
 import numpy as np
 
+import metrics
+
 def create_sequences(data, seq_length=6):
     X = []
     for i in range(len(data) - seq_length+1):
         X.append(data[i:i + seq_length])
     return np.array(X)
+
+
+@metrics.timed("sequence")
+def build_input_windows(frames, features, seq_length=6):
+    """Stack the last `seq_length` rows of each city into one (N, seq_length, n_features) array
+
+    Each entry is either a DataFrame of hourly rows or an already extracted
+    (seq_length, n_features) window from the lean fetch path.
+    """
+    windows = np.empty((len(frames), seq_length, len(features)), dtype=np.float32)
+    for i, df in enumerate(frames):
+        if len(df) < seq_length:
+            raise ValueError(f"Need {seq_length} hourly rows, got {len(df)}")
+        if isinstance(df, np.ndarray):
+            windows[i] = df[-seq_length:]
+        else:
+            windows[i] = df[features].tail(seq_length).values
+    return windows
+
+
+@metrics.timed("sequence")
+def windows_ending_at(frames, features, hours, seq_length=6):
+    """Stack the `seq_length` rows of each frame that end at its entry of `hours` (UTC); returns (windows, end times)
+
+    Frames cover the forecast from local midnight, so shortly after midnight there are
+    fewer than `seq_length` rows up to the hour; the window then is the first
+    `seq_length` rows and ends a few hours after it. Lean windows carry no dates
+    and cannot be placed in time.
+    """
+    windows = np.empty((len(frames), seq_length, len(features)), dtype=np.float32)
+    ends = []
+    for i, (df, hour) in enumerate(zip(frames, hours)):
+        if isinstance(df, np.ndarray):
+            raise ValueError("Windows ending at a given hour need dated frames (LEAN_FETCH off)")
+        rows = df[df["date"] <= hour]
+        if len(rows) < seq_length:
+            rows = df.head(seq_length)
+        if len(rows) < seq_length:
+            raise ValueError(f"Need {seq_length} hourly rows, got {len(rows)}")
+        rows = rows.tail(seq_length)
+        windows[i] = rows[features].values
+        ends.append(rows["date"].iloc[-1].to_pydatetime())
+    return windows, ends
+
+
+def predict_temperatures(predict_fn, scaler, windows):
+    """Scale, predict and inverse-scale a stack of raw windows with one call per stage
+
+    `predict_fn` maps an (N, seq_length, n_features) float32 array to (N, 1) scaled temperatures.
+    """
+    n, seq_length, n_features = windows.shape
+
+    # One scaler pass over every row of every window
+    with metrics.stage("scaling"):
+        scaled = scaler.transform(windows.reshape(-1, n_features))
+        X = scaled.reshape(n, seq_length, n_features).astype(np.float32)
+
+    # One inference call for the whole batch
+    pred_scaled = np.asarray(predict_fn(X))[:, 0]
+
+    # Temperature is feature 0; pad the other columns to reuse the fitted scaler
+    with metrics.stage("inverse_transform"):
+        pred_full = np.zeros((n, n_features))
+        pred_full[:, 0] = pred_scaled
+        return scaler.inverse_transform(pred_full)[:, 0]
+
+
+def affine_celsius_fn(predict_fn, scale, offset, target_index=0):
+    """Wrap a scaled-in, scaled-out `predict_fn` to take raw windows and return (N, 1) °C
+
+    Applies the MinMax constants directly in NumPy, for runtimes whose graph
+    cannot absorb them.
+    """
+    scale = np.asarray(scale, dtype=np.float32)
+    offset = np.asarray(offset, dtype=np.float32)
+
+    def predict_raw(windows):
+        with metrics.stage("scaling"):
+            X = windows * scale + offset
+        pred_scaled = np.asarray(predict_fn(X))
+        with metrics.stage("inverse_transform"):
+            return (pred_scaled - offset[target_index]) / scale[target_index]
+
+    return predict_raw
+
+
+def rollout_forecast(predict_fn, scaler, windows, hours):
+    """Roll the one-step model forward autoregressively for `hours` steps; returns (N, hours) in °C
+
+    All windows are scaled once into a preallocated (N, seq_length + hours, n_features)
+    buffer using the scaler's affine constants. Each step scores the last `seq_length`
+    rows of every city in one call and appends the prediction as the next row, carrying
+    the other features forward from the previous hour.
+    """
+    n, seq_length, n_features = windows.shape
+    scale = scaler.scale_.astype(np.float32)
+    offset = scaler.min_.astype(np.float32)
+
+    buffer = np.empty((n, seq_length + hours, n_features), dtype=np.float32)
+    np.multiply(windows, scale, out=buffer[:, :seq_length])
+    buffer[:, :seq_length] += offset
+
+    for step in range(hours):
+        pred_scaled = np.asarray(predict_fn(buffer[:, step:step + seq_length]))[:, 0]
+        row = seq_length + step
+        buffer[:, row] = buffer[:, row - 1]
+        buffer[:, row, 0] = pred_scaled
+
+    # Temperature is feature 0: invert only that column
+    return (buffer[:, seq_length:, 0] - offset[0]) / scale[0]
@@ -0,0 +1,248 @@
+# backend/numpy_engine.py
+import os
+
+import numpy as np
+
+
+def _sigmoid(x):
+    # tanh form avoids overflow warnings from exp() on large negative inputs
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _cell(z, c, units):
+    """Apply the i, f, c, o gates (Keras order) to pre-activations z; returns new (h, c)"""
+    i = _sigmoid(z[:, :units])
+    f = _sigmoid(z[:, units:2 * units])
+    g = np.tanh(z[:, 2 * units:3 * units])
+    o = _sigmoid(z[:, 3 * units:])
+    c = f * c + i * g
+    return o * np.tanh(c), c
+
+
+def lstm_step(x, h, c, kernel, recurrent_kernel, bias):
+    """Advance a Keras-compatible LSTM by one (N, F) timestep"""
+    return _cell(x @ kernel + bias + h @ recurrent_kernel, c, recurrent_kernel.shape[0])
+
+
+def lstm_forward(X, kernel, recurrent_kernel, bias, return_sequences=False,
+                 initial_state=None, return_state=False):
+    """Run a Keras-compatible LSTM (gate order i, f, c, o) over an (N, T, F) array"""
+    n, steps, _ = X.shape
+    units = recurrent_kernel.shape[0]
+
+    # Input projections for every timestep in one matmul
+    Z = X @ kernel + bias
+
+    if initial_state is None:
+        h = np.zeros((n, units), dtype=np.float32)
+        c = np.zeros((n, units), dtype=np.float32)
+    else:
+        h, c = initial_state
+    outputs = np.empty((n, steps, units), dtype=np.float32) if return_sequences else None
+
+    for t in range(steps):
+        h, c = _cell(Z[:, t] + h @ recurrent_kernel, c, units)
+        if return_sequences:
+            outputs[:, t] = h
+
+    out = outputs if return_sequences else h
+    if return_state:
+        return out, (h, c)
+    return out
+
+
+class NumpyLSTMEngine:
+    """Forward pass of the exported LSTM/Dropout/Dense stack using only NumPy.
+
+    Mirrors the parts of the Keras model API the backend uses (`predict`,
+    `input_shape`, `output_shape`) so it can stand in for the loaded model.
+    """
+
+    def __init__(self, layers, input_shape, raw_io=False):
+        self.layers = layers
+        self.input_shape = input_shape
+        # True when the MinMax scaling is folded into the weights (raw features in, °C out)
+        self.raw_io = raw_io
+        last_dense = [layer for layer in layers if layer["kind"] == "dense"][-1]
+        self.output_shape = (None, last_dense["kernel"].shape[1])
+
+    @classmethod
+    def from_npz(cls, path):
+        return cls._from_arrays(np.load(path), path)
+
+    @classmethod
+    def from_dir(cls, path, mmap_mode="r"):
+        """Load a `save_dir` export; with `mmap_mode` the weights are memory-mapped, not read.
+
+        Mapped weights are backed by the page cache, so every process that serves
+        from the same directory shares one physical copy.
+        """
+        arrays = {
+            name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+            for name in os.listdir(path) if name.endswith(".npy")
+        }
+        return cls._from_arrays(arrays, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """`from_dir` for a directory, `from_npz` otherwise"""
+        if os.path.isdir(path):
+            return cls.from_dir(path, mmap_mode=mmap_mode)
+        return cls.from_npz(path)
+
+    @classmethod
+    def _from_arrays(cls, data, path):
+        # copy=False keeps memory-mapped float32 weights mapped instead of copying them
+        layers = []
+        for i, kind in enumerate(data["layers"]):
+            kind = str(kind)
+            prefix = f"layer{i}_"
+            if kind == "lstm":
+                layers.append({
+                    "kind": kind,
+                    "kernel": data[prefix + "kernel"].astype(np.float32, copy=False),
+                    "recurrent_kernel": data[prefix + "recurrent_kernel"].astype(np.float32, copy=False),
+                    "bias": data[prefix + "bias"].astype(np.float32, copy=False),
+                    "return_sequences": bool(data[prefix + "return_sequences"]),
+                })
+            elif kind == "dense":
+                layers.append({
+                    "kind": kind,
+                    "kernel": data[prefix + "kernel"].astype(np.float32, copy=False),
+                    "bias": data[prefix + "bias"].astype(np.float32, copy=False),
+                })
+            elif kind == "dropout":
+                layers.append({"kind": kind, "rate": float(data[prefix + "rate"])})
+            else:
+                raise ValueError(f"Unsupported layer kind in {path}: {kind}")
+
+        input_shape = tuple(None if d < 0 else int(d) for d in data["input_shape"])
+        raw_io = bool(data["raw_io"]) if "raw_io" in data else False
+        return cls(layers, input_shape, raw_io=raw_io)
+
+    def _arrays(self):
+        arrays = {}
+        for i, layer in enumerate(self.layers):
+            prefix = f"layer{i}_"
+            for key, value in layer.items():
+                if key != "kind":
+                    arrays[prefix + key] = np.asarray(value)
+        arrays["layers"] = np.array([layer["kind"] for layer in self.layers])
+        arrays["input_shape"] = np.array([-1 if d is None else d for d in self.input_shape])
+        arrays["raw_io"] = np.array(self.raw_io)
+        return arrays
+
+    def save_npz(self, path):
+        """Write the engine back out in the `from_npz` layout"""
+        np.savez_compressed(path, **self._arrays())
+
+    def save_dir(self, path):
+        """Write one uncompressed .npy per array, the layout `from_dir` can memory-map"""
+        os.makedirs(path, exist_ok=True)
+        for name, value in self._arrays().items():
+            np.save(os.path.join(path, name + ".npy"), value)
+
+    def fold_scaler(self, scale, offset, target_index=0):
+        """Return a copy with MinMax scaling folded into the first LSTM and the last Dense layer.
+
+        With x_scaled = x * scale + offset, the first input projection becomes
+        x @ (scale[:, None] * K) + (offset @ K + b); the scaled output y is turned
+        back into the target column by dividing the Dense kernel and shifted bias
+        by scale[target_index].
+        """
+        if self.raw_io:
+            raise ValueError("Scaler is already folded into this engine")
+        scale = np.asarray(scale, dtype=np.float64)
+        offset = np.asarray(offset, dtype=np.float64)
+        layers = [dict(layer) for layer in self.layers]
+
+        first = next(layer for layer in layers if layer["kind"] == "lstm")
+        kernel = first["kernel"].astype(np.float64)
+        first["bias"] = (first["bias"] + offset @ kernel).astype(np.float32)
+        first["kernel"] = (scale[:, None] * kernel).astype(np.float32)
+
+        last = [layer for layer in layers if layer["kind"] == "dense"][-1]
+        target_scale, target_offset = scale[target_index], offset[target_index]
+        last["kernel"] = (last["kernel"] / target_scale).astype(np.float32)
+        last["bias"] = ((last["bias"] - target_offset) / target_scale).astype(np.float32)
+
+        return NumpyLSTMEngine(layers, self.input_shape, raw_io=True)
+
+    def predict(self, X):
+        """Predict for an (N, T, F) array, returns (N, units of the last Dense layer)"""
+        out = np.asarray(X, dtype=np.float32)
+        for layer in self.layers:
+            if layer["kind"] == "lstm":
+                out = lstm_forward(
+                    out, layer["kernel"], layer["recurrent_kernel"], layer["bias"],
+                    return_sequences=layer["return_sequences"]
+                )
+            elif layer["kind"] == "dense":
+                out = out @ layer["kernel"] + layer["bias"]
+            # Dropout is the identity at inference time
+        return out
+
+    def predict_mc(self, X, samples, rng=None):
+        """Monte Carlo dropout: `samples` stochastic passes for an (N, T, F) array in one batched pass.
+
+        Layers before the first Dropout do not depend on the mask, so they run once
+        on the N inputs; their output is tiled to (samples * N, ...) and every later
+        layer sees one independent inverted-dropout mask per copy, as Keras applies
+        with training=True. Returns (samples, N, units of the last Dense layer).
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        out = np.asarray(X, dtype=np.float32)
+        n = len(out)
+        tiled = False
+        for layer in self.layers:
+            if layer["kind"] == "lstm":
+                out = lstm_forward(
+                    out, layer["kernel"], layer["recurrent_kernel"], layer["bias"],
+                    return_sequences=layer["return_sequences"]
+                )
+            elif layer["kind"] == "dense":
+                out = out @ layer["kernel"] + layer["bias"]
+            elif layer["kind"] == "dropout" and layer["rate"] > 0:
+                if not tiled:
+                    out = np.tile(out, (samples,) + (1,) * (out.ndim - 1))
+                    tiled = True
+                keep = 1.0 - layer["rate"]
+                out = out * ((rng.random(out.shape, dtype=np.float32) < keep) / np.float32(keep))
+        if not tiled:
+            out = np.tile(out, (samples,) + (1,) * (out.ndim - 1))
+        return out.reshape(samples, n, *out.shape[1:])
+
+    def predict_with_state(self, X):
+        """Like `predict`, but also return the final (h, c) of every LSTM layer"""
+        out = np.asarray(X, dtype=np.float32)
+        states = []
+        for layer in self.layers:
+            if layer["kind"] == "lstm":
+                # Keep the full sequence so deeper layers see every timestep
+                seq, state = lstm_forward(
+                    out, layer["kernel"], layer["recurrent_kernel"], layer["bias"],
+                    return_sequences=True, return_state=True
+                )
+                out = seq if layer["return_sequences"] else state[0]
+                states.append(state)
+            elif layer["kind"] == "dense":
+                out = out @ layer["kernel"] + layer["bias"]
+        return out, states
+
+    def advance(self, x, states):
+        """Feed one (N, F) timestep on top of cached LSTM states; returns (prediction, new states)"""
+        out = np.asarray(x, dtype=np.float32)
+        new_states = []
+        lstm_index = 0
+        for layer in self.layers:
+            if layer["kind"] == "lstm":
+                h, c = lstm_step(
+                    out, *states[lstm_index],
+                    layer["kernel"], layer["recurrent_kernel"], layer["bias"]
+                )
+                new_states.append((h, c))
+                lstm_index += 1
+                out = h
+            elif layer["kind"] == "dense":
+                out = out @ layer["kernel"] + layer["bias"]
+        return out, new_states
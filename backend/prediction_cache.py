@@ -0,0 +1,68 @@
+# backend/prediction_cache.py
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+
+def current_hour(now=None):
+    """UTC timestamp of the latest hourly observation, i.e. `now` floored to the hour"""
+    now = now or datetime.now(timezone.utc)
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+class PredictionCache:
+    """In-process LRU cache of predictions that expire at the next hourly boundary.
+
+    Upstream data only changes hourly, so entries are keyed by
+    (city, model version, last hourly observation) and stop being served as
+    soon as the next hour starts.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, city, model_version, now=None):
+        hour = current_hour(now)
+        key = (city, model_version, hour)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= (now or datetime.now(timezone.utc)):
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, city, model_version, value, observed_hour=None):
+        hour = observed_hour or current_hour()
+        key = (city, model_version, hour)
+        expires_at = hour + timedelta(hours=1)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,247 @@
+# backend/profiling.py
+"""On-demand profiling of the /predict hot path.
+
+`capture.arm(n)` starts a wall-clock sampling profiler and records trace spans
+for the next `n` /predict requests. Spans come from `span()` and from every
+metrics stage timer, and follow a request into thread-pool calls through a
+context variable. Both outputs can be rendered as collapsed stacks
+("frame;frame;frame count"), the input format of flamegraph.pl and speedscope.
+
+When nothing is armed, `span()` costs one context-variable lookup.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+
+# Waiting points that are skipped when sampling: the event loop in select() and idle pool threads
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("_asyncio.py", "run"),
+}
+
+_current_trace = ContextVar("profiling_trace", default=None)
+# ';'-joined names of the spans enclosing the current point, starting with the trace name
+_span_path = ContextVar("profiling_span_path", default="")
+_null_span = nullcontext()
+
+
+class RequestTrace:
+    """Spans of one request: (path, start offset, duration) with the path joined by ';'"""
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = attributes or {}
+        self._start = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def open(self, name):
+        token = _span_path.set(f"{_span_path.get()};{name}")
+        return token, time.perf_counter()
+
+    def close(self, handle, duration_s=None):
+        token, start = handle
+        end = time.perf_counter()
+        path = _span_path.get()
+        _span_path.reset(token)
+        with self._lock:
+            self.spans.append({
+                "path": path,
+                "start_ms": round((start - self._start) * 1000.0, 3),
+                "duration_ms": round((end - start if duration_s is None else duration_s) * 1000.0, 3),
+            })
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000.0, 3)
+
+    def snapshot(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        return {"name": self.name, **self.attributes, "duration_ms": self.duration_ms, "spans": spans}
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_handle")
+
+    def __init__(self, trace, name):
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self):
+        self._handle = self._trace.open(self._name)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._trace.close(self._handle)
+
+
+def span(name):
+    """Context manager recording `name` in the current request's trace, if it is being captured"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _null_span
+    return _Span(trace, name)
+
+
+def open_span(name):
+    """Non-context-manager form for timers that already measure the duration; None when not tracing"""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    return trace, trace.open(name)
+
+
+def close_span(handle, duration_s):
+    trace, inner = handle
+    trace.close(inner, duration_s)
+
+
+def frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class ProfileCapture:
+    """Arm-once capture of the next N traced requests plus stack samples of every thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(0, 0.0, 0.0)
+        self.status = "idle"
+
+    def _reset(self, requests, interval_s, timeout_s):
+        self.requested = requests
+        self.interval_s = interval_s
+        self.timeout_s = timeout_s
+        self._remaining = requests
+        self._open = 0
+        self.traces = []
+        self.samples = Counter()
+        self.sample_count = 0
+        self.started_at = None
+        self.finished_at = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def arm(self, requests, interval_ms=2.0, timeout_s=60.0):
+        """Capture the next `requests` traced requests; sampling stops when they finish or after `timeout_s`"""
+        with self._lock:
+            if self.status == "capturing":
+                raise RuntimeError("A capture is already running")
+            self._reset(requests, interval_ms / 1000.0, timeout_s)
+            self.status = "capturing"
+            self.started_at = time.time()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    @contextmanager
+    def trace(self, name, **attributes):
+        """Trace one request if the capture still wants requests; yields the trace or None"""
+        # Unlocked fast path: nothing armed
+        if self._remaining <= 0:
+            yield None
+            return
+        with self._lock:
+            if self._remaining <= 0 or self.status != "capturing":
+                claimed = False
+            else:
+                self._remaining -= 1
+                self._open += 1
+                claimed = True
+        if not claimed:
+            yield None
+            return
+
+        request_trace = RequestTrace(name, attributes)
+        token = _current_trace.set(request_trace)
+        path_token = _span_path.set(name)
+        try:
+            yield request_trace
+        finally:
+            _span_path.reset(path_token)
+            _current_trace.reset(token)
+            request_trace.finish()
+            with self._lock:
+                self.traces.append(request_trace)
+                self._open -= 1
+                if self._remaining <= 0 and self._open == 0:
+                    self._stop.set()
+
+    def _sample_loop(self):
+        sampler_id = threading.get_ident()
+        deadline = time.monotonic() + self.timeout_s
+        thread_names = {}
+        while not self._stop.wait(self.interval_s) and time.monotonic() < deadline:
+            if len(thread_names) != threading.active_count():
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+                self.sample_count += 1
+        with self._lock:
+            self.status = "done"
+            self._remaining = 0
+            self.finished_at = time.time()
+
+    def collapsed(self, source="samples"):
+        """Collapsed stacks: sample counts per stack, or span self-time in microseconds per span path"""
+        if source == "samples":
+            counts = dict(self.samples)
+        else:
+            totals = Counter()
+            for request_trace in list(self.traces):
+                totals[request_trace.name] += request_trace.duration_ms or 0.0
+                for s in request_trace.snapshot()["spans"]:
+                    totals[s["path"]] += s["duration_ms"]
+            # Flamegraphs sum children into parents, so each path keeps only its self time
+            counts = {}
+            for path, total in totals.items():
+                children = sum(t for p, t in totals.items() if p.rsplit(";", 1)[0] == path and p != path)
+                counts[path] = max(int(round((total - children) * 1000.0)), 0)
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(counts.items()) if count) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            traces = [request_trace.snapshot() for request_trace in self.traces]
+            return {
+                "status": self.status,
+                "requested": self.requested,
+                "completed": len(traces),
+                "interval_ms": round(self.interval_s * 1000.0, 3),
+                "samples": self.sample_count,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "traces": traces,
+            }
+
+
+capture = ProfileCapture()
+
+
+def traced(name):
+    """Decorator for async endpoints: trace the call when a capture is armed"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with capture.trace(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,226 @@
+# backend/refresher.py
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from prediction_cache import current_hour
+
+logger = logging.getLogger(__name__)
+
+
+class HourlyRefresher:
+    """Pre-warms predictions for a fixed set of cities shortly after every hour.
+
+    Each run fetches all cities, with one `bulk_fetch_fn` call or per city with
+    bounded concurrency, scores the ones that succeeded in one batched
+    `predict_fn` call and hands every result to `on_result`. The last good result per city is kept, so a failed refresh
+    leaves the previous prediction in place (stale-while-revalidate) and the
+    failed cities are retried after `retry_s`. Retries only fill the gaps between
+    full refreshes: the hourly deadline is tracked on its own, so a city that keeps
+    failing cannot stop the others from being refreshed.
+    """
+
+    def __init__(self, cities, fetch_fn, predict_fn, on_result=None, offset_s=60.0,
+                 jitter_s=30.0, concurrency=5, retry_s=300.0, run_on_start=True, bulk_fetch_fn=None):
+        self.cities = list(cities)
+        self.fetch_fn = fetch_fn
+        self.bulk_fetch_fn = bulk_fetch_fn
+        self.predict_fn = predict_fn
+        self.on_result = on_result
+        self.offset_s = offset_s
+        self.jitter_s = jitter_s
+        self.concurrency = concurrency
+        self.retry_s = retry_s
+        self.run_on_start = run_on_start
+
+        self._task = None
+        self._stop = None
+        self._latest = {}
+        self._city_status = {}
+        self._last_run = None
+        self._next_run = None
+        self._next_full_run = None
+        # Last exception that escaped a run, and why the task ended if it ever does unexpectedly
+        self._last_error = None
+        self._task_error = None
+
+    def latest(self, city):
+        """Last successfully refreshed result for a city, possibly from an earlier hour"""
+        return self._latest.get(city)
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._stop = asyncio.Event()
+        self._task_error = None
+        self._task = asyncio.create_task(self._run(), name="hourly-refresher")
+        self._task.add_done_callback(self._task_done)
+        logger.info(f"Hourly refresher started for {len(self.cities)} cities")
+
+    async def stop(self, timeout=10.0):
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Hourly refresher did not stop in time, cancelling")
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def _next_full_refresh(self):
+        """Deadline of the next refresh of every city: shortly after the coming hour"""
+        next_hour = current_hour(datetime.now(timezone.utc)) + timedelta(hours=1)
+        return next_hour + timedelta(seconds=self.offset_s + random.uniform(0, self.jitter_s))
+
+    def _seconds_until_next_run(self, failed):
+        now = datetime.now(timezone.utc)
+        target = self._next_full_run
+        if failed:
+            target = min(target, now + timedelta(seconds=self.retry_s))
+        self._next_run = target
+        return max((target - now).total_seconds(), 0.0)
+
+    def _task_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            self._task_error = repr(task.exception())
+            logger.error(f"Hourly refresher stopped unexpectedly: {self._task_error}")
+
+    async def _guarded_refresh(self, cities=None):
+        """`refresh_once` that logs and records an unexpected exception instead of ending the loop"""
+        try:
+            failed = await self.refresh_once(cities)
+        except Exception as e:
+            logger.exception(f"Hourly refresh run failed: {e}")
+            self._last_error = {"at": datetime.now(timezone.utc).isoformat(), "error": repr(e)}
+            # Retry the same cities (all of them for a full run) after retry_s
+            return list(cities or self.cities)
+        self._last_error = None
+        return failed
+
+    async def _run(self):
+        failed = []
+        if self.run_on_start:
+            failed = await self._guarded_refresh()
+        self._next_full_run = self._next_full_refresh()
+        while not self._stop.is_set():
+            delay = self._seconds_until_next_run(failed)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+            if datetime.now(timezone.utc) >= self._next_full_run:
+                failed = await self._guarded_refresh()
+                self._next_full_run = self._next_full_refresh()
+            elif failed:
+                # Retry runs only refetch the cities that failed last time
+                failed = await self._guarded_refresh(failed)
+            # Otherwise the timer fired a little early for the full refresh: wait again
+
+    def healthy(self):
+        """False once the background task has died; a refresher that was never started counts as healthy"""
+        return self._task_error is None
+
+    async def refresh_once(self, cities=None):
+        """Refresh the given cities (default: all); returns the cities that failed"""
+        cities = cities or self.cities
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+
+        async def fetch(city):
+            async with semaphore:
+                t0 = time.perf_counter()
+                try:
+                    return city, await self.fetch_fn(city), (time.perf_counter() - t0) * 1000.0
+                except Exception as e:
+                    return city, e, (time.perf_counter() - t0) * 1000.0
+
+        if self.bulk_fetch_fn is not None:
+            # Multi-location requests: every city shares the duration of the bulk call
+            t0 = time.perf_counter()
+            try:
+                results = await self.bulk_fetch_fn(cities)
+            except Exception as e:
+                results = {city: e for city in cities}
+            duration_ms = (time.perf_counter() - t0) * 1000.0
+            fetched = [
+                (city, results.get(city, KeyError(f"{city} missing from bulk response")), duration_ms)
+                for city in cities
+            ]
+        else:
+            fetched = await asyncio.gather(*(fetch(city) for city in cities))
+
+        ok_cities, frames, failed = [], [], []
+        for city, result, duration_ms in fetched:
+            if isinstance(result, Exception):
+                logger.error(f"Refresh fetch failed for {city}: {result}")
+                self._mark(city, started_at, duration_ms, error=str(result))
+                failed.append(city)
+            else:
+                ok_cities.append(city)
+                frames.append((result, duration_ms))
+
+        if ok_cities:
+            try:
+                results = await self.predict_fn(ok_cities, [frame for frame, _ in frames])
+            except Exception as e:
+                logger.error(f"Refresh prediction failed for {len(ok_cities)} cities: {e}")
+                for city, (_, duration_ms) in zip(ok_cities, frames):
+                    self._mark(city, started_at, duration_ms, error=str(e))
+                failed.extend(ok_cities)
+            else:
+                for city, (_, duration_ms), result in zip(ok_cities, frames, results):
+                    self._latest[city] = result
+                    self._mark(city, started_at, duration_ms)
+                    if self.on_result is not None:
+                        try:
+                            self.on_result(city, result)
+                        except Exception as e:
+                            # A failing consumer (e.g. the stream broadcaster) must not cost the other cities
+                            logger.error(f"Refresh result handler failed for {city}: {e}")
+
+        self._last_run = {
+            "started_at": started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 1),
+            "cities": len(cities),
+            "failed": len(failed),
+        }
+        logger.info(f"Refreshed {len(cities) - len(failed)}/{len(cities)} cities in {self._last_run['duration_ms']} ms")
+        return failed
+
+    def _mark(self, city, refreshed_at, duration_ms, error=None):
+        previous = self._city_status.get(city, {})
+        self._city_status[city] = {
+            "last_attempt": refreshed_at.isoformat(),
+            "last_success": refreshed_at.isoformat() if error is None else previous.get("last_success"),
+            "duration_ms": round(duration_ms, 1),
+            "status": "ok" if error is None else "error",
+            "error": error,
+            "stale": error is not None and city in self._latest,
+        }
+
+    def status(self):
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "healthy": self.healthy(),
+            "task_error": self._task_error,
+            "last_error": self._last_error,
+            "last_run": self._last_run,
+            "next_run": self._next_run.isoformat() if self._next_run else None,
+            "next_full_run": self._next_full_run.isoformat() if self._next_full_run else None,
+            "settings": {
+                "offset_s": self.offset_s,
+                "jitter_s": self.jitter_s,
+                "concurrency": self.concurrency,
+                "retry_s": self.retry_s,
+            },
+            "cities": dict(self._city_status),
+        }
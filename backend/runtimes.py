@@ -0,0 +1,173 @@
+# backend/runtimes.py
+"""Pluggable serving runtimes for the exported LSTM.
+
+Every engine takes scaled (N, seq_length, n_features) float32 windows and returns
+(N, 1) scaled temperatures, and exposes `input_shape` / `output_shape`, so any of
+them can stand in for the Keras model in model_loader. Only the selected
+runtime's package is imported.
+"""
+import os
+import threading
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+
+# Default artifact per runtime; export_weights.py and export_runtimes.py write these
+RUNTIME_PATHS = {
+    "keras": os.path.join(MODELS_DIR, "global_weather_saved_model.keras"),
+    "numpy": os.path.join(MODELS_DIR, "global_weather_weights.npz"),
+    "tflite": os.path.join(MODELS_DIR, "global_weather_dynamic.tflite"),
+    "tflite-int8": os.path.join(MODELS_DIR, "global_weather_int8.tflite"),
+    "onnx": os.path.join(MODELS_DIR, "global_weather.onnx"),
+}
+
+
+def build_serving_fn(model, n_features, seq_length, jit_compile=False):
+    """Trace the model once for (batch, seq_length, n_features) float32 input.
+
+    Unlike `model.predict`, the traced function does not build a data adapter
+    or callback stack per call, and the `None` batch dimension keeps a single
+    graph for every batch size.
+    """
+    import tensorflow as tf
+
+    @tf.function(
+        input_signature=[tf.TensorSpec([None, seq_length, n_features], tf.float32)],
+        jit_compile=jit_compile,
+    )
+    def serve(x):
+        return model(x, training=False)
+
+    return serve
+
+
+class KerasEngine:
+    """Full TensorFlow: the .keras model behind a traced serving function"""
+
+    def __init__(self, path, jit_compile=False):
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(path, compile=False)
+        self.input_shape = self.model.input_shape
+        self.output_shape = self.model.output_shape
+        _, seq_length, n_features = self.input_shape
+        self._serve = build_serving_fn(self.model, n_features, seq_length, jit_compile=jit_compile)
+
+    def predict(self, X):
+        return self._serve(np.asarray(X, dtype=np.float32)).numpy()
+
+
+def _tflite_interpreter_class():
+    # The standalone interpreters avoid importing TensorFlow; tf.lite is the last resort
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def batch_bucket(n, max_batch):
+    """Smallest power of two holding `n` rows, capped at `max_batch`"""
+    return min(1 << max(n - 1, 0).bit_length(), max_batch)
+
+
+class TFLiteEngine:
+    """TFLite interpreter over a model from export_runtimes.py (float, dynamic-range or int8).
+
+    The flatbuffer is read once. Resizing the input tensor re-plans the whole
+    graph, so interpreters are kept per batch size, but only for powers of two
+    up to `max_batch`: a batch is zero-padded to the next bucket, and larger
+    inputs run in `max_batch` chunks. That bounds the cache at
+    log2(max_batch) + 1 interpreters whatever batch sizes arrive. Interpreters
+    are not thread-safe, so calls are serialised.
+    """
+
+    def __init__(self, path, num_threads=None, max_batch=64):
+        if max_batch < 1 or max_batch & (max_batch - 1):
+            raise ValueError(f"max_batch must be a power of two, got {max_batch}")
+        self._interpreter_class = _tflite_interpreter_class()
+        with open(path, "rb") as f:
+            self._model_content = f.read()
+        self.num_threads = num_threads
+        self.max_batch = max_batch
+        self._interpreters = {}
+        self._lock = threading.Lock()
+
+        interpreter = self._interpreter(1)
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        self.input_shape = (None, *(int(d) for d in input_details["shape"][1:]))
+        self.output_shape = (None, *(int(d) for d in output_details["shape"][1:]))
+
+    def _interpreter(self, batch_size):
+        interpreter = self._interpreters.get(batch_size)
+        if interpreter is None:
+            interpreter = self._interpreter_class(model_content=self._model_content, num_threads=self.num_threads)
+            input_details = interpreter.get_input_details()[0]
+            if input_details["shape"][0] != batch_size:
+                interpreter.resize_tensor_input(
+                    input_details["index"], [batch_size, *input_details["shape"][1:]]
+                )
+            interpreter.allocate_tensors()
+            self._interpreters[batch_size] = interpreter
+        return interpreter
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty((len(X), *self.output_shape[1:]), dtype=np.float32)
+        with self._lock:
+            for start in range(0, len(X), self.max_batch):
+                chunk = X[start:start + self.max_batch]
+                bucket = batch_bucket(len(chunk), self.max_batch)
+                if len(chunk) < bucket:
+                    chunk = np.concatenate([chunk, np.zeros((bucket - len(chunk), *chunk.shape[1:]), np.float32)])
+                interpreter = self._interpreter(bucket)
+                interpreter.set_tensor(interpreter.get_input_details()[0]["index"], chunk)
+                interpreter.invoke()
+                result = interpreter.get_tensor(interpreter.get_output_details()[0]["index"])
+                out[start:start + self.max_batch] = result[:len(out) - start]
+        return out
+
+
+class OnnxEngine:
+    """onnxruntime session over the ONNX export; sessions are safe to call from many threads"""
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.input_shape = (None, *model_input.shape[1:])
+        self.output_shape = (None, *self._session.get_outputs()[0].shape[1:])
+
+    def predict(self, X):
+        return self._session.run(None, {self._input_name: np.asarray(X, dtype=np.float32)})[0]
+
+
+def load_runtime(name, path=None, num_threads=None, jit_compile=False, max_batch=64):
+    """Load the engine for `name` (a RUNTIME_PATHS key) from `path` or its default artifact
+
+    `max_batch` is the largest interpreter batch TFLite keeps (a power of two).
+    """
+    if name not in RUNTIME_PATHS:
+        raise ValueError(f"Unknown runtime: {name} (expected one of {', '.join(RUNTIME_PATHS)})")
+    path = path or RUNTIME_PATHS[name]
+
+    if name == "keras":
+        return KerasEngine(path, jit_compile=jit_compile)
+    if name == "numpy":
+        from numpy_engine import NumpyLSTMEngine
+        # A directory (export_weights.py --npy-dirs) is memory-mapped rather than read
+        return NumpyLSTMEngine.load(path)
+    if name in ("tflite", "tflite-int8"):
+        return TFLiteEngine(path, num_threads=num_threads, max_batch=max_batch)
+    return OnnxEngine(path, num_threads=num_threads)
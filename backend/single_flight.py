@@ -0,0 +1,90 @@
+# backend/single_flight.py
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution (threads).
+
+    The first caller for a key runs `fn`; callers arriving while it is still in
+    flight block on the same Future and receive its result or exception.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+                self._executions += 1
+            else:
+                self._shared += 1
+        if not leader:
+            return call.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self._executions,
+                "shared": self._shared,
+            }
+
+
+class AsyncSingleFlight:
+    """Collapse concurrent awaits with the same key into one task (asyncio).
+
+    The work runs as its own task and every caller awaits it through
+    `asyncio.shield`, so a cancelled request does not cancel the computation
+    other requests are waiting on.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._executions = 0
+        self._shared = 0
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        task = self._calls.get(key)
+        if task is not None:
+            self._shared += 1
+        else:
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._calls[key] = task
+            self._executions += 1
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "executions": self._executions,
+            "shared": self._shared,
+        }
@@ -0,0 +1,70 @@
+# backend/startup.py
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupState:
+    """Readiness of the backend: overall status plus the duration of each loading stage.
+
+    Status moves from "starting" to "loading" to "ready", or to "failed", in which
+    case the error is kept so the readiness probe can report it instead of the
+    process silently serving without a model.
+    """
+
+    def __init__(self):
+        self.status = "starting"
+        self.error = None
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._created = time.perf_counter()
+        self._ready_after_ms = None
+        # Set when the model was loaded by a preloading parent process before this one forked
+        self.preloaded = False
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    @contextmanager
+    def stage(self, name):
+        """Time one loading stage; an exception marks the stage failed and propagates"""
+        with self._lock:
+            self.status = "loading"
+            self._stages[name] = {"status": "running", "duration_ms": None}
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self._finish_stage(name, start, "failed", error=str(e))
+            raise
+        self._finish_stage(name, start, "ok")
+
+    def _finish_stage(self, name, start, status, error=None):
+        with self._lock:
+            self._stages[name] = {
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000.0, 1),
+                **({"error": error} if error else {}),
+            }
+
+    def mark_ready(self):
+        with self._lock:
+            self.status = "ready"
+            self._ready_after_ms = round((time.perf_counter() - self._created) * 1000.0, 1)
+
+    def mark_failed(self, error):
+        with self._lock:
+            self.status = "failed"
+            self.error = str(error)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "status": self.status,
+                "ready": self.status == "ready",
+                "error": self.error,
+                "ready_after_ms": self._ready_after_ms,
+                "preloaded": self.preloaded,
+                "stages": {name: dict(stage) for name, stage in self._stages.items()},
+            }
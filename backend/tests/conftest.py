@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# Backend modules import each other by bare name (`import metrics`), as under uvicorn --app-dir
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
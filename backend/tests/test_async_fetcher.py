@@ -0,0 +1,59 @@
+# backend/tests/test_async_fetcher.py
+import asyncio
+
+import httpx
+import pytest
+
+from async_fetcher import AsyncOpenMeteoClient, ResponseCache, UpstreamError
+
+URL = "https://api.open-meteo.com/v1/forecast"
+PARAMS = {"latitude": 51.5, "longitude": -0.13, "hourly": "temperature_2m"}
+
+
+def fake_client(statuses, **kwargs):
+    """Client whose transport answers with `statuses` in turn; an empty body decodes to no messages"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(statuses[min(len(requests), len(statuses)) - 1], content=b"")
+
+    client = AsyncOpenMeteoClient(retries=0, **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, requests
+
+
+def test_repeated_request_is_served_from_the_cache():
+    async def scenario():
+        client, requests = fake_client([200])
+        await client.weather_api(URL, PARAMS)
+        await client.weather_api(URL, dict(reversed(list(PARAMS.items()))))
+        await client.weather_api(URL, {**PARAMS, "latitude": 48.85})
+        await client.aclose()
+        return requests
+
+    assert len(asyncio.run(scenario())) == 2
+
+
+def test_error_responses_are_not_cached():
+    async def scenario():
+        client, requests = fake_client([503, 200])
+        with pytest.raises(UpstreamError):
+            await client.weather_api(URL, PARAMS)
+        await client.weather_api(URL, PARAMS)
+        await client.aclose()
+        return requests
+
+    assert len(asyncio.run(scenario())) == 2
+
+
+def test_entries_expire_and_the_oldest_is_evicted():
+    cache = ResponseCache(ttl=60, max_entries=2)
+    cache.put("a", b"1", now=0)
+    cache.put("b", b"2", now=0)
+    assert cache.get("a", now=59) == b"1"
+    cache.put("c", b"3", now=0)
+    # "a" was read last, so "b" is the least recently used
+    assert cache.get("b", now=1) is None
+    assert cache.get("a", now=60) is None
+    assert cache.stats()["size"] == 1
@@ -0,0 +1,76 @@
+# backend/tests/test_batcher.py
+import threading
+
+import numpy as np
+import pytest
+
+from batcher import InferenceBatcher
+
+
+def window(value=0.0):
+    return np.full((6, 7), value, dtype=np.float32)
+
+
+def test_batch_results_reach_each_caller():
+    batcher = InferenceBatcher(lambda windows: windows[:, -1, 0] * 2, max_batch_size=8, max_wait_ms=20)
+    batcher.start()
+    try:
+        futures = [batcher.submit(window(i)) for i in range(4)]
+        assert [f.result(timeout=5) for f in futures] == [0.0, 2.0, 4.0, 6.0]
+    finally:
+        batcher.stop()
+
+
+def test_cancelled_future_does_not_kill_the_worker():
+    release = threading.Event()
+
+    def predict(windows):
+        release.wait(5)
+        return windows[:, -1, 0]
+
+    batcher = InferenceBatcher(predict, max_batch_size=8, max_wait_ms=50)
+    batcher.start()
+    try:
+        # A request handler that times out cancels its Future while the batch is queued
+        abandoned = batcher.submit(window(1))
+        kept = batcher.submit(window(2))
+        assert abandoned.cancel()
+        release.set()
+        assert kept.result(timeout=5) == 2.0
+
+        # The worker thread survived and still serves later requests
+        assert batcher.stats()["running"]
+        assert batcher.submit(window(3)).result(timeout=5) == 3.0
+    finally:
+        batcher.stop()
+
+
+def test_failed_batch_reaches_every_caller():
+    def predict(windows):
+        raise RuntimeError("model exploded")
+
+    batcher = InferenceBatcher(predict, max_batch_size=8, max_wait_ms=20)
+    batcher.start()
+    try:
+        futures = [batcher.submit(window()) for _ in range(3)]
+        futures[0].cancel()
+        for future in futures[1:]:
+            assert isinstance(future.exception(timeout=5), RuntimeError)
+        assert batcher.submit(window()).exception(timeout=5) is not None
+        assert batcher.stats()["running"]
+    finally:
+        batcher.stop()
+
+
+def test_mismatched_window_fails_its_batch_and_keeps_the_worker():
+    batcher = InferenceBatcher(lambda windows: windows[:, -1, 0], max_batch_size=8, max_wait_ms=50)
+    batcher.start()
+    try:
+        # Both land in one batch, which cannot be stacked
+        good, bad = batcher.submit(window(1.0)), batcher.submit(np.zeros((5, 7)))
+        for future in (good, bad):
+            with pytest.raises(ValueError):
+                future.result(timeout=5)
+        assert batcher.submit(window(3.0)).result(timeout=5) == 3.0
+    finally:
+        batcher.stop()
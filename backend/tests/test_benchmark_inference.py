@@ -0,0 +1,27 @@
+# backend/tests/test_benchmark_inference.py
+from benchmark_inference import compare
+
+ENVIRONMENT = {"machine": "x86_64", "cpu_count": 1, "python": "3.11", "numpy": "1.26"}
+
+
+def results(**benchmarks):
+    return {
+        "environment": ENVIRONMENT,
+        "benchmarks": {name: {"median_us": median, "min_us": minimum}
+                       for name, (median, minimum) in benchmarks.items()},
+    }
+
+
+def test_regression_needs_median_and_minimum_to_slow_down():
+    baseline = results(decode=(100.0, 90.0), scaler=(100.0, 90.0), predict=(100.0, 90.0))
+    current = results(decode=(130.0, 120.0), scaler=(130.0, 91.0), predict=(80.0, 70.0))
+    assert compare(baseline, current, threshold=0.10) == ["decode"]
+
+
+def test_new_and_missing_benchmarks_are_not_regressions(capsys):
+    baseline = results(decode=(100.0, 90.0), scaler=(100.0, 90.0))
+    current = results(decode=(100.0, 90.0), handler=(5000.0, 4000.0))
+    assert compare(baseline, current, threshold=0.10) == []
+    output = capsys.readouterr().out
+    assert "new" in output
+    assert "missing" in output
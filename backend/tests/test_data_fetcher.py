@@ -0,0 +1,46 @@
+# backend/tests/test_data_fetcher.py
+import numpy as np
+import pytest
+
+import data_fetcher
+from async_fetcher import decode_responses
+from mock_openmeteo import MockOpenMeteo, SyntheticSeries
+
+
+@pytest.fixture(scope="module")
+def mock():
+    # Port 0: only forecast() is called, nothing is served
+    server = MockOpenMeteo(("127.0.0.1", 0), SyntheticSeries())
+    yield server
+    server.server_close()
+
+
+def fetch(mock, params):
+    """Decoded hourly blocks for `params`, answered by the mock without HTTP"""
+    body, _ = mock.forecast({name: [str(value)] for name, value in params.items()})
+    return [response.Hourly() for response in decode_responses(body)]
+
+
+def test_lean_window_matches_default_window(mock, monkeypatch):
+    for city in data_fetcher.CITY_COORDS:
+        default = data_fetcher.hourly_to_frame(fetch(mock, data_fetcher.build_city_params(city))[0])
+        expected = default[data_fetcher.FEATURES].tail(data_fetcher.SEQ_LENGTH).to_numpy(np.float32)
+
+        monkeypatch.setattr(data_fetcher, "LEAN_FETCH", True)
+        lean = data_fetcher.hourly_to_window(fetch(mock, data_fetcher.build_city_params(city))[0])
+        monkeypatch.setattr(data_fetcher, "LEAN_FETCH", False)
+
+        np.testing.assert_array_equal(lean, expected, err_msg=city)
+
+
+@pytest.mark.parametrize("grouping", ["location", "timezone", "utc"])
+def test_lean_bulk_requests_share_one_local_window(monkeypatch, grouping):
+    monkeypatch.setattr(data_fetcher, "LEAN_FETCH", True)
+    cities = list(data_fetcher.CITY_COORDS)
+    planned = data_fetcher.plan_bulk_requests(cities, grouping=grouping)
+    assert sorted(city for chunk, _ in planned for city in chunk) == sorted(cities)
+    for chunk, params in planned:
+        timezones = ["GMT"] if grouping == "utc" else [data_fetcher.CITY_COORDS[city][2] for city in chunk]
+        assert all(data_fetcher.lean_params(tz) == {
+            "start_hour": params["start_hour"], "end_hour": params["end_hour"]
+        } for tz in timezones)
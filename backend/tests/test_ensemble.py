@@ -0,0 +1,67 @@
+# backend/tests/test_ensemble.py
+import json
+
+import numpy as np
+
+from ensemble import EnsembleModel, sample_counts
+from model_registry import ModelRegistry, ModelVersion
+
+SAMPLES = 32
+
+
+def member(name, value):
+    """Version predicting and sampling a constant, so draws show which member they came from"""
+    return ModelVersion(
+        name, None, lambda windows: np.full(len(windows), value), None, "numpy",
+        sample_celsius=lambda windows, samples: np.full((samples, len(windows)), value),
+    )
+
+
+def model(parallel=True):
+    return EnsembleModel(
+        {"a": member("a", 0.0), "b": member("b", 10.0)},
+        {"London": np.array([1.0, 0.0]), "Paris": np.array([0.25, 0.75])},
+        np.array([0.5, 0.5]),
+        parallel=parallel,
+    )
+
+
+def test_sample_counts_follow_each_row_and_sum_exactly():
+    counts = sample_counts(np.array([[0.5, 0.5], [1 / 3, 2 / 3], [0.01, 0.99]]), SAMPLES)
+    assert counts.sum(axis=1).tolist() == [SAMPLES] * 3
+    assert counts.tolist() == [[16, 16], [11, 21], [0, 32]]
+
+
+def test_samples_use_the_same_per_city_weights_as_the_prediction():
+    ensemble, windows = model(), np.zeros((3, 6, 7))
+    cities = ["London", "Paris", "Tokyo"]
+    draws = ensemble.sample_celsius(windows, SAMPLES, cities)
+    assert draws.shape == (SAMPLES, 3)
+    np.testing.assert_allclose(draws.mean(axis=0), ensemble.predict(windows, cities)["prediction"])
+    ensemble.close()
+
+
+def test_closed_ensemble_still_answers_serially():
+    ensemble = model()
+    ensemble.close()
+    assert ensemble._pool is None
+    assert ensemble.predict(np.zeros((1, 6, 7)), ["Paris"])["prediction"].tolist() == [7.5]
+
+
+def test_registry_closes_replaced_unloaded_and_remaining_ensembles(tmp_path):
+    path = tmp_path / "registry.json"
+    path.write_text(json.dumps({"active": "a", "versions": {"a": {}, "b": {}, "c": {}}}))
+    registry = ModelRegistry(str(path), loader=None)
+    pools = {}
+    for name in ("a", "b", "c"):
+        ensemble = model()
+        pools[name] = ensemble._pool
+        registry.adopt(name, ModelVersion(name, None, None, None, "ensemble", ensemble=ensemble))
+
+    replaced = pools["a"]
+    registry.adopt("a", member("a", 0.0))
+    registry.unload("b")
+    assert replaced._shutdown and pools["b"]._shutdown and not pools["c"]._shutdown
+
+    registry.close()
+    assert pools["c"]._shutdown
@@ -0,0 +1,86 @@
+# backend/tests/test_forecast.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_fetcher import FEATURES
+from model_utils import windows_ending_at
+from prediction_cache import PredictionCache, current_hour
+
+MIDNIGHT = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def frame(hours=48):
+    """Hourly rows from midnight; temperature is the row's hour index"""
+    df = pd.DataFrame({"date": pd.date_range(MIDNIGHT, periods=hours, freq="h")})
+    for i, feature in enumerate(FEATURES):
+        df[feature] = np.arange(hours, dtype=np.float32) + 100 * i
+    return df
+
+
+def test_window_ends_at_the_given_hour():
+    windows, ends = windows_ending_at([frame()], FEATURES, [MIDNIGHT + timedelta(hours=10)])
+    assert ends == [MIDNIGHT + timedelta(hours=10)]
+    assert windows[0, :, 0].tolist() == [5, 6, 7, 8, 9, 10]
+
+
+def test_window_right_after_midnight_is_the_first_rows():
+    windows, ends = windows_ending_at([frame()], FEATURES, [MIDNIGHT + timedelta(hours=2)])
+    assert ends == [MIDNIGHT + timedelta(hours=5)]
+    assert windows[0, :, 0].tolist() == [0, 1, 2, 3, 4, 5]
+
+
+def test_lean_windows_cannot_be_placed_in_time():
+    with pytest.raises(ValueError):
+        windows_ending_at([np.zeros((6, len(FEATURES)), dtype=np.float32)], FEATURES, [MIDNIGHT])
+
+
+class FrozenClockCache(PredictionCache):
+    def __init__(self, now):
+        super().__init__()
+        self.now = now
+
+    def get(self, city, model_version, now=None):
+        return super().get(city, model_version, now=now or self.now)
+
+
+def test_forecast_is_labelled_from_now_cached_and_shared(monkeypatch):
+    import main
+
+    now = MIDNIGHT + timedelta(hours=10, minutes=30)
+    fetches = []
+
+    async def load_cities_data(cities):
+        fetches.append(list(cities))
+        await asyncio.sleep(0.05)
+        return {city: (frame(), current_hour(now)) for city in cities}
+
+    class Registry:
+        active = "1.0.0"
+
+        def get(self, version):
+            return main.ModelVersion(version, None, None, None, "numpy")
+
+    def rollout(predict_fn, scaler, windows, hours):
+        # Carries the window's last temperature forward, so labels can be checked against it
+        return np.repeat(windows[:, -1:, 0], hours, axis=1)
+
+    monkeypatch.setattr(main, "ensure_model_ready", lambda: None)
+    monkeypatch.setattr(main, "load_cities_data", load_cities_data)
+    monkeypatch.setattr(main, "registry", Registry())
+    monkeypatch.setattr(main, "rollout_forecast", rollout)
+    monkeypatch.setattr(main, "forecast_cache", FrozenClockCache(now))
+
+    async def scenario():
+        first = await asyncio.gather(*(main.forecast_weather(city=["London"], hours=3) for _ in range(4)))
+        return first, await main.forecast_weather(city=["London"], hours=3)
+
+    concurrent, cached = asyncio.run(scenario())
+    assert fetches == [["London"]]
+    hourly = cached.forecasts[0].hourly
+    assert [h.time for h in hourly] == [(MIDNIGHT + timedelta(hours=h)).isoformat() for h in (11, 12, 13)]
+    assert [h.temperature for h in hourly] == [10.0] * 3
+    assert all(response.forecasts[0] == cached.forecasts[0] for response in concurrent)
@@ -0,0 +1,63 @@
+# backend/tests/test_metrics.py
+import threading
+
+import pytest
+from prometheus_client import REGISTRY
+
+import metrics
+
+pytestmark = pytest.mark.skipif(not metrics.METRICS_ENABLED, reason="METRICS_ENABLED=false")
+
+
+def observations(stage):
+    return REGISTRY.get_sample_value("weather_stage_seconds_count", {"stage": stage}) or 0.0
+
+
+@metrics.timed("decode")
+def decode():
+    return "frame"
+
+
+def test_suppressed_block_is_not_observed():
+    before = observations("decode")
+    with metrics.suppressed():
+        for _ in range(20):
+            decode()
+            with metrics.stage("decode"):
+                pass
+    assert observations("decode") == before
+
+    decode()
+    assert observations("decode") == before + 1
+
+
+def test_suppression_does_not_leak_to_other_threads():
+    before = observations("sequence")
+    inside, release = threading.Event(), threading.Event()
+
+    def warm_up():
+        with metrics.suppressed():
+            inside.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=warm_up)
+    thread.start()
+    inside.wait(5)
+    with metrics.stage("sequence"):
+        pass
+    release.set()
+    thread.join()
+    assert observations("sequence") == before + 1
+
+
+def upstream(result):
+    return REGISTRY.get_sample_value("weather_upstream_cache_total", {"result": result}) or 0.0
+
+
+def test_async_cache_lookups_use_the_requests_cache_labels():
+    hits, misses = upstream("hit"), upstream("miss")
+    metrics.record_upstream_lookup(False)
+    metrics.record_upstream_lookup(True)
+    metrics.record_upstream_lookup(True)
+    assert (upstream("hit"), upstream("miss")) == (hits + 2, misses + 1)
+    assert REGISTRY.get_sample_value("weather_upstream_cache_total", {"result": "uncached"}) is None
@@ -0,0 +1,78 @@
+# backend/tests/test_model_registry.py
+import json
+import os
+import time
+
+from model_registry import ModelRegistry
+
+
+class Loader:
+    """Fake model loader; versions listed in `broken` fail to load"""
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.loads = []
+
+    def __call__(self, spec, base_dir):
+        self.loads.append(spec["model"])
+        if spec["model"] in self.broken:
+            raise OSError(f"cannot read {spec['model']}")
+        return (lambda windows: windows), (lambda windows: windows), None, None
+
+
+def write_config(path, active):
+    previous = os.path.getmtime(path) if os.path.exists(path) else 0.0
+    with open(path, "w") as f:
+        json.dump({"active": active, "versions": {"a": {"model": "a"}, "b": {"model": "b"}}}, f)
+    # Two writes within one timestamp tick would look unchanged to poll()
+    os.utime(path, (previous + 1.0, previous + 1.0))
+
+
+def poll_until_settled(registry, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    registry.poll()
+    while registry.stats()["activating"] is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_failed_activation_is_reported_and_retried(tmp_path):
+    path = str(tmp_path / "registry.json")
+    write_config(path, "a")
+    loader = Loader(broken={"b"})
+    registry = ModelRegistry(path, loader, poll_s=0.0)
+    registry.get("a")
+
+    write_config(path, "b")
+    poll_until_settled(registry)
+    stats = registry.stats()
+    assert stats["active"] == "a"
+    assert stats["activation_error"]["version"] == "b"
+    assert stats["activation_error"]["attempts"] == 1
+
+    poll_until_settled(registry)
+    assert registry.stats()["activation_error"]["attempts"] == 2
+
+    # Once the version loads, the pending change finally goes through
+    loader.broken.clear()
+    poll_until_settled(registry)
+    stats = registry.stats()
+    assert stats["active"] == "b"
+    assert stats["activation_error"] is None
+    assert loader.loads == ["a", "b", "b", "b"]
+
+    # Nothing left to retry: an unchanged file is not re-read
+    poll_until_settled(registry)
+    assert loader.loads == ["a", "b", "b", "b"]
+
+
+def test_successful_activation_is_not_repeated(tmp_path):
+    path = str(tmp_path / "registry.json")
+    write_config(path, "a")
+    loader = Loader()
+    registry = ModelRegistry(path, loader, poll_s=0.0)
+
+    write_config(path, "b")
+    poll_until_settled(registry)
+    poll_until_settled(registry)
+    assert registry.active == "b"
+    assert loader.loads == ["b"]
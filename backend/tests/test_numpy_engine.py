@@ -0,0 +1,83 @@
+# backend/tests/test_numpy_engine.py
+import os
+
+import numpy as np
+import pytest
+
+from export_weights import verify_fused_parity, verify_parity
+from numpy_engine import NumpyLSTMEngine
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+WEIGHTS = os.path.join(MODELS_DIR, "global_weather_weights.npz")
+FUSED = os.path.join(MODELS_DIR, "global_weather_fused.npz")
+
+
+@pytest.fixture(scope="module")
+def keras_model():
+    tf = pytest.importorskip("tensorflow")
+    return tf.keras.models.load_model(os.path.join(MODELS_DIR, "global_weather_saved_model.keras"), compile=False)
+
+
+@pytest.fixture(scope="module")
+def scaler():
+    joblib = pytest.importorskip("joblib")
+    return joblib.load(os.path.join(MODELS_DIR, "scaler_global.pkl"))
+
+
+def windows(engine, n=32, seed=0):
+    _, seq_length, n_features = engine.input_shape
+    return np.random.default_rng(seed).uniform(0.0, 1.0, size=(n, seq_length, n_features)).astype(np.float32)
+
+
+def test_committed_weights_match_keras(keras_model):
+    assert verify_parity(keras_model, NumpyLSTMEngine.from_npz(WEIGHTS), n_samples=64) < 1e-4
+
+
+def test_parity_check_rejects_a_diverging_engine(keras_model):
+    engine = NumpyLSTMEngine.from_npz(WEIGHTS)
+    engine.layers[-1]["bias"] = engine.layers[-1]["bias"] + 0.01
+    with pytest.raises(AssertionError):
+        verify_parity(keras_model, engine, n_samples=16)
+
+
+def test_predict_is_row_independent():
+    engine = NumpyLSTMEngine.from_npz(WEIGHTS)
+    X = windows(engine)
+    batched = engine.predict(X)
+    assert batched.shape == (len(X), engine.output_shape[1])
+    np.testing.assert_allclose(np.concatenate([engine.predict(x[None]) for x in X]), batched, atol=1e-6)
+
+
+def test_committed_fused_weights_match_keras_and_scaler(keras_model, scaler):
+    fused = NumpyLSTMEngine.from_npz(FUSED)
+    assert fused.raw_io
+    assert verify_fused_parity(keras_model, scaler, fused, n_samples=64) < 1e-3
+
+
+def test_npy_dir_matches_npz():
+    X = windows(NumpyLSTMEngine.from_npz(WEIGHTS))
+    for name in ("global_weather_weights", "global_weather_fused"):
+        npz = NumpyLSTMEngine.from_npz(os.path.join(MODELS_DIR, name + ".npz"))
+        mapped = NumpyLSTMEngine.load(os.path.join(MODELS_DIR, name))
+        np.testing.assert_allclose(mapped.predict(X), npz.predict(X), atol=1e-6)
+
+
+def test_predict_with_state_matches_predict():
+    engine = NumpyLSTMEngine.from_npz(WEIGHTS)
+    X = windows(engine)
+    pred, states = engine.predict_with_state(X)
+    np.testing.assert_allclose(pred, engine.predict(X), atol=1e-6)
+    assert len(states) == sum(layer["kind"] == "lstm" for layer in engine.layers)
+
+
+def test_advance_matches_full_forward_pass():
+    engine = NumpyLSTMEngine.from_npz(WEIGHTS)
+    X = windows(engine)
+    _, states = engine.predict_with_state(X[:, :-1])
+    pred, new_states = engine.advance(X[:, -1], states)
+    np.testing.assert_allclose(pred, engine.predict(X), atol=1e-5)
+
+    # Chained steps carry the state forward just like one pass over the longer sequence
+    nxt = windows(engine, seed=1)[:, 0]
+    pred, _ = engine.advance(nxt, new_states)
+    np.testing.assert_allclose(pred, engine.predict(np.concatenate([X, nxt[:, None]], axis=1)), atol=1e-5)
@@ -0,0 +1,88 @@
+# backend/tests/test_prediction_cache.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from prediction_cache import PredictionCache, current_hour
+
+TEN = datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+
+
+def test_entry_is_served_until_the_next_hour():
+    cache = PredictionCache()
+    cache.put("London", "1.0.0", "prediction", observed_hour=TEN)
+    assert cache.get("London", "1.0.0", now=TEN + timedelta(minutes=59)) == "prediction"
+    assert cache.get("London", "1.0.0", now=TEN + timedelta(hours=1)) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_data_from_the_previous_hour_is_not_served_in_the_next():
+    # Fetched at 10:59, stored after the boundary: keyed by the data's hour, not the clock
+    cache = PredictionCache()
+    cache.put("London", "1.0.0", "prediction", observed_hour=TEN)
+    assert cache.get("London", "1.0.0", now=TEN + timedelta(hours=1, seconds=1)) is None
+
+
+def test_pandas_observation_hour_matches_wall_clock_key():
+    hour = pd.Timestamp(TEN).to_pydatetime()
+    cache = PredictionCache()
+    cache.put("London", "1.0.0", "prediction", observed_hour=hour)
+    assert cache.get("London", "1.0.0", now=TEN + timedelta(minutes=5)) == "prediction"
+    assert current_hour(TEN + timedelta(minutes=5)) == hour
+
+
+def fetch_across_the_hour(monkeypatch):
+    """Patch main so every fetch starts at 10:59:59 and returns at 11:00:01"""
+    import main
+
+    clock = [TEN + timedelta(minutes=59, seconds=59)]
+
+    def fetched(frame):
+        clock[0] = TEN + timedelta(hours=1, seconds=1)
+        return frame
+
+    async def fetch_city(city):
+        return fetched("frame")
+
+    async def fetch_bulk(cities):
+        return {city: fetched("frame") for city in cities}
+
+    async def score_windows(windows, cities, model_version):
+        return np.full(len(windows), 21.5), None
+
+    async def no_uncertainty(windows, cities, model_version):
+        return None
+
+    monkeypatch.setattr(main, "current_hour", lambda now=None: current_hour(now or clock[0]))
+    monkeypatch.setattr(main, "ASYNC_FETCH", True)
+    monkeypatch.setattr(main, "BULK_FETCH", True)
+    monkeypatch.setattr(main, "fetch_city_data_async", fetch_city)
+    monkeypatch.setattr(main, "fetch_cities_data_bulk_async", fetch_bulk)
+    monkeypatch.setattr(main, "build_input_windows", lambda frames, features: np.zeros((len(frames), 6, 7)))
+    monkeypatch.setattr(main, "score_windows", score_windows)
+    monkeypatch.setattr(main, "estimate_uncertainty", no_uncertainty)
+    monkeypatch.setattr(main, "window_memo", None)
+    monkeypatch.setattr(main, "prediction_cache", PredictionCache())
+    return main
+
+
+def test_single_prediction_is_keyed_by_the_hour_its_fetch_started(monkeypatch):
+    main = fetch_across_the_hour(monkeypatch)
+    asyncio.run(main.compute_city_prediction("London", "1.0.0"))
+    assert main.prediction_cache.get("London", "1.0.0", now=TEN + timedelta(minutes=59, seconds=59)) is not None
+    assert main.prediction_cache.get("London", "1.0.0", now=TEN + timedelta(hours=1, seconds=2)) is None
+
+
+def test_batch_predictions_are_keyed_by_the_hour_their_fetch_started(monkeypatch):
+    main = fetch_across_the_hour(monkeypatch)
+
+    async def scenario():
+        results = await main.load_cities_data(["London", "Tokyo"])
+        return await main.predict_cities(list(results), list(results.values()), ["1.0.0", "1.0.0"])
+
+    assert [r.city for r in asyncio.run(scenario())] == ["London", "Tokyo"]
+    for city in ("London", "Tokyo"):
+        assert main.prediction_cache.get(city, "1.0.0", now=TEN + timedelta(minutes=59, seconds=59)) is not None
+        assert main.prediction_cache.get(city, "1.0.0", now=TEN + timedelta(hours=1, seconds=2)) is None
@@ -0,0 +1,127 @@
+# backend/tests/test_refresher.py
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from refresher import HourlyRefresher
+
+
+class Backend:
+    """Fake fetch/predict pair counting the fetches per city; `Bad` always fails"""
+
+    def __init__(self):
+        self.fetches = Counter()
+
+    async def fetch(self, city):
+        self.fetches[city] += 1
+        if city == "Bad":
+            raise ConnectionError("upstream down")
+        return f"frame {city}"
+
+    async def predict(self, cities, frames):
+        return [f"prediction {city}" for city in cities]
+
+
+def run_for(refresher, seconds):
+    async def scenario():
+        refresher.start()
+        await asyncio.sleep(seconds)
+        await refresher.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failing_city_does_not_block_hourly_refresh():
+    backend = Backend()
+    refresher = HourlyRefresher(["A", "B", "Bad"], backend.fetch, backend.predict, retry_s=0.01)
+    # Compress the hour: a full refresh is due every 100 ms
+    refresher._next_full_refresh = lambda: datetime.now(timezone.utc) + timedelta(seconds=0.1)
+
+    run_for(refresher, 0.35)
+
+    assert backend.fetches["A"] >= 3
+    assert backend.fetches["B"] == backend.fetches["A"]
+    # Retries in between the full runs only refetch the failing city
+    assert backend.fetches["Bad"] > backend.fetches["A"]
+    assert refresher.latest("A") == "prediction A"
+    assert refresher.status()["cities"]["Bad"]["status"] == "error"
+
+
+def test_retries_stop_once_the_city_recovers():
+    backend = Backend()
+    recovered = {"Bad": False}
+    fetch = backend.fetch
+
+    async def flaky_fetch(city):
+        if city == "Bad" and recovered["Bad"]:
+            backend.fetches[city] += 1
+            return "frame Bad"
+        return await fetch(city)
+
+    refresher = HourlyRefresher(["A", "Bad"], flaky_fetch, backend.predict, retry_s=0.01)
+    refresher._next_full_refresh = lambda: datetime.now(timezone.utc) + timedelta(hours=1)
+
+    async def scenario():
+        refresher.start()
+        await asyncio.sleep(0.05)
+        recovered["Bad"] = True
+        await asyncio.sleep(0.05)
+        retries = backend.fetches["Bad"]
+        await asyncio.sleep(0.05)
+        await refresher.stop()
+        return retries
+
+    retries = asyncio.run(scenario())
+    assert backend.fetches["A"] == 1
+    assert backend.fetches["Bad"] == retries
+    assert refresher.latest("Bad") == "prediction Bad"
+
+
+def test_failing_result_handler_does_not_stop_the_refresher():
+    backend = Backend()
+
+    def on_result(city, result):
+        raise RuntimeError("broadcaster broke")
+
+    refresher = HourlyRefresher(["A", "B"], backend.fetch, backend.predict, on_result=on_result, retry_s=0.01)
+    refresher._next_full_refresh = lambda: datetime.now(timezone.utc) + timedelta(seconds=0.05)
+
+    run_for(refresher, 0.2)
+
+    assert backend.fetches["A"] >= 3
+    assert refresher.latest("B") == "prediction B"
+    assert refresher.healthy()
+
+
+def test_exception_in_a_run_is_recorded_and_the_loop_continues():
+    backend = Backend()
+    calls = Counter()
+
+    async def predict(cities, frames):
+        calls["predict"] += 1
+        if calls["predict"] == 1:
+            return None  # not iterable: refresh_once itself raises
+        return await backend.predict(cities, frames)
+
+    refresher = HourlyRefresher(["A"], backend.fetch, predict, retry_s=0.01)
+    refresher._next_full_refresh = lambda: datetime.now(timezone.utc) + timedelta(hours=1)
+
+    run_for(refresher, 0.1)
+
+    assert calls["predict"] == 2
+    assert refresher.latest("A") == "prediction A"
+    assert refresher.status()["last_error"] is None
+    assert refresher.healthy()
+
+
+def test_early_wake_up_without_failures_does_not_refresh():
+    backend = Backend()
+    refresher = HourlyRefresher(["A", "B"], backend.fetch, backend.predict)
+    deadline = datetime.now(timezone.utc) + timedelta(seconds=0.2)
+    refresher._next_full_refresh = lambda: deadline
+    # Every wait ends at once, well before the full-refresh deadline
+    refresher._seconds_until_next_run = lambda failed: 0.0
+
+    run_for(refresher, 0.05)
+
+    assert backend.fetches == Counter({"A": 1, "B": 1})
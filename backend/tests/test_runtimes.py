@@ -0,0 +1,41 @@
+# backend/tests/test_runtimes.py
+import os
+
+import numpy as np
+import pytest
+
+from runtimes import RUNTIME_PATHS, TFLiteEngine, batch_bucket
+
+
+def test_batch_bucket_is_the_next_power_of_two_up_to_the_cap():
+    assert [batch_bucket(n, 64) for n in (1, 2, 3, 5, 33, 64, 65, 500)] == [1, 2, 4, 8, 64, 64, 64, 64]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    if not os.path.exists(RUNTIME_PATHS["tflite"]):
+        pytest.skip("no TFLite export")
+    try:
+        return TFLiteEngine(RUNTIME_PATHS["tflite"], max_batch=8)
+    except ImportError:
+        pytest.skip("no TFLite interpreter installed")
+
+
+def test_padded_and_chunked_batches_match_single_rows(engine):
+    X = np.random.default_rng(0).uniform(0.0, 1.0, size=(21, 6, 7)).astype(np.float32)
+    single = np.concatenate([engine.predict(X[i:i + 1]) for i in range(len(X))])
+    for n in (3, 8, 21):
+        np.testing.assert_allclose(engine.predict(X[:n]), single[:n], atol=1e-5)
+    # 1 for the single rows, 4 for n=3 (padded), 8 for n=8 and every chunk of n=21 (8, 8, 5 padded)
+    assert sorted(engine._interpreters) == [1, 4, 8]
+
+
+def test_interpreter_cache_is_bounded(engine):
+    for n in range(1, 40):
+        engine.predict(np.zeros((n, 6, 7), dtype=np.float32))
+    assert sorted(engine._interpreters) == [1, 2, 4, 8]
+
+
+def test_max_batch_must_be_a_power_of_two():
+    with pytest.raises(ValueError):
+        TFLiteEngine(RUNTIME_PATHS["tflite"], max_batch=48)
@@ -0,0 +1,126 @@
+# backend/tests/test_single_flight.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+CALLERS = 8
+
+
+class Upstream:
+    """Fake fetch that blocks until every caller has arrived, then returns or raises"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = threading.Event()
+
+    def fetch(self, city):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return f"forecast for {city}"
+
+    async def fetch_async(self, city):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.error is not None:
+            raise self.error
+        return f"forecast for {city}"
+
+
+def run_threads(flight, upstream):
+    """Start CALLERS concurrent `do` calls; returns their results or exceptions in order"""
+    def call():
+        try:
+            return flight.do("London", upstream.fetch, "London")
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(call) for _ in range(CALLERS)]
+        # Followers only join while the leader is in flight, so wait for all of them first
+        while flight.stats()["shared"] < CALLERS - 1 and not all(f.done() for f in futures):
+            time.sleep(0.005)
+        upstream.release.set()
+        return [future.result(5) for future in futures]
+
+
+def test_concurrent_callers_share_one_fetch():
+    flight, upstream = SingleFlight(), Upstream()
+    results = run_threads(flight, upstream)
+    assert upstream.calls == 1
+    assert results == ["forecast for London"] * CALLERS
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "shared": CALLERS - 1}
+
+
+def test_leader_exception_reaches_every_waiter():
+    flight, upstream = SingleFlight(), Upstream(error=ConnectionError("upstream down"))
+    results = run_threads(flight, upstream)
+    assert upstream.calls == 1
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_key_is_released_after_failure():
+    flight, failing = SingleFlight(), Upstream(error=ConnectionError("upstream down"))
+    failing.release.set()
+    with pytest.raises(ConnectionError):
+        flight.do("London", failing.fetch, "London")
+    assert flight.stats()["in_flight"] == 0
+
+    upstream = Upstream()
+    upstream.release.set()
+    assert flight.do("London", upstream.fetch, "London") == "forecast for London"
+    assert upstream.calls == 1
+
+
+def test_async_concurrent_callers_share_one_fetch():
+    async def scenario():
+        flight, upstream = AsyncSingleFlight(), Upstream()
+        results = await asyncio.gather(
+            *(flight.do("London", upstream.fetch_async, "London") for _ in range(CALLERS))
+        )
+        return flight, upstream, results
+
+    flight, upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert results == ["forecast for London"] * CALLERS
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "shared": CALLERS - 1}
+
+
+def test_async_leader_exception_reaches_every_waiter_and_releases_key():
+    async def scenario():
+        flight, upstream = AsyncSingleFlight(), Upstream(error=ConnectionError("upstream down"))
+        results = await asyncio.gather(
+            *(flight.do("London", upstream.fetch_async, "London") for _ in range(CALLERS)),
+            return_exceptions=True,
+        )
+        in_flight = flight.stats()["in_flight"]
+        upstream.error = None
+        retried = await flight.do("London", upstream.fetch_async, "London")
+        return upstream, results, in_flight, retried
+
+    upstream, results, in_flight, retried = asyncio.run(scenario())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert in_flight == 0
+    assert retried == "forecast for London"
+    assert upstream.calls == 2
+
+
+def test_async_cancelled_caller_does_not_cancel_the_shared_fetch():
+    async def scenario():
+        flight, upstream = AsyncSingleFlight(), Upstream()
+        first = asyncio.ensure_future(flight.do("London", upstream.fetch_async, "London"))
+        second = asyncio.ensure_future(flight.do("London", upstream.fetch_async, "London"))
+        await asyncio.sleep(0)
+        first.cancel()
+        return upstream, await second
+
+    upstream, result = asyncio.run(scenario())
+    assert result == "forecast for London"
+    assert upstream.calls == 1
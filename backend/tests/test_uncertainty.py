@@ -0,0 +1,23 @@
+# backend/tests/test_uncertainty.py
+import numpy as np
+import pytest
+
+from uncertainty import summarize
+
+
+def test_confidence_follows_the_normal_approximation():
+    rng = np.random.default_rng(0)
+    # Spread of exactly 1 °C and 2 °C: P(|T - mean| <= 1 °C) is 68.27% and 38.29%
+    samples = np.stack([rng.standard_normal(4096), 2.0 * rng.standard_normal(4096)], axis=1)
+    samples = (samples - samples.mean(axis=0)) / samples.std(axis=0, ddof=1) * [1.0, 2.0] + 20.0
+    summary = summarize(samples, interval=0.9, tolerance=1.0)
+    np.testing.assert_allclose(summary["confidence"], [68.27, 38.29], atol=0.01)
+    np.testing.assert_allclose(summary["mean"], [20.0, 20.0])
+    assert summary["lower"][0] == pytest.approx(20.0 - 1.645, abs=0.1)
+    assert summary["upper"][1] == pytest.approx(20.0 + 2 * 1.645, abs=0.2)
+
+
+def test_zero_spread_is_full_confidence():
+    summary = summarize(np.full((8, 3), 21.5))
+    np.testing.assert_allclose(summary["confidence"], [100.0, 100.0, 100.0])
+    np.testing.assert_allclose(summary["std"], 0.0)
@@ -0,0 +1,83 @@
+# backend/tests/test_window_memo.py
+import asyncio
+
+import numpy as np
+
+from window_memo import WindowMemo
+
+
+def window(seed=0):
+    return np.random.default_rng(seed).uniform(0.0, 30.0, size=(6, 7)).astype(np.float32)
+
+
+def test_unchanged_window_is_reused():
+    memo = WindowMemo()
+    memo.put("London", "1.0.0", window(), "scored")
+    assert memo.get("London", "1.0.0", window()) == "scored"
+    assert memo.stats()["reused"] == 1
+
+
+def test_revised_window_is_scored_again():
+    memo = WindowMemo()
+    memo.put("London", "1.0.0", window(), "scored")
+    revised = window()
+    revised[2, 0] += 0.5
+    assert memo.get("London", "1.0.0", revised) is None
+    assert memo.stats() == {"size": 1, "max_size": 256, "reused": 0, "computed": 1}
+
+
+def test_entries_are_per_city_and_version():
+    memo = WindowMemo()
+    memo.put("London", "1.0.0", window(), "v1")
+    assert memo.get("London", "2.0.0", window()) is None
+    assert memo.get("Paris", "1.0.0", window()) is None
+
+
+def test_stored_window_is_a_copy():
+    memo, raw = WindowMemo(), window()
+    memo.put("London", "1.0.0", raw, "scored")
+    raw[0, 0] += 1.0
+    assert memo.get("London", "1.0.0", raw) is None
+    assert memo.get("London", "1.0.0", window()) == "scored"
+
+
+def test_least_recently_used_city_is_evicted():
+    memo = WindowMemo(max_size=2)
+    memo.put("London", "1.0.0", window(1), "london")
+    memo.put("Paris", "1.0.0", window(2), "paris")
+    memo.get("London", "1.0.0", window(1))
+    memo.put("Tokyo", "1.0.0", window(3), "tokyo")
+    assert memo.get("Paris", "1.0.0", window(2)) is None
+    assert memo.get("London", "1.0.0", window(1)) == "london"
+
+
+def test_predict_path_scores_a_window_once_per_version(monkeypatch):
+    import main
+
+    scored, current = [], [window()]
+
+    async def fetch_city(city):
+        return "frame"
+
+    async def score_windows(windows, cities, model_version):
+        scored.append(model_version)
+        return np.full(len(windows), 21.5), None
+
+    async def no_uncertainty(windows, cities, model_version):
+        return None
+
+    monkeypatch.setattr(main, "ASYNC_FETCH", True)
+    monkeypatch.setattr(main, "fetch_city_data_async", fetch_city)
+    monkeypatch.setattr(main, "build_input_windows", lambda frames, features: current[0][None])
+    monkeypatch.setattr(main, "score_windows", score_windows)
+    monkeypatch.setattr(main, "estimate_uncertainty", no_uncertainty)
+    monkeypatch.setattr(main, "prediction_cache", None)
+    monkeypatch.setattr(main, "window_memo", WindowMemo())
+
+    for version in ("1.0.0", "1.0.0", "2.0.0", "2.0.0"):
+        asyncio.run(main.compute_city_prediction("London", version))
+    assert scored == ["1.0.0", "2.0.0"]
+
+    current[0] = window(seed=1)
+    asyncio.run(main.compute_city_prediction("London", "1.0.0"))
+    assert scored == ["1.0.0", "2.0.0", "1.0.0"]
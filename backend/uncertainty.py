@@ -0,0 +1,83 @@
+# backend/uncertainty.py
+"""Prediction uncertainty from Monte Carlo dropout.
+
+The model has a Dropout layer between its two LSTMs. Keeping it active at
+inference and scoring the same window many times gives a spread of predictions
+whose standard deviation estimates the model's uncertainty. Rather than N
+forward passes, each sampler scores all N copies of every window as one
+(N * batch) stack, so the cost stays close to a single inference call.
+"""
+import math
+import os
+
+import numpy as np
+
+# Stochastic passes per window; 0 turns uncertainty estimation off
+MC_DROPOUT_SAMPLES = int(os.getenv("MC_DROPOUT_SAMPLES", 32))
+# Central coverage of the reported prediction interval
+PREDICTION_INTERVAL = float(os.getenv("PREDICTION_INTERVAL", 0.9))
+# `confidence` is the probability that the temperature lies within this many °C of the prediction
+CONFIDENCE_TOLERANCE_C = float(os.getenv("CONFIDENCE_TOLERANCE_C", 1.0))
+
+# Element-wise math.erf; one value per window, so a Python-level loop costs nothing measurable
+_erf = np.vectorize(math.erf, otypes=[np.float64])
+
+
+def numpy_sampler(engine, scale=None, offset=None):
+    """Sampler over a NumpyLSTMEngine: raw (N, T, F) windows -> (samples, N) °C
+
+    `scale` and `offset` (the MinMax constants) are folded into a scaled-in,
+    scaled-out engine once, here, so sampling needs no per-request scaling.
+    """
+    if not engine.raw_io:
+        engine = engine.fold_scaler(scale, offset)
+    rng = np.random.default_rng()
+
+    def sample(windows, samples):
+        return engine.predict_mc(windows, samples, rng)[:, :, 0]
+
+    return sample
+
+
+def keras_sampler(model, scale, offset, seq_length, n_features, target_index=0):
+    """Sampler tracing tile -> model(training=True) -> inverse-scale as one graph"""
+    import tensorflow as tf
+
+    scale = tf.constant(scale, dtype=tf.float32)
+    offset = tf.constant(offset, dtype=tf.float32)
+
+    @tf.function(input_signature=[
+        tf.TensorSpec([None, seq_length, n_features], tf.float32),
+        tf.TensorSpec([], tf.int32),
+    ])
+    def sample_graph(x, samples):
+        # Copy k of window i sits at row k * N + i, so the reshape below is (samples, N)
+        tiled = tf.tile(x * scale + offset, [samples, 1, 1])
+        y = model(tiled, training=True)[:, 0]
+        return tf.reshape((y - offset[target_index]) / scale[target_index], [samples, -1])
+
+    def sample(windows, samples):
+        return sample_graph(np.asarray(windows, dtype=np.float32), np.int32(samples)).numpy()
+
+    return sample
+
+
+def summarize(samples, interval=PREDICTION_INTERVAL, tolerance=CONFIDENCE_TOLERANCE_C):
+    """Per-window statistics of (samples, N) predictions in °C; every value is an (N,) array
+
+    `lower`/`upper` are the empirical quantiles bounding the central `interval`
+    of the samples. `confidence` (0-100) treats the prediction as normal with the
+    sampled standard deviation: P(|T - mean| <= tolerance) = erf(tolerance / (std * sqrt(2))).
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    std = samples.std(axis=0, ddof=1) if len(samples) > 1 else np.zeros(samples.shape[1])
+    lower, upper = np.quantile(samples, [(1.0 - interval) / 2, (1.0 + interval) / 2], axis=0)
+    # A zero spread (e.g. dropout rate 0) means full confidence, not a division by zero
+    confidence = 100.0 * _erf(tolerance / (np.maximum(std, 1e-9) * np.sqrt(2.0)))
+    return {
+        "mean": samples.mean(axis=0),
+        "std": std,
+        "lower": lower,
+        "upper": upper,
+        "confidence": confidence,
+    }
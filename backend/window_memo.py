@@ -0,0 +1,56 @@
+# backend/window_memo.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class WindowMemo:
+    """Last scored input window per (city, model version) and what it produced.
+
+    /predict scores the last hours of the 7-day forecast, which only move on once
+    a day; between forecast revisions every refetch yields the same window. An
+    entry is reused only while the new raw window is equal to the stored one,
+    so a revised forecast is always scored again. Unlike the prediction cache,
+    entries do not expire at the hour boundary.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._reused = 0
+        self._computed = 0
+
+    def get(self, city, model_version, window):
+        """The value stored for exactly this raw (seq_length, n_features) window, else None"""
+        key = (city, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not np.array_equal(entry[0], window):
+                self._computed += 1
+                return None
+            self._entries.move_to_end(key)
+            self._reused += 1
+            return entry[1]
+
+    def put(self, city, model_version, window, value):
+        key = (city, model_version)
+        with self._lock:
+            self._entries[key] = (np.array(window, copy=True), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "reused": self._reused,
+                "computed": self._computed,
+            }
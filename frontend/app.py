@@ -16,6 +16,7 @@ from dotenv import load_dotenv
 
 # Import timezone utilities
 from utils.timezone_utils import TimezoneManager, get_user_timezone, format_timestamp, get_current_user_time
+from utils.prediction_stream import PredictionStream
 
 load_dotenv()
 # BACKEND_URL = "http://127.0.0.1:8000"
@@ -30,6 +31,30 @@ elif st.session_state.previous_backend_url != BACKEND_URL:
     st.session_state.previous_backend_url = BACKEND_URL
     
 print(f"🔗 Backend URL: {BACKEND_URL}")
+
+# Live predictions pushed by the backend's hourly refresh; False falls back to polling /predict
+PREDICTION_STREAM_ENABLED = os.getenv("PREDICTION_STREAM_ENABLED", "True").lower() == "true"
+# How often each session checks the shared stream for a newer prediction (no backend request)
+STREAM_CHECK_S = float(os.getenv("STREAM_CHECK_S", 10))
+
+@st.cache_resource
+def get_prediction_stream(backend_url):
+    """One SSE connection per frontend process, shared by every session"""
+    return PredictionStream(backend_url).start()
+
+prediction_stream = get_prediction_stream(BACKEND_URL) if PREDICTION_STREAM_ENABLED else None
+
+def streamed_event_id(city):
+    """Id of the newest pushed prediction for a city, None without one"""
+    streamed = prediction_stream.latest(city) if prediction_stream is not None else None
+    return streamed[0] if streamed is not None else None
+
+def stream_has_update(city):
+    """True when the stream holds a newer prediction than the one this session shows"""
+    event_id = streamed_event_id(city)
+    shown = st.session_state.weather_data.get(city) or {}
+    return event_id is not None and event_id != shown.get("stream_event_id")
+
 print("🚀 Starting Smart Weather Decision Dashboard...")
 
 # 🌍 Enhanced City Configuration with Decision Context and Timezone Integration
@@ -236,24 +261,50 @@ if 'user_timezone' not in st.session_state:
     st.session_state.user_timezone = "UTC"
 
 # 🤖 Enhanced Weather Data Generation with Hourly Forecasts and Timezone Awareness
-def generate_hourly_forecast(city, base_temp, user_timezone):
-    """Generate realistic hourly weather data with timezone awareness"""
+def fetch_model_forecast(city, hours=24):
+    """Get the backend's autoregressive LSTM forecast as [(UTC datetime, temperature), ...]"""
+    try:
+        response = requests.get(
+            f"{BACKEND_URL}/forecast", params={"city": city, "hours": hours}, timeout=10
+        )
+        if response.status_code != 200:
+            print(f"⚠️ Forecast API returned {response.status_code}, using synthetic hourly data")
+            return None
+        forecasts = response.json().get("forecasts", [])
+        if not forecasts:
+            return None
+        return [(datetime.fromisoformat(h["time"]), h["temperature"]) for h in forecasts[0]["hourly"]]
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Forecast API unavailable ({e}), using synthetic hourly data")
+        return None
+
+def generate_hourly_forecast(city, base_temp, user_timezone, model_forecast=None):
+    """Generate hourly weather data with timezone awareness
+
+    With `model_forecast` (from fetch_model_forecast), hours and temperatures are the
+    backend's model forecast; otherwise the next 24 hours follow a simulated daily curve.
+    """
     # Get current hour in user's timezone
     current_user_time = TimezoneManager.get_current_time_in_timezone(user_timezone)
     current_hour = current_user_time.hour
     
     hourly_data = []
     
-    for i in range(24):
-        hour = (current_hour + i) % 24
-        # Create datetime for this hour in user's timezone
-        hour_datetime = current_user_time.replace(hour=hour, minute=0, second=0, microsecond=0)
-        if i > 0:
-            hour_datetime = hour_datetime.replace(day=current_user_time.day + (current_hour + i) // 24)
-        
-        # Simulate daily temperature curve
-        temp_variation = 5 * np.sin((hour - 14) * np.pi / 12)
-        temp = base_temp + temp_variation + np.random.normal(0, 2)
+    for i in range(len(model_forecast) if model_forecast else 24):
+        if model_forecast:
+            # The backend labels every value with the hour it forecasts
+            utc_time, temp = model_forecast[i]
+            hour_datetime = TimezoneManager.convert_utc_to_timezone(utc_time, user_timezone)
+            hour = hour_datetime.hour
+        else:
+            hour = (current_hour + i) % 24
+            # Create datetime for this hour in user's timezone
+            hour_datetime = current_user_time.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if i > 0:
+                hour_datetime = hour_datetime.replace(day=current_user_time.day + (current_hour + i) // 24)
+            # Simulate daily temperature curve
+            temp_variation = 5 * np.sin((hour - 14) * np.pi / 12)
+            temp = base_temp + temp_variation + np.random.normal(0, 2)
         
         # Generate conditions based on temperature and time
         if temp > 30:
@@ -297,76 +348,90 @@ def generate_hourly_forecast(city, base_temp, user_timezone):
     return hourly_data
 
 @st.cache_data(ttl=300)
-def fetch_enhanced_weather(city, user_timezone="UTC"):
+def fetch_enhanced_weather(city, user_timezone="UTC", stream_event_id=None):
+    """Build the dashboard data for a city
+
+    Uses the prediction pushed by the backend stream when there is one, otherwise
+    calls /predict. `stream_event_id` is part of the cache key, so a newly pushed
+    prediction replaces the cached entry before the TTL runs out.
+    """
     try:
-        # Your FastAPI backend call
-        API_URL = f"{BACKEND_URL}/predict"
-        payload = {"city": city}
-        
-        print(f"Calling API {API_URL} with city {city}")
-        response = requests.post(API_URL, json=payload, timeout=10)
-        
-        print(f"📡 API Response Status: {response.status_code}")
-        
-        if response.status_code == 200:
+        streamed = prediction_stream.latest(city) if prediction_stream is not None else None
+        if streamed is not None:
+            result = streamed[1]
+            print(f"📡 Using streamed prediction {streamed[0]} for {city}")
+        else:
+            # Your FastAPI backend call
+            API_URL = f"{BACKEND_URL}/predict"
+            payload = {"city": city}
+
+            print(f"Calling API {API_URL} with city {city}")
+            response = requests.post(API_URL, json=payload, timeout=10)
+
+            print(f"📡 API Response Status: {response.status_code}")
+
+            if response.status_code != 200:
+                error_msg = f"API returned {response.status_code}: {response.text}"
+                print(f"❌ API Error: {error_msg}")
+                st.error(f"Weather API Error: {error_msg}")
+                return None
             result = response.json()
-            base_temp = result.get("predicted_temperature", 20)
-            print(f"Got real prediction: {base_temp}°C for {city}")
-            
-            # Get timestamp from backend (assume it's UTC)
-            backend_timestamp = result.get("timestamp_utc")
-            if backend_timestamp:
-                if isinstance(backend_timestamp, str):
-                    utc_time = datetime.fromisoformat(backend_timestamp.replace('Z', '+00:00'))
-                else:
-                    utc_time = backend_timestamp
+
+        base_temp = result.get("predicted_temperature", 20)
+        print(f"Got real prediction: {base_temp}°C for {city}")
+        
+        # Get timestamp from backend (assume it's UTC)
+        backend_timestamp = result.get("timestamp_utc")
+        if backend_timestamp:
+            if isinstance(backend_timestamp, str):
+                utc_time = datetime.fromisoformat(backend_timestamp.replace('Z', '+00:00'))
             else:
-                utc_time = datetime.now(pytz.UTC)
-            
-            # Convert to user timezone for display
-            time_str, tz_abbr, local_time = format_timestamp(utc_time, user_timezone)
-            
-            # Generate comprehensive weather data
-            current_temp = base_temp + np.random.normal(0, 1)
-            city_timezone = get_city_timezone(city)
-            hourly_forecast = generate_hourly_forecast(city, base_temp, user_timezone)
-            
-            for h in hourly_forecast:
-                h["time_display"] = format_timestamp(h["datetime"], user_timezone)[0]
-            
-            # Calculate key metrics
-            today_temps = [h["temperature"] for h in hourly_forecast[:12]]
-            tomorrow_temps = [h["temperature"] for h in hourly_forecast[12:]]
-            
-            return {
-                "city": city,
-                "current_temperature": round(current_temp, 1),
-                "predicted_temperature": base_temp,
-                "api_source": "real",
-                "confidence": result.get("confidence", 85),
-                "feels_like": round(current_temp + np.random.normal(0, 2), 1),
-                "today_high": round(max(today_temps), 1),
-                "today_low": round(min(today_temps), 1),
-                "tomorrow_high": round(max(tomorrow_temps), 1),
-                "tomorrow_low": round(min(tomorrow_temps), 1),
-                "humidity": round(60 + np.random.normal(0, 20)),
-                "wind_speed": round(max(0, 15 + np.random.normal(0, 8)), 1),
-                "uv_index": np.random.randint(0, 11),
-                "air_quality": np.random.randint(50, 200),
-                "hourly_forecast": hourly_forecast,
-                "status": "success",
-                "timestamp_utc": utc_time,
-                "timestamp_local": local_time,
-                "timestamp_display": f"{time_str} {tz_abbr}",
-                "user_timezone": user_timezone,
-                "trend": "rising" if np.random.random() > 0.5 else "falling"
-            }
+                utc_time = backend_timestamp
         else:
-            error_msg = f"API returned {response.status_code}: {response.text}"
-            print(f"❌ API Error: {error_msg}")
-            st.error(f"Weather API Error: {error_msg}")
-            return None
+            utc_time = datetime.now(pytz.UTC)
         
+        # Convert to user timezone for display
+        time_str, tz_abbr, local_time = format_timestamp(utc_time, user_timezone)
+        
+        # Generate comprehensive weather data
+        current_temp = base_temp + np.random.normal(0, 1)
+        city_timezone = get_city_timezone(city)
+        model_forecast = fetch_model_forecast(city, hours=24)
+        hourly_forecast = generate_hourly_forecast(city, base_temp, user_timezone, model_forecast)
+        
+        for h in hourly_forecast:
+            h["time_display"] = format_timestamp(h["datetime"], user_timezone)[0]
+        
+        # Calculate key metrics
+        today_temps = [h["temperature"] for h in hourly_forecast[:12]]
+        tomorrow_temps = [h["temperature"] for h in hourly_forecast[12:]]
+        
+        return {
+            "city": city,
+            "current_temperature": round(current_temp, 1),
+            "predicted_temperature": base_temp,
+            "api_source": "real",
+            # None when the backend runs without MC dropout (MC_DROPOUT_SAMPLES=0)
+            "confidence": result.get("confidence"),
+            "feels_like": round(current_temp + np.random.normal(0, 2), 1),
+            "today_high": round(max(today_temps), 1),
+            "today_low": round(min(today_temps), 1),
+            "tomorrow_high": round(max(tomorrow_temps), 1),
+            "tomorrow_low": round(min(tomorrow_temps), 1),
+            "humidity": round(60 + np.random.normal(0, 20)),
+            "wind_speed": round(max(0, 15 + np.random.normal(0, 8)), 1),
+            "uv_index": np.random.randint(0, 11),
+            "air_quality": np.random.randint(50, 200),
+            "hourly_forecast": hourly_forecast,
+            "status": "success",
+            "timestamp_utc": utc_time,
+            "timestamp_local": local_time,
+            "timestamp_display": f"{time_str} {tz_abbr}",
+            "user_timezone": user_timezone,
+            "trend": "rising" if np.random.random() > 0.5 else "falling",
+            "stream_event_id": streamed[0] if streamed is not None else None,
+        }
+
     except requests.exceptions.Timeout:
         st.error("⏰ API timeout - backend is taking too long to respond")
         return None
@@ -384,6 +449,16 @@ def get_city_timezone(city_name):
     city_info = CITY_DATA.get(city_name, {})
     return city_info.get("timezone_proper", "UTC")
 
+@st.experimental_fragment(run_every=STREAM_CHECK_S)
+def watch_prediction_stream():
+    """Rerun the app when the stream has a newer prediction for the selected city"""
+    if prediction_stream.connected:
+        st.caption("🟢 Live updates on")
+    else:
+        st.caption("⚪ Live updates unavailable - use Refresh")
+    if stream_has_update(st.session_state.selected_city):
+        st.rerun()
+
 # 📱 Smart Sidebar - User-Focused Controls with Timezone Management
 with st.sidebar:
     st.markdown("# 🎯 Weather Command Center")
@@ -438,10 +513,13 @@ with st.sidebar:
     #     st.write(f"**Description:** {city_info['description']}")
     #     st.write(f"**Coordinates:** {city_info['coords']}")
     
-    # If city or timezone changed, fetch new data
-    if city_changed or timezone_changed or st.session_state.selected_city not in st.session_state.weather_data:
+    # If city or timezone changed, or the backend pushed a newer prediction, fetch new data
+    if (city_changed or timezone_changed or stream_has_update(st.session_state.selected_city)
+            or st.session_state.selected_city not in st.session_state.weather_data):
         with st.spinner("Getting latest data..."):
-            weather_data = fetch_enhanced_weather(st.session_state.selected_city, user_timezone)
+            weather_data = fetch_enhanced_weather(
+                st.session_state.selected_city, user_timezone, streamed_event_id(st.session_state.selected_city)
+            )
             if weather_data:
                 st.session_state.weather_data[st.session_state.selected_city] = weather_data
                 st.session_state.last_fetch_time = weather_data['timestamp_local']
@@ -502,10 +580,16 @@ with st.sidebar:
     if st.session_state.get("insights"):
         st.info(f"💡 **Quick insights:** {st.session_state['insights']}")
     
+    # Live updates: check the shared stream on a timer and rerun only when it has news
+    if prediction_stream is not None:
+        watch_prediction_stream()
+
     # Quick Actions
     if st.button("🔄 Refresh", type="primary"):        
         with st.spinner("Getting latest data..."):
-            weather_data = fetch_enhanced_weather(st.session_state.selected_city, user_timezone)
+            weather_data = fetch_enhanced_weather(
+                st.session_state.selected_city, user_timezone, streamed_event_id(st.session_state.selected_city)
+            )
             if weather_data:
                 st.session_state.weather_data[st.session_state.selected_city] = weather_data
                 st.session_state.last_fetch_time = weather_data['timestamp_local']
@@ -704,11 +788,12 @@ if weather_data:
     with col4:
         current_temp= weather_data.get('current_temperature', 22)
         comfort_score = max(0, min(10, 10 - abs(current_temp - 22) / 3))
-        confidence = weather_data.get('confidence', 0)
+        confidence = weather_data.get('confidence')
         st.metric(
             label="😊 Comfort Score",
             value=f"{comfort_score:.1f}/10",
-            delta=f"{confidence}% confident",
+            delta=f"{confidence}% confident" if confidence is not None else "Confidence N/A",
+            delta_color="normal" if confidence is not None else "off",
             help="How comfortable you'll feel outside"
         )
     
@@ -913,11 +998,13 @@ else:
 if st.session_state.last_fetch_time and weather_data is not None: 
     # Calculate how long ago the update was
     time_ago = TimezoneManager.calculate_time_ago(st.session_state.last_fetch_time, current_user_time)
+    confidence = weather_data.get('confidence')
+    confidence_text = f"{confidence}%" if confidence is not None else "N/A"
     
     st.markdown(f"""
     <div style="text-align: center; padding: 1rem; opacity: 0.7;">
         <strong>Last updated:</strong> {st.session_state.last_fetch_time.strftime('%H:%M:%S %Z')} ({time_ago}) | 
-        <strong>Data accuracy:</strong> {weather_data.get('confidence', 'N/A')}% | 
+        <strong>Data accuracy:</strong> {confidence_text} | 
         <strong>Your timezone:</strong> {st.session_state.user_timezone}
         <br><br>
         Made with ♥ by <a href= "https://saadhanag13.github.io/MyResume/" target="_blank"> Saadhana Ganesa Narasimhan </a>
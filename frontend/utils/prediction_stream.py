@@ -0,0 +1,93 @@
+#frontend/utils/prediction_stream.py
+import json
+import threading
+import time
+
+import requests
+
+# Wait between attempts when the backend answers but has streaming turned off
+UNAVAILABLE_RETRY_S = 60.0
+
+
+class PredictionStream:
+    """Background client of the backend's /stream/predictions Server-Sent Events endpoint
+
+    One instance per Streamlit process (see get_prediction_stream in app.py) keeps a
+    single connection open and stores the latest pushed prediction per city, so every
+    browser session reads from memory instead of sending its own /predict request.
+    On disconnect it reconnects with Last-Event-ID and only receives what it missed.
+    """
+
+    def __init__(self, backend_url, reconnect_s=5.0, read_timeout_s=60.0):
+        self.url = f"{backend_url}/stream/predictions"
+        self.reconnect_s = reconnect_s
+        # Longer than the backend's heartbeat interval, so a silent connection counts as dead
+        self.read_timeout_s = read_timeout_s
+        self.connected = False
+        self._latest = {}
+        self._last_event_id = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="prediction-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def latest(self, city):
+        """(event id, prediction dict) last pushed for a city, or None"""
+        with self._lock:
+            return self._latest.get(city)
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Prediction stream disconnected ({e}), retrying in {self.reconnect_s:.0f}s")
+            except Exception as e:
+                # Anything else must not end the thread: the app would silently fall back to polling forever
+                print(f"❌ Prediction stream failed ({type(e).__name__}: {e}), retrying in {self.reconnect_s:.0f}s")
+            self.connected = False
+            time.sleep(self.reconnect_s)
+
+    def _listen(self):
+        headers = {"Accept": "text/event-stream"}
+        if self._last_event_id is not None:
+            headers["Last-Event-ID"] = self._last_event_id
+        with requests.get(self.url, headers=headers, stream=True, timeout=(10, self.read_timeout_s)) as response:
+            if response.status_code != 200:
+                print(f"⚠️ Prediction stream returned {response.status_code}, falling back to polling")
+                time.sleep(UNAVAILABLE_RETRY_S)
+                return
+            self.connected = True
+            print(f"📡 Prediction stream connected to {self.url}")
+            event_id, event, data = None, None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(":")
+                    value = value[1:] if value.startswith(" ") else value
+                    if field == "id":
+                        event_id = value
+                    elif field == "event":
+                        event = value
+                    elif field == "data":
+                        data.append(value)
+                    elif field == "retry" and value.isdigit():
+                        self.reconnect_s = int(value) / 1000.0
+                    continue
+                # A blank line ends the event; comment-only heartbeats carry no data
+                if event == "prediction" and data:
+                    try:
+                        self._on_prediction(event_id, json.loads("\n".join(data)))
+                    except (ValueError, KeyError, TypeError) as e:
+                        # One malformed event is skipped; the connection stays up for the next one
+                        print(f"⚠️ Skipping malformed prediction event {event_id}: {type(e).__name__}: {e}")
+                event_id, event, data = None, None, []
+
+    def _on_prediction(self, event_id, prediction):
+        with self._lock:
+            self._latest[prediction["city"]] = (event_id, prediction)
+            if event_id is not None:
+                self._last_event_id = event_id
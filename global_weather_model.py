@@ -83,14 +83,46 @@ def fetch_weather_data(lat, lon, timezone):
     df = df.dropna()
     return df
 
+def fetch_weather_data_bulk(locations, chunk_size=50):
+    """Fetch many cities with comma-separated latitude/longitude/timezone lists.
+
+    Open-Meteo returns one response per location, in request order, so each
+    chunk of up to `chunk_size` cities costs a single round trip.
+    """
+    names = list(locations)
+    frames = {}
+    for start in range(0, len(names), chunk_size):
+        chunk = names[start:start + chunk_size]
+        params = {
+            "latitude": ",".join(str(locations[name][0]) for name in chunk),
+            "longitude": ",".join(str(locations[name][1]) for name in chunk),
+            "hourly": ",".join(variables),
+            "timezone": ",".join(locations[name][2] for name in chunk)
+        }
+        responses = openmeteo.weather_api("https://api.open-meteo.com/v1/forecast", params=params)
+        for name, response in zip(chunk, responses):
+            hourly = response.Hourly()
+            hourly_data = {
+                "date": pd.date_range(
+                    start=pd.to_datetime(hourly.Time(), unit="s", utc=True),
+                    end=pd.to_datetime(hourly.TimeEnd(), unit="s", utc=True),
+                    freq=pd.Timedelta(seconds=hourly.Interval()),
+                    inclusive="left"
+                )
+            }
+            for i, var in enumerate(variables):
+                hourly_data[var] = hourly.Variables(i).ValuesAsNumpy()
+            frames[name] = pd.DataFrame(hourly_data).dropna()
+    return frames
+
 # ✅ Initialize hourly_df_dict to avoid NameError
 hourly_df_dict = {}
 
 # Combine all cities' data into one dataset
+print(f"Fetching {len(cities)} cities in bulk")
+city_frames = fetch_weather_data_bulk(cities)
 all_data = pd.DataFrame()
-for city, (lat, lon, tz) in cities.items():
-    print(f"Fetching: {city}")
-    df = fetch_weather_data(lat, lon, tz)
+for city, df in city_frames.items():
     df["city"] = city
     hourly_df_dict[city] = df.copy()  # ✅ Save each city's DataFrame for testing later
     all_data = pd.concat([all_data, df], ignore_index=True)
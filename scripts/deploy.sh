@@ -112,7 +112,7 @@ services:
     environment:
       - ENVIRONMENT=production
     healthcheck:
-      test: ["CMD", "curl", "-f", "http://localhost:8000/health"]
+      test: ["CMD", "curl", "-f", "http://localhost:8000/health/ready"]
       interval: 30s
       timeout: 10s
       retries: 5
@@ -175,7 +175,7 @@ echo "🩺 Performing health checks..."
 # Check backend
 echo "Checking backend..."
 for i in {1..10}; do
-    if curl -f -s http://localhost:8000/docs > /dev/null; then
+    if curl -f -s http://localhost:8000/health/ready > /dev/null; then
         echo "✅ Backend is healthy"
         break
     fi